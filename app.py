@@ -1,99 +1,225 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, Flask, current_app, render_template, request, flash, jsonify, g, Response, make_response, session
+from werkzeug.local import LocalProxy
 from datetime import datetime
+from cache import LRUCache
 from competition_manager import CompetitionManager
+from bulk_import import import_stream
+from jobs import JobQueue
+from live import format_sse, sse_messages
+from metrics import REGISTRY
+import cProfile
+import functools
+import io
 import json
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Optional
 
-app = Flask(__name__)
-app.secret_key = 'dev'  # Change this to a secure key in production
+bp = Blueprint('elo', __name__)
 
-# Initialize our competition manager
-manager = CompetitionManager()
+COMPETITIONS_PER_PAGE = 25
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+RESPONSE_CACHE_SIZE = 512  # rendered read responses kept in memory
+DEFAULT_SIMULATIONS = 10000
+MAX_SIMULATIONS = 100000
+
+class AppState:
+    """What the routes of one app serve from: its manager, job queue and response cache"""
+
+    def __init__(self, manager: CompetitionManager, jobs: JobQueue):
+        self.manager = manager
+        self.jobs = jobs
+        # Rendered read responses, reused until the data version they depend on changes
+        self.response_cache = LRUCache(RESPONSE_CACHE_SIZE)
+
+# The current app's state, for the routes below
+manager = LocalProxy(lambda: current_app.extensions['elo'].manager)
+jobs = LocalProxy(lambda: current_app.extensions['elo'].jobs)
+response_cache = LocalProxy(lambda: current_app.extensions['elo'].response_cache)
+
+def manager_from_environment() -> CompetitionManager:
+    """
+    The manager configured by the environment: ELO_STORAGE selects the backend,
+    ELO_SNAPSHOT warm-starts it from a snapshot taken of the same data directory,
+    and ELO_RATING_SYSTEMS sets the rating system per type, e.g.
+    golf=plackett-luce,chess=glicko2 (a changed system reprocesses that type once,
+    unlisted types keep their current system)
+    """
+    storage = os.environ.get('ELO_STORAGE', 'json')
+    if os.environ.get('ELO_SNAPSHOT'):
+        competition_manager = CompetitionManager.from_snapshot(os.environ['ELO_SNAPSHOT'], storage=storage,
+                                                               persist=False)
+    else:
+        competition_manager = CompetitionManager(storage=storage)
+    for entry in filter(None, os.environ.get('ELO_RATING_SYSTEMS', '').split(',')):
+        competition_type, system_name = entry.split('=', 1)
+        competition_manager.set_rating_system(competition_type.strip(), system_name.strip())
+    return competition_manager
+
+def create_app(competition_manager: Optional[CompetitionManager] = None,
+               job_queue: Optional[JobQueue] = None) -> Flask:
+    """
+    Build the app around a manager (by default the one configured by the
+    environment). Submissions and reprocessing run in the background on
+    job_queue, by default a new queue in the manager's data directory with
+    ELO_JOB_WORKERS workers; call app.extensions['elo'].jobs.shutdown() when done.
+    """
+    competition_manager = competition_manager or manager_from_environment()
+    if job_queue is None:
+        job_queue = JobQueue(competition_manager, competition_manager.data_dir / 'jobs.db',
+                             workers=int(os.environ.get('ELO_JOB_WORKERS', 2)))
+    app = Flask(__name__)
+    app.secret_key = 'dev'  # Change this to a secure key in production
+    state = app.extensions['elo'] = AppState(competition_manager, job_queue)
+    app.register_blueprint(bp)
+    app.jinja_env.globals.update(player_history=player_history)
+
+    results_cache = competition_manager.results_cache
+    REGISTRY.gauge('elo_results_cache_hits', lambda: results_cache.hits,
+                   'Results text served from the cache')
+    REGISTRY.gauge('elo_results_cache_misses', lambda: results_cache.misses,
+                   'Results text generated on a cache miss')
+    REGISTRY.gauge('elo_results_cache_hit_ratio',
+                   lambda: results_cache.hits / max(results_cache.hits + results_cache.misses, 1),
+                   'Share of results text lookups served from the cache')
+    REGISTRY.gauge('elo_results_cache_entries', lambda: len(results_cache),
+                   'Competitions whose results text is cached')
+    REGISTRY.gauge('elo_response_cache_hits', lambda: state.response_cache.hits,
+                   'Read responses served from the rendered response cache')
+    REGISTRY.gauge('elo_response_cache_misses', lambda: state.response_cache.misses,
+                   'Read responses rendered on a cache miss')
+    return app
+
+_default_app: Optional[Flask] = None
+_default_app_lock = threading.Lock()
+
+def __getattr__(name):
+    """`app`: the app configured by the environment, built on first use (e.g. by a WSGI server)"""
+    global _default_app
+    if name != 'app':
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _default_app_lock:
+        if _default_app is None:
+            _default_app = create_app()
+        return _default_app
 
 def player_history(player_name, competition_type):
     """Get a player's rating history for a specific competition type"""
-    player = manager.player_manager.players.get(player_name)  # Use players dict directly
-    if player and competition_type in player.competition_history:
-        return sorted(player.competition_history[competition_type], key=lambda x: x['date'])
-    return None
+    return manager.player_manager.history_entries(player_name, competition_type)  # kept in date order
+
+# Share of requests to run under cProfile (ELO_PROFILE_RATE=0.01 profiles about 1 in 100);
+# profiles are written to data/profiles/<endpoint>-<timestamp>.prof
+PROFILE_RATE = float(os.environ.get('ELO_PROFILE_RATE', 0))
+_profile_lock = threading.Lock()  # one profiled request at a time
+
+# Read routes answer conditional GETs from the manager's data versions and reuse
+# rendered responses until the version they depend on changes. Versions restart
+# with the process, so ETags also carry a per-process epoch.
+ETAG_EPOCH = uuid.uuid4().hex[:8]
+
+def versioned(version_of):
+    """
+    Cache a read route by data version. version_of receives the view arguments
+    and returns the version the response depends on.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            etag = f"{ETAG_EPOCH}-{version_of(**kwargs)}"
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            elif session.get('_flashes'):
+                response = make_response(view(**kwargs))  # pages with flashed messages are per-user
+            else:
+                key = (request.full_path, etag)
+                cached = response_cache.get(key)
+                if cached is None:
+                    rendered = make_response(view(**kwargs))
+                    if rendered.status_code != 200:
+                        return rendered
+                    cached = (rendered.get_data(), rendered.content_type)
+                    response_cache.put(key, cached)
+                response = Response(cached[0], content_type=cached[1])
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'  # always revalidate with the ETag
+            return response
+        return wrapper
+    return decorator
+
+def data_version(**kwargs):
+    return manager.data_version()
+
+def type_version(competition_type, **kwargs):
+    return manager.data_version(competition_type)
+
+@bp.before_app_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    g.profiler = None
+    if PROFILE_RATE and random.random() < PROFILE_RATE and _profile_lock.acquire(blocking=False):
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
 
-# Register the function with Jinja2
-app.jinja_env.globals.update(player_history=player_history)
+@bp.after_app_request
+def record_request_metrics(response):
+    endpoint = request.endpoint.rpartition('.')[2] if request.endpoint else 'unmatched'
+    REGISTRY.observe('elo_http_request_seconds', time.perf_counter() - g.request_start, endpoint=endpoint)
+    REGISTRY.inc('elo_http_requests_total', endpoint=endpoint, status=response.status_code)
+    if g.get('profiler') is not None:
+        g.profiler.disable()
+        profile_dir = manager.data_dir / 'profiles'
+        profile_dir.mkdir(exist_ok=True)
+        g.profiler.dump_stats(profile_dir / f"{endpoint}-{time.time_ns()}.prof")
+        g.profiler = None
+        _profile_lock.release()
+    return response
 
-@app.route('/')
+@bp.route('/metrics')
+def metrics():
+    """Counters and timers in the Prometheus text format"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@bp.route('/')
+@versioned(data_version)
 def index():
     """Home page showing competition types and their leaderboards"""
-    # Get unique competition types
-    competition_types = set()
-    for comp in manager.competitions.values():
-        competition_types.add(comp.competition_type)
-    
-    # Get ratings for each competition type
+    # Get ratings for each competition type from the maintained rating indexes
+    competition_types = sorted(manager.competition_types)
     ratings_by_type = {}
     for comp_type in competition_types:
         ratings_by_type[comp_type] = manager.player_manager.get_rating_list(comp_type)
     
     return render_template('index.html', 
                          ratings_by_type=ratings_by_type,
-                         competition_types=sorted(competition_types))
+                         competition_types=competition_types)
 
-@app.route('/submit', methods=['GET', 'POST'])
+@bp.route('/submit', methods=['GET', 'POST'])
 def submit_competition():
     """Page for submitting new competition results"""
     if request.method == 'POST':
         try:
-            data = request.json
-            competition_type = data['competition_type']
-            name = data['name']
-            date = data['date']
-            format_type = data['format_type']
-            
-            # Create the competition
-            competition_id = manager.create_competition(
-                name=name,
-                date=date,
-                competition_type=competition_type,
-                format_type=format_type
-            )
-            
-            if format_type == 'leaderboard':
-                # Process leaderboard results
-                results = []
-                for entry in data['results']:
-                    player_name = entry['player']
-                    rank = entry['rank']
-                    score = entry.get('score')  # Score is optional
-                    if score:
-                        try:
-                            score = float(score)
-                        except ValueError:
-                            score = None
-                    results.append((player_name, rank, score))
-                
-                manager.add_leaderboard_results(competition_id, results)
-                manager.process_leaderboard_competition(competition_id)
-            
-            else:  # direct_matches
-                # Process direct matches
-                for match in data['matches']:
-                    player_a = match['player_a']
-                    player_b = match['player_b']
-                    result = float(match['result'])
-                    manager.add_direct_match(competition_id, player_a, player_b, result)
-                manager.process_direct_matches(competition_id)
-            
-            return jsonify({'success': True, 'message': 'Competition processed successfully'})
-            
+            # Rating happens in the background; the client polls /jobs/<job_id>
+            job_id = jobs.submit_competition(request.json)
+            return jsonify({'success': True, 'message': 'Competition queued for processing',
+                            'job_id': job_id}), 202
         except Exception as e:
             return jsonify({'success': False, 'message': str(e)}), 400
     
     return render_template('submit.html')
 
-@app.route('/competitions')
+@bp.route('/competitions')
+@versioned(data_version)
 def view_competitions():
-    """Page showing all competition results"""
+    """Page showing competition results, newest first"""
+    page = max(request.args.get('page', 1, type=int), 1)
+    total, page_competitions = manager.query_competitions(
+        offset=(page - 1) * COMPETITIONS_PER_PAGE, limit=COMPETITIONS_PER_PAGE)
     competitions = []
-    for comp in sorted(manager.competitions.values(), 
-                      key=lambda x: x.date, reverse=True):
+    for comp in page_competitions:
         result_text = manager.get_competition_results(comp.competition_id)
         competitions.append({
             'id': comp.competition_id,
@@ -104,30 +230,262 @@ def view_competitions():
             'results': result_text
         })
     
-    return render_template('competitions.html', competitions=competitions)
+    pages = max((total + COMPETITIONS_PER_PAGE - 1) // COMPETITIONS_PER_PAGE, 1)
+    return render_template('competitions.html', competitions=competitions, page=page, pages=pages)
+
+def page_args(default_limit=DEFAULT_PAGE_SIZE):
+    """Read offset/limit query parameters, capping the page size"""
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = request.args.get('limit', default_limit, type=int)
+    if limit is not None:
+        limit = min(max(limit, 0), MAX_PAGE_SIZE)
+    return offset, limit
+
+def paginated(total, offset, limit, items):
+    """Wrap a page of items with the information needed to request the next one"""
+    next_offset = offset + len(items)
+    return jsonify({
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        'next_offset': next_offset if next_offset < total else None,
+        'items': items
+    })
 
-@app.route('/api/players/<competition_type>')
+def rating_query(competition_type, default_limit):
+    offset, limit = page_args(default_limit)
+    total, entries = manager.player_manager.query_ratings(
+        competition_type, offset, limit,
+        min_rating=request.args.get('min_rating', type=int),
+        max_rating=request.args.get('max_rating', type=int),
+        prefix=request.args.get('prefix') or None
+    )
+    items = [{'rank': rank, 'name': name, 'rating': rating} for rank, name, rating in entries]
+    return total, offset, limit, items
+
+@bp.route('/api/players/<competition_type>')
+@versioned(type_version)
 def get_players(competition_type):
-    """API endpoint to get players for a competition type"""
-    players = []
-    for player in manager.player_manager.players.values():
-        if competition_type in player.ratings:
-            players.append({
-                'name': player.name,
-                'rating': player.get_rating(competition_type)
-            })
-    return jsonify(players)
-
-@app.route('/reprocess', methods=['POST'])
+    """
+    API endpoint to get players for a competition type, highest rated first.
+    Accepts the same filters as /api/ratings but returns a plain list, unpaged
+    unless a limit is given.
+    """
+    _, _, _, items = rating_query(competition_type, default_limit=None)
+    return jsonify([{'name': item['name'], 'rating': item['rating']} for item in items])
+
+@bp.route('/api/ratings/<competition_type>')
+@versioned(type_version)
+def get_ratings(competition_type):
+    """
+    Paginated rating list. Query parameters: offset, limit, min_rating,
+    max_rating and prefix (player name prefix).
+    """
+    return paginated(*rating_query(competition_type, DEFAULT_PAGE_SIZE))
+
+@bp.route('/api/players/<competition_type>/<player_name>/history')
+@versioned(type_version)
+def get_player_history(competition_type, player_name):
+    """
+    Paginated rating history of a player, oldest first. Query parameters: since,
+    until, offset, limit, downsample ("week" or "month" for the last rating of each
+    period, "lttb" to keep the `points` entries that best preserve the curve)
+    """
+    offset, limit = page_args()
+    try:
+        total, entries = manager.player_manager.query_history(
+            player_name, competition_type,
+            since=request.args.get('since'), until=request.args.get('until'),
+            offset=offset, limit=limit,
+            downsample_mode=request.args.get('downsample') or None,
+            points=request.args.get('points', type=int)
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return paginated(total, offset, limit, entries)
+
+@bp.route('/api/head-to-head/<competition_type>/<player_a>/<player_b>')
+@versioned(type_version)
+def get_head_to_head(competition_type, player_a, player_b):
+    """Wins, draws and losses of player A against player B and their last meeting"""
+    record = manager.head_to_head_record(competition_type, player_a, player_b)
+    if record is None:
+        record = {'player_a': player_a, 'player_b': player_b, 'wins': 0, 'draws': 0, 'losses': 0,
+                  'meetings': 0, 'last_meeting': None}
+    return jsonify(record)
+
+@bp.route('/api/predict/<competition_type>', methods=['POST'])
+def predict(competition_type):
+    """
+    Win probabilities from current ratings. The body holds either "players" (a list
+    of names, answered with the full matrix of each player's expected score
+    against each other) or "pairs" (a list of [player_a, player_b]).
+    """
+    try:
+        data = request.json
+        if 'players' in data:
+            players = [str(name) for name in data['players']]
+            ratings, probabilities = manager.win_probabilities(competition_type, players)
+            return jsonify({'players': players, 'ratings': ratings,
+                            'probabilities': probabilities.round(6).tolist()})
+        pairs = [(str(a), str(b)) for a, b in data['pairs']]
+        probabilities = manager.predict_matches(competition_type, pairs)
+        return jsonify({'predictions': [
+            {'player_a': a, 'player_b': b, 'probability': round(p, 6)}
+            for (a, b), p in zip(pairs, probabilities)
+        ]})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+@bp.route('/api/simulate/<competition_type>', methods=['POST'])
+def simulate(competition_type):
+    """
+    Monte Carlo projection from current ratings. The body holds either "players"
+    (a leaderboard field) or "matches" (a list of [player_a, player_b], with
+    "sequential": true to rate each from the previous one), and optionally
+    "simulations" (default 10000) and "seed". Answers each player's place
+    probabilities and expected rating change; nothing is saved.
+    """
+    try:
+        data = request.json
+        simulations = int(data.get('simulations', DEFAULT_SIMULATIONS))
+        if simulations > MAX_SIMULATIONS:
+            raise ValueError(f"At most {MAX_SIMULATIONS} simulations")
+        seed = data.get('seed')
+        if 'players' in data:
+            projection = manager.simulate_leaderboard(
+                competition_type, [str(name) for name in data['players']], simulations, seed)
+        else:
+            schedule = [(str(a), str(b)) for a, b in data['matches']]
+            projection = manager.simulate_matches(
+                competition_type, schedule, simulations, bool(data.get('sequential')), seed)
+        return jsonify(projection.to_dict())
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+@bp.route('/api/competitions')
+@versioned(data_version)
+def get_competitions():
+    """
+    Paginated competitions, newest first. Query parameters: type, since, until,
+    offset, limit and order ("asc" for oldest first).
+    """
+    offset, limit = page_args()
+    total, competitions = manager.query_competitions(
+        competition_type=request.args.get('type'),
+        since=request.args.get('since'), until=request.args.get('until'),
+        offset=offset, limit=limit,
+        newest_first=request.args.get('order', 'desc') != 'asc'
+    )
+    items = [{
+        'id': comp.competition_id,
+        'name': comp.name,
+        'date': comp.date,
+        'type': comp.competition_type,
+        'format': comp.format_type,
+        'processed': comp.processed
+    } for comp in competitions]
+    return paginated(total, offset, limit, items)
+
+@bp.route('/api/live', methods=['POST'])
+def create_live_competition():
+    """Start a live direct match competition whose matches are rated as they are added"""
+    try:
+        data = request.json
+        competition_id = manager.create_competition(data['name'], data['date'], data['competition_type'],
+                                                    'direct_matches', mode='live')
+        return jsonify({'success': True, 'competition_id': competition_id}), 201
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+@bp.route('/api/live/<competition_id>/matches', methods=['POST'])
+def add_live_matches(competition_id):
+    """
+    Rate one match ({"player_a", "player_b", "result"}) or several ({"matches": [...]})
+    of a live competition immediately; answers with the players' new ratings
+    """
+    try:
+        data = request.json
+        entries = data['matches'] if 'matches' in data else [data]
+        matches = [(m['player_a'], m['player_b'], float(m['result'])) for m in entries]
+        with manager.batch():
+            manager.add_direct_matches(competition_id, matches)
+            competition_type = manager.competitions[competition_id].competition_type
+            names = {name for a, b, _ in matches for name in (a, b)}
+            ratings = {name: manager.player_manager.players[name].get_rating(competition_type) for name in names}
+        return jsonify({'success': True, 'ratings': ratings})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+@bp.route('/api/live/<competition_id>/finish', methods=['POST'])
+def finish_live_competition(competition_id):
+    try:
+        replayed = manager.finish_competition(competition_id)
+        return jsonify({'success': True, 'replayed': replayed})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+@bp.route('/api/live/<competition_id>/events')
+def live_events(competition_id):
+    """
+    Server-Sent Events stream of a live competition: a "snapshot" of the current
+    standings, then a "match" event with the players' new ratings and running
+    totals for every rated match, and a final "finished" event
+    """
+    competition = manager.competitions.get(competition_id)
+    if competition is None:
+        return jsonify({'success': False, 'message': 'Competition not found'}), 404
+    subscription = manager.live_feed.subscribe(competition_id)  # before the snapshot, so no match is missed
+    snapshot = {'event': 'snapshot', 'competition_id': competition_id, 'live': competition.live,
+                'standings': manager.live_standings(competition_id)}
+    if not competition.live:
+        subscription.close()
+        return Response(format_sse(snapshot), mimetype='text/event-stream')
+    return Response(sse_messages(subscription, snapshot), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@bp.route('/api/import', methods=['POST'])
+def bulk_import():
+    """
+    Bulk import competitions from a CSV or JSONL upload (multipart field 'file')
+    or request body. The format comes from the 'format' query parameter or the
+    uploaded file name.
+    """
+    upload = request.files.get('file')
+    file_format = request.args.get('format')
+    if upload is not None:
+        stream = upload.stream
+        file_format = file_format or os.path.splitext(upload.filename or '')[1].lstrip('.').lower()
+    else:
+        stream = request.stream
+    try:
+        text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+        report = import_stream(manager, text, file_format or 'csv')
+        return jsonify({'success': True, **report})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+@bp.route('/reprocess', methods=['POST'])
 def reprocess():
-    """Reprocess all competitions for a specific type or all types"""
+    """
+    Reprocess all competitions for a specific type or all types. With a 'since'
+    date only competitions from that date on are re-rated.
+    """
     try:
         data = request.json
-        competition_type = data.get('competition_type')  # None means all types
-        manager.reprocess_competitions(competition_type)
-        return jsonify({'success': True, 'message': 'Competitions reprocessed successfully'})
+        job_id = jobs.reprocess(data.get('competition_type'), data.get('since'))  # None means all types
+        return jsonify({'success': True, 'message': 'Reprocessing queued', 'job_id': job_id}), 202
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
 
+@bp.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Status, progress and result of a background job"""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return jsonify({key: job[key] for key in ('id', 'kind', 'status', 'progress', 'result', 'error',
+                                              'created', 'started', 'finished')})
+
 if __name__ == '__main__':
-    app.run(debug=True)
+    create_app().run(debug=True)
@@ -0,0 +1,238 @@
+"""
+Reproducible benchmark of the rating pipeline on synthetic data.
+
+Generates players and a mix of leaderboard and direct match competitions (with
+tied ranks), then times processing, full reprocessing, saving and loading, and
+the main web routes through the Flask test client, and Monte Carlo projections
+of a 100-player field (10000 simulations on one worker and on all CPUs). Results are printed (or
+written) as JSON so runs on different commits can be compared:
+
+    python benchmark.py --players 2000 --competitions 500 --output bench.json
+"""
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date as Date, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from competition_manager import CompetitionManager
+from player_manager import PlayerManager
+from simulation import simulate_leaderboard, simulate_matches
+from storage import open_storage
+
+COMPETITION_TYPES = ("golf", "chess", "darts", "tennis")
+SIMULATED_FIELD = 100
+SIMULATIONS = 10000
+
+def generate(players: int = 1000, competitions: int = 200, min_field: int = 4, max_field: int = 40,
+             direct_share: float = 0.3, tie_rate: float = 0.1, seed: int = 1) -> List[Dict]:
+    """
+    Synthetic competitions as dicts with competition_type, name, date, format_type
+    and either results [(player, rank, score)] or matches [(player_a, player_b, result)].
+    The same arguments always produce the same competitions.
+    """
+    rng = random.Random(seed)
+    names = [f"Player {i:05d}" for i in range(players)]
+    start = Date(2020, 1, 1)
+    generated = []
+    for i in range(competitions):
+        competition_type = rng.choice(COMPETITION_TYPES)
+        competition = {
+            "competition_type": competition_type,
+            "name": f"Synthetic {i}",
+            "date": (start + timedelta(days=rng.randrange(4 * 365))).isoformat()
+        }
+        field = rng.sample(names, min(rng.randint(min_field, max_field), players))
+        if rng.random() < direct_share:
+            competition["format_type"] = "direct_matches"
+            competition["matches"] = [
+                (a, b, rng.choice((0, 0.5, 1)) if rng.random() >= tie_rate else 0.5)
+                for a, b in zip(field[0::2], field[1::2])
+            ]
+        else:
+            competition["format_type"] = "leaderboard"
+            results = []
+            rank = 0
+            for position, player in enumerate(field):
+                if position == 0 or rng.random() >= tie_rate:
+                    rank = position + 1  # otherwise tied with the previous player
+                score = 60 + rank + rng.random() if competition_type == "golf" else None
+                results.append((player, rank, score))
+            competition["results"] = results
+        generated.append(competition)
+    return generated
+
+class Timings:
+    """Collects durations per operation"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+
+    @contextmanager
+    def time(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples.setdefault(name, []).append(time.perf_counter() - start)
+
+    def report(self) -> Dict[str, Dict]:
+        return {
+            name: {
+                "count": len(samples),
+                "total_s": round(sum(samples), 6),
+                "mean_ms": round(statistics.mean(samples) * 1000, 3),
+                "median_ms": round(statistics.median(samples) * 1000, 3),
+                "min_ms": round(min(samples) * 1000, 3),
+                "max_ms": round(max(samples) * 1000, 3)
+            }
+            for name, samples in self.samples.items()
+        }
+
+def _populate(manager: CompetitionManager, competitions: List[Dict], timings: Timings):
+    """Create competitions in date order and process each one, timing the processing"""
+    with manager.batch():
+        for competition in sorted(competitions, key=lambda c: c["date"]):
+            competition_id = manager.create_competition(
+                competition["name"], competition["date"], competition["competition_type"],
+                competition["format_type"])
+            if competition["format_type"] == "leaderboard":
+                manager.add_leaderboard_results(competition_id, competition["results"])
+                with timings.time("process_leaderboard_competition"):
+                    manager.process_leaderboard_competition(competition_id)
+            else:
+                manager.add_direct_matches(competition_id, competition["matches"])
+                with timings.time("process_direct_matches"):
+                    manager.process_direct_matches(competition_id)
+
+def _bench_routes(manager: CompetitionManager, timings: Timings, repeat: int):
+    from app import create_app
+    app = create_app(manager)
+    state = app.extensions['elo']
+    client = app.test_client()
+    try:
+        routes = ["/", "/competitions"] + [f"/api/players/{ct}" for ct in sorted(manager.competition_types)]
+        # Cold requests render the page after the response cache is emptied; warm ones
+        # are answered from the cache the previous request filled
+        for route in routes:
+            for cache in ("cold", "warm"):
+                for _ in range(repeat):
+                    if cache == "cold":
+                        state.response_cache.clear()
+                    with timings.time(f"GET {route} ({cache})"):
+                        response = client.get(route)
+                    if response.status_code != 200:
+                        raise RuntimeError(f"GET {route} returned {response.status_code}")
+    finally:
+        state.jobs.shutdown()
+
+def _bench_simulations(timings: Timings, repeat: int, seed: int):
+    rng = random.Random(seed)
+    ratings = {f"Player {i:05d}": rng.randint(1200, 1800) for i in range(SIMULATED_FIELD)}
+    players = list(ratings)
+    schedule = list(zip(players[0::2], players[1::2])) + list(zip(players[1::2], players[2::2]))
+    cpus = os.cpu_count() or 1
+    simulate_leaderboard(ratings, SIMULATIONS, seed=seed)  # start the worker processes outside the timings
+    for workers in sorted({1, cpus}):
+        for _ in range(repeat):
+            with timings.time(f"simulate_leaderboard {SIMULATIONS}x{SIMULATED_FIELD} (workers={workers})"):
+                simulate_leaderboard(ratings, SIMULATIONS, seed=seed, workers=workers)
+            with timings.time(f"simulate_matches {SIMULATIONS}x{len(schedule)} (workers={workers})"):
+                simulate_matches(ratings, schedule, SIMULATIONS, seed=seed, workers=workers)
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(players: int = 1000, competitions: int = 200, min_field: int = 4, max_field: int = 40,
+        direct_share: float = 0.3, tie_rate: float = 0.1, seed: int = 1, storage: str = "json",
+        repeat: int = 3, routes: bool = True, simulations: bool = True) -> Dict:
+    """Run the whole benchmark in a temporary data directory and return the report"""
+    config = {
+        "players": players, "competitions": competitions, "min_field": min_field, "max_field": max_field,
+        "direct_share": direct_share, "tie_rate": tie_rate, "seed": seed, "storage": storage, "repeat": repeat
+    }
+    data = generate(players, competitions, min_field, max_field, direct_share, tie_rate, seed)
+    timings = Timings()
+    data_dir = tempfile.mkdtemp(prefix="elo-bench-")
+    try:
+        manager = CompetitionManager(data_dir, storage=storage)
+        with timings.time("populate_total"):
+            _populate(manager, data, timings)
+
+        for _ in range(repeat):
+            with timings.time("reprocess_competitions"):
+                manager.reprocess_competitions()
+
+        for _ in range(repeat):
+            with timings.time("PlayerManager.save_players"):
+                manager.player_manager._dirty.update(manager.player_manager.players)
+                manager.player_manager.save_players()
+            with timings.time("CompetitionManager.save_competitions"):
+                manager._dirty.update(manager.competitions)
+                manager.save_competitions()
+
+        for _ in range(repeat):
+            with timings.time("PlayerManager.load"):
+                PlayerManager(data_dir, storage=open_storage(storage, data_dir))
+            with timings.time("CompetitionManager.load"):
+                CompetitionManager(data_dir, storage=storage)
+
+        if routes:
+            _bench_routes(manager, timings, repeat)
+        if simulations:
+            _bench_simulations(timings, repeat, seed)
+
+        rated = {ct: len(manager.player_manager.get_rating_list(ct)) for ct in manager.competition_types}
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    return {
+        "config": config,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "commit": _git_commit()
+        },
+        "rated_players": rated,
+        "timings": timings.report()
+    }
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the rating pipeline on synthetic data")
+    parser.add_argument("--players", type=int, default=1000)
+    parser.add_argument("--competitions", type=int, default=200)
+    parser.add_argument("--min-field", type=int, default=4)
+    parser.add_argument("--max-field", type=int, default=40)
+    parser.add_argument("--direct-share", type=float, default=0.3, help="share of direct match competitions")
+    parser.add_argument("--tie-rate", type=float, default=0.1, help="chance of a tied rank or drawn match")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--storage", default="json", choices=["json", "json-lazy", "sqlite", "eventlog"])
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each repeated measurement")
+    parser.add_argument("--no-routes", action="store_true", help="skip the Flask route timings")
+    parser.add_argument("--no-simulations", action="store_true", help="skip the Monte Carlo projection timings")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    report = run(args.players, args.competitions, args.min_field, args.max_field, args.direct_share,
+                 args.tie_rate, args.seed, args.storage, args.repeat, not args.no_routes,
+                 not args.no_simulations)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
@@ -0,0 +1,194 @@
+"""
+Streaming bulk import of historical results from CSV or JSONL.
+
+Each row describes one leaderboard entry or one direct match:
+
+    competition_type,name,date,format_type,player,rank,score,player_a,player_b,result
+
+format_type defaults to "leaderboard". Leaderboard rows need player and rank
+(score is optional); direct match rows need player_a, player_b and result.
+Rows of the same competition must be consecutive; a competition whose rows resume
+within the next CLOSED_KEYS_CHECKED competitions is rejected, one that resumes later
+is skipped as already imported. A JSONL line may instead hold
+a whole competition with a "results" list ({"player", "rank", "score"}) or a
+"matches" list ({"player_a", "player_b", "result"}).
+
+At most one batch of competitions is held in memory. Competitions are persisted
+in batches and rated as they are read; competitions dated before an already rated
+competition of the same type are re-rated once at the end of the import.
+"""
+import csv
+import json
+from collections import OrderedDict
+from datetime import date as Date
+from itertools import groupby, islice
+from pathlib import Path
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from competition_manager import CompetitionManager, make_competition_id
+
+FORMATS = ("leaderboard", "direct_matches")
+DEFAULT_BATCH_SIZE = 500
+CLOSED_KEYS_CHECKED = 10000  # recently finished competitions checked for non-consecutive rows
+
+def read_rows(stream: IO[str], file_format: str) -> Iterator[Tuple[int, Dict]]:
+    """Yield (line number, row) pairs from a CSV or JSONL text stream"""
+    if file_format == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, {k: v for k, v in row.items() if v not in (None, "")}
+    elif file_format == "jsonl":
+        for line_num, line in enumerate(stream, 1):
+            if line.strip():
+                try:
+                    yield line_num, json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"line {line_num}: invalid JSON ({e.msg})")
+    else:
+        raise ValueError(f"Unknown import format: {file_format}")
+
+def _competition_key(line_num: int, row: Dict) -> Tuple[str, str, str, str]:
+    try:
+        key = (row["competition_type"], row["name"], row["date"], row.get("format_type", "leaderboard"))
+    except KeyError as e:
+        raise ValueError(f"line {line_num}: missing field {e.args[0]}")
+    try:
+        Date.fromisoformat(key[2])
+    except ValueError:
+        raise ValueError(f"line {line_num}: date must be YYYY-MM-DD, got {key[2]!r}")
+    if key[3] not in FORMATS:
+        raise ValueError(f"line {line_num}: unknown format_type {key[3]!r}")
+    return key
+
+def _entries(row: Dict) -> List[Dict]:
+    if "results" in row:
+        return row["results"]
+    if "matches" in row:
+        return row["matches"]
+    return [row]
+
+def _parse_result(line_num: int, entry: Dict) -> Tuple[str, int, Optional[float]]:
+    try:
+        score = entry.get("score")
+        return entry["player"], int(entry["rank"]), float(score) if score not in (None, "") else None
+    except KeyError as e:
+        raise ValueError(f"line {line_num}: missing field {e.args[0]}")
+    except (TypeError, ValueError):
+        raise ValueError(f"line {line_num}: rank must be an integer and score a number")
+
+def _parse_match(line_num: int, entry: Dict) -> Tuple[str, str, float]:
+    try:
+        result = float(entry["result"])
+        player_a, player_b = entry["player_a"], entry["player_b"]
+    except KeyError as e:
+        raise ValueError(f"line {line_num}: missing field {e.args[0]}")
+    except (TypeError, ValueError):
+        raise ValueError(f"line {line_num}: result must be 1, 0.5 or 0")
+    if result not in (0, 0.5, 1):
+        raise ValueError(f"line {line_num}: result must be 1, 0.5 or 0")
+    return player_a, player_b, result
+
+def _latest_processed_dates(manager: CompetitionManager) -> Dict[str, str]:
+    latest = {ct: manager.latest_processed_date(ct) for ct in manager.competition_types}
+    return {ct: date for ct, date in latest.items() if date is not None}
+
+def _competitions(rows: Iterable[Tuple[int, Dict]],
+                  closed_keys_checked: int = CLOSED_KEYS_CHECKED
+                  ) -> Iterator[Tuple[Tuple[str, str, str, str], List]]:
+    """
+    Group consecutive rows of the same competition. Only the last
+    closed_keys_checked competitions are remembered, so memory stays bounded
+    however long the stream is.
+    """
+    closed: "OrderedDict[Tuple[str, str, str, str], None]" = OrderedDict()
+    for key, group in groupby(rows, key=lambda item: _competition_key(*item)):
+        group = list(group)
+        if key in closed:
+            raise ValueError(f"line {group[0][0]}: rows of competition {key[1]!r} on {key[2]} "
+                             "must be consecutive")
+        closed[key] = None
+        if len(closed) > closed_keys_checked:
+            closed.popitem(last=False)
+        yield key, group
+
+def import_rows(manager: CompetitionManager, rows: Iterable[Tuple[int, Dict]],
+                batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Import (line number, row) pairs into the manager and rate the new competitions.
+    Competitions that already exist are skipped, so an import can be re-run.
+    Returns counts of rows, imported and skipped competitions and re-rated competitions.
+    """
+    report = {"rows": 0, "competitions": 0, "skipped": 0, "replayed": 0}
+    latest = _latest_processed_dates(manager)
+    rerate_since: Dict[str, str] = {}  # competition_type -> earliest back-dated competition
+    competitions = _competitions(rows)
+
+    try:
+        while True:
+            chunk = list(islice(competitions, batch_size))
+            if not chunk:
+                break
+            with manager.batch():
+                for (competition_type, name, date, format_type), group in chunk:
+                    report["rows"] += len(group)
+                    entries = [(line_num, entry) for line_num, row in group for entry in _entries(row)]
+                    if format_type == "leaderboard":
+                        results = [_parse_result(line_num, entry) for line_num, entry in entries]
+                    else:
+                        matches = [_parse_match(line_num, entry) for line_num, entry in entries]
+
+                    competition_id = make_competition_id(name, date, competition_type)
+                    if competition_id in manager.competitions:
+                        report["skipped"] += 1
+                        continue
+                    manager.create_competition(name, date, competition_type, format_type)
+                    if format_type == "leaderboard":
+                        manager.add_leaderboard_results(competition_id, results)
+                    else:
+                        manager.add_direct_matches(competition_id, matches)
+                    report["competitions"] += 1
+
+                    if date < latest.get(competition_type, ""):
+                        # Back-dated: re-rate once after everything is loaded
+                        if competition_type not in rerate_since or date < rerate_since[competition_type]:
+                            rerate_since[competition_type] = date
+                        continue
+                    if format_type == "leaderboard":
+                        manager.process_leaderboard_competition(competition_id)
+                    else:
+                        manager.process_direct_matches(competition_id)
+                    latest[competition_type] = date
+    finally:
+        # Rate back-dated competitions even if a later row was invalid
+        for competition_type, since in rerate_since.items():
+            report["replayed"] += manager.rerate_from(competition_type, since)
+    return report
+
+def import_stream(manager: CompetitionManager, stream: IO[str], file_format: str,
+                  batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+    """Import a CSV or JSONL text stream"""
+    return import_rows(manager, read_rows(stream, file_format), batch_size)
+
+def import_file(manager: CompetitionManager, path: Union[str, Path], file_format: Optional[str] = None,
+                batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+    """Import a CSV or JSONL file; the format defaults to the file extension"""
+    path = Path(path)
+    file_format = file_format or path.suffix.lstrip(".").lower()
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        return import_stream(manager, f, file_format, batch_size)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bulk import competition results from CSV or JSONL")
+    parser.add_argument("path", help="CSV or JSONL file to import")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="defaults to the file extension")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--storage", default="json", choices=["json", "json-lazy", "sqlite", "eventlog"])
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="competitions persisted per write")
+    args = parser.parse_args()
+
+    manager = CompetitionManager(args.data_dir, storage=args.storage)
+    report = import_file(manager, args.path, args.format, args.batch_size)
+    print(json.dumps(report))
@@ -1,9 +1,43 @@
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
 from datetime import datetime
+import functools
 import json
+import os
+import numpy as np
 from pathlib import Path
+from cache import LRUCache
 from elo_calculator import ELOCalculator
+from live import LiveFeed
+from metrics import inc, timed_method
 from player_manager import PlayerManager
-from typing import List, Dict, Union, Tuple
+from rating_history import RatingHistory
+from rating_systems import EloSystem, RatingSystem, State, create_rating_system
+from simulation import Projection, simulate_leaderboard, simulate_matches
+from storage import open_storage, write_atomic
+from worker_pool import map_in_workers
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Set, Union, Tuple
+
+RESULTS_CACHE_SIZE = 1024  # competitions whose results text is kept in memory
+INITIAL_RATING = 1500
+FORMAT_TYPES = ("leaderboard", "direct_matches")
+COMPETITION_MODES = ("sequential", "live")  # direct match modes; see Competition.mode
+PARALLEL_MIN_COMPETITIONS = 200  # smaller reprocesses are not worth spreading over worker processes
+
+def lower_score_is_better(competition_type: str) -> bool:
+    """For golf, lower score is better; for most other sports, higher score is better"""
+    return competition_type == "golf"
+
+def make_competition_id(name: str, date: str, competition_type: str) -> str:
+    return f"{competition_type}_{name.lower().replace(' ', '_')}_{date}"
+
+def batched(method):
+    """Run a CompetitionManager method inside a single persistence batch."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.batch():
+            return method(self, *args, **kwargs)
+    return wrapper
 
 class CompetitionResult:
     def __init__(self, player_name: str, rank: int, score: Union[float, None] = None):
@@ -35,6 +69,10 @@ class DirectMatch:
             "result": self.result
         }
 
+    def describe(self) -> str:
+        result_str = "won against" if self.result == 1 else "drew with" if self.result == 0.5 else "lost to"
+        return f"{self.player_a} {result_str} {self.player_b}"
+
     @staticmethod
     def from_dict(data):
         return DirectMatch(data["player_a"], data["player_b"], data["result"])
@@ -46,63 +84,524 @@ class Competition:
         self.date = date
         self.competition_type = competition_type  # e.g., "golf", "soccer", "chess"
         self.format_type = format_type  # "leaderboard" or "direct_matches"
-        self.results: List[Union[CompetitionResult, DirectMatch]] = []
+        self._results: Optional[List[Union[CompetitionResult, DirectMatch]]] = []
+        self._results_loader: Optional[Callable[[str, str], List[Dict]]] = None
         self.processed = False
+        # Direct matches only: None rates every match from the ratings before the
+        # competition and sums each player's changes; "sequential" rates it from the
+        # ratings after the previous match; "live"
+        # is sequential and rates each match as soon as it is added
+        self.mode: Optional[str] = None
+        self._live_totals: Optional[Dict[str, List[float]]] = None  # name -> [played, points]
 
-    def to_dict(self):
-        return {
+    @property
+    def results(self) -> List[Union[CompetitionResult, DirectMatch]]:
+        if self._results is None:
+            rows = self._results_loader(self.competition_id, self.format_type)
+            self._results = self.results_from_dicts(rows)
+            self._results_loader = None
+        return self._results
+
+    @results.setter
+    def results(self, results: List[Union[CompetitionResult, DirectMatch]]):
+        self._results = results
+        self._results_loader = None
+
+    @property
+    def results_loaded(self) -> bool:
+        return self._results is not None
+
+    def set_results_loader(self, loader: Callable[[str, str], List[Dict]]):
+        """Defer loading the results until they are first accessed"""
+        self._results = None
+        self._results_loader = loader
+
+    def results_from_dicts(self, rows: List[Dict]) -> List[Union[CompetitionResult, DirectMatch]]:
+        if self.format_type == "leaderboard":
+            return [CompetitionResult.from_dict(r) for r in rows]
+        return [DirectMatch.from_dict(r) for r in rows]
+
+    def results_text(self) -> str:
+        """Plaintext results, formatted like the files in data/results"""
+        if self.format_type != "leaderboard":
+            return "".join(f"{match.describe()}\n" for match in self.results)
+
+        lines = [
+            f"Competition: {self.name}",
+            f"Type: {self.competition_type}",
+            f"Date: {self.date}",
+            "Rankings:"
+        ]
+        # Group players by rank to handle ties
+        rank_groups = {}
+        for result in self.results:
+            if result.rank not in rank_groups:
+                rank_groups[result.rank] = []
+            rank_groups[result.rank].append(result)
+
+        for rank in sorted(rank_groups.keys()):
+            for player in rank_groups[rank]:
+                score_str = f" (Score: {player.score})" if player.score is not None else ""
+                lines.append(f"{rank}. {player.player_name}{score_str}")
+        return "\n".join(lines) + "\n"
+
+    @property
+    def live(self) -> bool:
+        return self.mode == "live"
+
+    def live_totals(self) -> Dict[str, List[float]]:
+        """Running [matches played, points] per player, kept up to date as matches are added"""
+        if self._live_totals is None:
+            self._live_totals = {}
+            self.add_live_totals(self.results)
+        return self._live_totals
+
+    def add_live_totals(self, matches: List[DirectMatch]):
+        if self._live_totals is None:
+            return  # built from all results on first use
+        for match in matches:
+            for name, points in ((match.player_a, match.result), (match.player_b, 1 - match.result)):
+                totals = self._live_totals.setdefault(name, [0, 0.0])
+                totals[0] += 1
+                totals[1] += points
+
+    def to_dict(self, with_results: bool = True):
+        data = {
             "competition_id": self.competition_id,
             "name": self.name,
             "date": self.date,
             "competition_type": self.competition_type,
             "format_type": self.format_type,
-            "results": [r.to_dict() for r in self.results],
             "processed": self.processed
         }
+        if with_results:
+            data["results"] = [r.to_dict() for r in self.results]
+        if self.mode:
+            data["mode"] = self.mode
+        return data
+
+class DateIndex:
+    """Competition ids kept sorted by (date, submission order)."""
+    def __init__(self):
+        self._keys: List[Tuple[str, int, str]] = []  # (date, sequence, competition_id)
+        self._key_of: Dict[str, Tuple[str, int, str]] = {}
+        self._sequence = 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, competition_id: str, date: str):
+        self.remove(competition_id)
+        key = (date, self._sequence, competition_id)
+        self._sequence += 1
+        insort(self._keys, key)
+        self._key_of[competition_id] = key
+
+    def remove(self, competition_id: str):
+        key = self._key_of.pop(competition_id, None)
+        if key is not None:
+            del self._keys[bisect_left(self._keys, key)]
+
+    def ids(self, since: Optional[str] = None, until: Optional[str] = None) -> List[str]:
+        """Ids of competitions dated within [since, until], oldest first"""
+        start = bisect_left(self._keys, (since,)) if since is not None else 0
+        end = bisect_right(self._keys, (until, float('inf'))) if until is not None else len(self._keys)
+        return [competition_id for _, _, competition_id in self._keys[start:end]]
+
+    def newest_first(self) -> Iterator[str]:
+        for _, _, competition_id in reversed(self._keys):
+            yield competition_id
+
+class ParticipantIndex:
+    """
+    Ids of the competitions each player takes part in, per competition type. A
+    type's entries are built from its competitions' results on first use (so lazy
+    backends load no results at startup) and kept up to date as results are added.
+    """
+    def __init__(self):
+        self._competitions: Dict[str, Dict[str, Set[str]]] = {}  # type -> player -> competition ids
+
+    def built(self, competition_type: str) -> bool:
+        return competition_type in self._competitions
+
+    def start(self, competition_type: str):
+        self._competitions[competition_type] = {}
+
+    def add(self, competition_type: str, competition_id: str, names: Iterable[str]):
+        players = self._competitions.get(competition_type)
+        if players is None:
+            return  # built from the results when first used
+        for name in names:
+            players.setdefault(name, set()).add(competition_id)
+
+    def remove(self, competition_type: str, competition_id: str, names: Iterable[str]):
+        players = self._competitions.get(competition_type)
+        if players is None:
+            return
+        for name in names:
+            players.get(name, set()).discard(competition_id)
+
+    def competitions(self, competition_type: str, name: str) -> Set[str]:
+        return self._competitions.get(competition_type, {}).get(name, set())
+
+class HeadToHeadIndex:
+    """
+    Win/draw/loss record and last meeting of every pair of players, per competition
+    type. Every implied pairing of a leaderboard and every direct match counts as a
+    meeting. A type's records are built from its processed competitions on first
+    use and kept up to date as competitions are processed; records are immutable
+    tuples replaced on update, so readers need no lock.
+    """
+    def __init__(self):
+        # competition_type -> (name_a, name_b) with name_a < name_b ->
+        # (a's wins, draws, a's losses, last date, last competition_id, a's last result)
+        self._records: Dict[str, Dict[Tuple[str, str], Tuple[int, int, int, str, str, float]]] = {}
+        self._counted: Dict[str, Set[str]] = {}  # competition_type -> ids of the competitions counted
+
+    def built(self, competition_type: str) -> bool:
+        return competition_type in self._records
+
+    def start(self, competition_type: str):
+        """Begin (or restart) a type's records; only competitions added afterwards count"""
+        self._records[competition_type] = {}
+        self._counted[competition_type] = set()
+
+    def discard(self, competition_type: str):
+        """Forget a type's records, e.g. after a competition's results were reopened for editing"""
+        self._records.pop(competition_type, None)
+        self._counted.pop(competition_type, None)
+
+    def add(self, competition: Competition):
+        """Count a processed competition once; ignored while its type's records are not built"""
+        counted = self._counted.get(competition.competition_type)
+        if counted is None or competition.competition_id in counted:
+            return
+        counted.add(competition.competition_id)
+        records = self._records[competition.competition_type]
+        meetings = []
+        if competition.format_type == "leaderboard":
+            results = competition.results
+            if len(results) >= 2:
+                outcome = ELOCalculator.field_outcomes(
+                    [r.rank for r in results], [r.score for r in results],
+                    lower_score_is_better(competition.competition_type))
+                rows, cols = np.triu_indices(len(results), k=1)
+                names = [r.player_name for r in results]
+                meetings = zip([names[i] for i in rows.tolist()], [names[j] for j in cols.tolist()],
+                               outcome[rows, cols].tolist())
+        else:
+            meetings = ((match.player_a, match.player_b, match.result) for match in competition.results)
+        for player_a, player_b, result in meetings:
+            self._record(records, player_a, player_b, result, competition.date, competition.competition_id)
+
+    def add_matches(self, competition: Competition, matches: List[DirectMatch]):
+        """Count matches added to an already counted (live) competition"""
+        if competition.competition_id not in self._counted.get(competition.competition_type, ()):
+            return
+        records = self._records[competition.competition_type]
+        for match in matches:
+            self._record(records, match.player_a, match.player_b, match.result,
+                         competition.date, competition.competition_id)
+
+    @staticmethod
+    def _record(records: Dict, player_a: str, player_b: str, result: float, date: str, competition_id: str):
+        if player_a == player_b:
+            return
+        if player_a > player_b:
+            player_a, player_b, result = player_b, player_a, 1 - result
+        wins, draws, losses, last_date, last_id, last_result = records.get(
+            (player_a, player_b), (0, 0, 0, "", "", 0.0))
+        if result > 0.5:
+            wins += 1
+        elif result < 0.5:
+            losses += 1
+        else:
+            draws += 1
+        if date >= last_date:
+            last_date, last_id, last_result = date, competition_id, result
+        records[(player_a, player_b)] = (wins, draws, losses, last_date, last_id, last_result)
+
+    def record(self, competition_type: str, player_a: str, player_b: str) -> Optional[Dict]:
+        """Player A's record against player B, or None if they never met"""
+        records = self._records.get(competition_type, {})
+        swapped = player_a > player_b
+        entry = records.get((player_b, player_a) if swapped else (player_a, player_b))
+        if entry is None:
+            return None
+        wins, draws, losses, date, competition_id, result = entry
+        if swapped:
+            wins, losses, result = losses, wins, 1 - result
+        return {
+            "player_a": player_a,
+            "player_b": player_b,
+            "wins": wins,
+            "draws": draws,
+            "losses": losses,
+            "meetings": wins + draws + losses,
+            "last_meeting": {"competition_id": competition_id, "date": date, "result": result}
+        }
+
+def rate_competitions(system: RatingSystem, competition_type: str, competitions: List[Tuple[str, str, str, List, bool]]
+                      ) -> Dict[str, Tuple[List[Tuple[str, str, int]], Tuple[float, ...]]]:
+    """
+    Rate (competition_id, date, format_type, results, sequential) tuples of one type in order,
+    starting every player at the initial rating. Returns each player's new
+    (competition_id, date, rating) history entries and final rating system state.
+    Pure, so it can run in a worker process.
+    """
+    lower_is_better = lower_score_is_better(competition_type)
+    states: Dict[str, State] = {}
+    histories: Dict[str, List[Tuple[str, str, int]]] = {}
+    initial_state = (INITIAL_RATING, system.initial_params())
+    for competition_id, date, format_type, results, sequential in competitions:
+        if format_type == "leaderboard":
+            initial = {result.player_name: states.get(result.player_name, initial_state) for result in results}
+            final = system.rate_leaderboard(initial, results, lower_is_better)
+        else:
+            players = set()
+            for match in results:
+                players.add(match.player_a)
+                players.add(match.player_b)
+            initial = {player: states.get(player, initial_state) for player in players}
+            final = system.rate_matches(initial, results, sequential)
+        for player, state in final.items():
+            states[player] = state
+            histories.setdefault(player, []).append((competition_id, date, state[0]))
+    return {player: (entries, states[player][1]) for player, entries in histories.items()}
+
+def _rate_type(task: Tuple[RatingSystem, str, List[Tuple[str, str, str, List, bool]]]):
+    """rate_competitions for one (system, competition_type, competitions) task of map_in_workers"""
+    return rate_competitions(*task)
 
 class CompetitionManager:
-    def __init__(self, data_dir="data"):
+    def __init__(self, data_dir="data", storage="json"):
+        """
+        storage: backend name ("json" or "sqlite") or a storage instance shared
+        with the PlayerManager
+        """
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(exist_ok=True)
-        self.competitions_file = self.data_dir / "competitions.json"
+        self.storage = open_storage(storage, data_dir) if isinstance(storage, str) else storage
         self.results_dir = self.data_dir / "results"
         self.results_dir.mkdir(exist_ok=True)
         
         self.competitions: Dict[str, Competition] = {}
+        self.competition_types: Set[str] = set()  # registry of all types with competitions
+        self.date_index = DateIndex()
+        self.type_indexes: Dict[str, DateIndex] = {}  # competition_type -> its competitions by date
+        self.participant_index = ParticipantIndex()
+        self.head_to_head = HeadToHeadIndex()
+        self.results_cache = LRUCache(RESULTS_CACHE_SIZE)
         self.elo_calculator = ELOCalculator()
-        self.player_manager = PlayerManager(data_dir)
+        self.rating_systems_file = self.data_dir / "rating_systems.json"
+        self.rating_systems: Dict[str, str] = {}  # competition_type -> rating system name; Elo if absent
+        if self.rating_systems_file.exists():
+            with open(self.rating_systems_file, 'r') as f:
+                self.rating_systems = json.load(f)
+        self._systems: Dict[str, RatingSystem] = {}
+        self.player_manager = PlayerManager(data_dir, storage=self.storage)
+        # Players are shared across competition types and every save rewrites whole
+        # files, so all writers serialize on the player manager's lock
+        self.lock = self.player_manager.lock
+        self._batch_depth = 0
+        self._dirty: Set[str] = set()  # ids of competitions changed since the last save
+        self._reopened: Dict[str, List[str]] = {}  # competition_id -> participants before reopening
+        # Data versions for caching readers: bumped when a batch that changed data ends
+        self.version = 0
+        self.type_versions: Dict[str, int] = {}  # competition_type -> version of its last change
+        self._changed_types: Set[str] = set()
+        self.live_feed = LiveFeed()
+        self._pending_events: List[Dict] = []  # live events published when the batch ends
         self.load_competitions()
 
+    @classmethod
+    def from_snapshot(cls, snapshot_dir, data_dir="data", storage="json", persist: bool = True) -> "CompetitionManager":
+        """
+        Start a manager from a snapshot written by snapshot.write_snapshot, reading
+        its columnar tables instead of the storage backend's files. With persist
+        (restoring or seeding a data directory) the whole state is then written to
+        the backend once; without it the backend must already hold the snapshot's
+        data, as when the snapshot was taken from it, and only later changes are saved;
+        if the backend changed since the snapshot was taken, the manager loads the
+        backend in full instead.
+        """
+        from snapshot import SnapshotStorage, read_manifest, read_snapshot
+
+        manifest = read_manifest(snapshot_dir)
+        backend = open_storage(storage, data_dir) if isinstance(storage, str) else storage
+        if not persist and manifest.get("storage_version") != backend.version():
+            return cls(data_dir, storage=backend)  # stale snapshot: saving from it would lose newer data
+        if persist:
+            Path(data_dir).mkdir(exist_ok=True)
+            write_atomic(Path(data_dir) / "rating_systems.json", json.dumps(manifest["rating_systems"], indent=2))
+        manager = cls(data_dir, storage=SnapshotStorage(read_snapshot(snapshot_dir), backend))
+        manager.storage = manager.player_manager.storage = backend
+        manager.rating_systems = dict(manifest["rating_systems"])
+        if persist:
+            with manager.lock:
+                backend.save_players(manager.player_manager.players, set(manager.player_manager.players))
+                backend.save_competitions(manager.competitions, set(manager.competitions))
+        return manager
+
+    @timed_method("elo_load_seconds", data="competitions")
     def load_competitions(self):
-        if self.competitions_file.exists():
-            with open(self.competitions_file, 'r') as f:
-                data = json.load(f)
-                for comp_data in data:
-                    competition = Competition(
-                        comp_data["competition_id"],
-                        comp_data["name"],
-                        comp_data["date"],
-                        comp_data["competition_type"],
-                        comp_data["format_type"]
-                    )
-                    if competition.format_type == "leaderboard":
-                        competition.results = [CompetitionResult.from_dict(r) for r in comp_data["results"]]
-                    else:
-                        competition.results = [DirectMatch.from_dict(r) for r in comp_data["results"]]
-                    competition.processed = comp_data["processed"]
-                    self.competitions[competition.competition_id] = competition
+        for comp_data in self.storage.load_competitions():
+            competition = Competition(
+                comp_data["competition_id"],
+                comp_data["name"],
+                comp_data["date"],
+                comp_data["competition_type"],
+                comp_data["format_type"]
+            )
+            if "results" in comp_data:
+                competition.results = competition.results_from_dicts(comp_data["results"])
+            else:
+                competition.set_results_loader(self.storage.load_competition_results)
+            competition.processed = comp_data["processed"]
+            competition.mode = comp_data.get("mode")
+            self._add_competition(competition)
+
+    def _add_competition(self, competition: Competition):
+        self.competitions[competition.competition_id] = competition
+        self.competition_types.add(competition.competition_type)
+        self.date_index.add(competition.competition_id, competition.date)
+        self.type_indexes.setdefault(competition.competition_type, DateIndex()).add(
+            competition.competition_id, competition.date)
+
+    def rating_system(self, competition_type: str) -> RatingSystem:
+        """The rating system a competition type is rated with"""
+        name = self.rating_systems.get(competition_type, EloSystem.name)
+        system = self._systems.get(name)
+        if system is None:
+            system = EloSystem(self.elo_calculator) if name == EloSystem.name else create_rating_system(name)
+            self._systems[name] = system
+        return system
+
+    @batched
+    def set_rating_system(self, competition_type: str, name: str) -> int:
+        """
+        Rate a competition type with another rating system. Existing competitions
+        of the type are reprocessed with it; returns how many.
+        """
+        system = create_rating_system(name)  # validates the name
+        if self.rating_systems.get(competition_type, EloSystem.name) == name:
+            return 0
+        if name == EloSystem.name:
+            self.rating_systems.pop(competition_type, None)
+        else:
+            self.rating_systems[competition_type] = name
+            self._systems.setdefault(name, system)
+        write_atomic(self.rating_systems_file, json.dumps(self.rating_systems, indent=2))
+        if competition_type not in self.competition_types:
+            return 0
+        return self.reprocess_competitions(competition_type)
 
+    def _rating_states(self, names, competition_type: str, system: RatingSystem) -> Dict[str, State]:
+        """Current (rating, params) of players, creating new players at the system's initial state"""
+        states = {}
+        for name in names:
+            player = self.player_manager.get_or_create_player(name, competition_type)
+            states[name] = (player.get_rating(competition_type),
+                            player.get_rating_params(competition_type) or system.initial_params())
+        return states
+
+    def _apply_states(self, competition: Competition, states: Dict[str, State]):
+        for name, (rating, params) in states.items():
+            self.player_manager.update_player_rating(
+                name,
+                rating,
+                competition.competition_id,
+                competition.date,
+                competition.competition_type,
+                params
+            )
+
+    @timed_method("elo_save_seconds", data="competitions")
     def save_competitions(self):
-        with open(self.competitions_file, 'w') as f:
-            json.dump([c.to_dict() for c in self.competitions.values()], f, indent=2)
+        self.storage.save_competitions(self.competitions, self._dirty)
+        self._dirty.clear()
+
+    def mark_dirty(self, competition_id: str):
+        """Record a changed competition, saving immediately unless inside a batch"""
+        with self.lock:
+            self._dirty.add(competition_id)
+            self._changed_types.add(self.competitions[competition_id].competition_type)
+            if self._batch_depth == 0:
+                self.save_competitions()
+                self._bump_versions()
+
+    def _bump_versions(self):
+        if self._changed_types:
+            self.version += 1
+            for competition_type in self._changed_types:
+                self.type_versions[competition_type] = self.version
+            self._changed_types.clear()
+
+    def data_version(self, competition_type: Optional[str] = None) -> int:
+        """
+        Counter that changes whenever the data (of one competition type) changes.
+        It is bumped only after the changed ratings are published, so a response
+        rendered under a version never shows older data than that version.
+        """
+        if competition_type is None:
+            return self.version
+        return self.type_versions.get(competition_type, 0)
+
+    @contextmanager
+    def batch(self):
+        """
+        Defer writing competitions and players until the outermost batch exits,
+        so processing many results rewrites each data file only once. The batch
+        holds the writer lock for its whole duration.
+        """
+        with self.lock:
+            try:
+                with self.player_manager.batch():
+                    self._batch_depth += 1
+                    try:
+                        yield self
+                    finally:
+                        self._batch_depth -= 1
+                        if self._batch_depth == 0 and self._dirty:
+                            self.save_competitions()
+            finally:
+                if self._batch_depth == 0:
+                    self._bump_versions()
+                    self._publish_events()
+
+    def _publish_events(self):
+        events, self._pending_events = self._pending_events, []
+        for event in events:
+            self.live_feed.publish(event)
 
-    def create_competition(self, name: str, date: str, competition_type: str, format_type: str = "leaderboard") -> str:
-        competition_id = f"{competition_type}_{name.lower().replace(' ', '_')}_{date}"
+    @batched
+    def create_competition(self, name: str, date: str, competition_type: str, format_type: str = "leaderboard",
+                           mode: Optional[str] = None) -> str:
+        """
+        mode (direct matches only): "sequential" rates each match from the ratings
+        left by the previous one; "live" also rates every match as soon as it is added
+        """
+        competition_id = make_competition_id(name, date, competition_type)
+        if format_type not in FORMAT_TYPES:
+            raise ValueError(f"Unknown format type: {format_type}")
+        if mode is not None:
+            if mode not in COMPETITION_MODES:
+                raise ValueError(f"Unknown competition mode: {mode}")
+            if format_type != "direct_matches":
+                raise ValueError("Only direct match competitions can be sequential or live")
+        if mode == "live" and self.latest_processed_date(competition_type, default="") > date:
+            raise ValueError("A live competition cannot be dated before processed competitions")
         competition = Competition(competition_id, name, date, competition_type, format_type)
-        self.competitions[competition_id] = competition
-        self.save_competitions()
+        competition.mode = mode
+        if mode == "live":
+            competition.processed = True  # rated match by match from now on
+        self._add_competition(competition)
+        if mode == "live":
+            self.head_to_head.add(competition)
+        self.mark_dirty(competition_id)
         return competition_id
 
+    @batched
     def add_leaderboard_results(self, competition_id: str, results: List[Tuple[str, int, Union[float, None]]]):
         """
         Add results for a leaderboard-format competition.
@@ -116,33 +615,33 @@ class CompetitionManager:
         if competition.processed:
             raise ValueError("Competition already processed")
             
+        if self.participant_index.built(competition.competition_type):
+            self.participant_index.remove(competition.competition_type, competition_id,
+                                          self.participants(competition))
         competition.results = [CompetitionResult(name, rank, score) for name, rank, score in results]
+        self.participant_index.add(competition.competition_type, competition_id,
+                                   [result.player_name for result in competition.results])
         
         # Save results to plaintext file
         results_file = self.results_dir / f"{competition_id}_results.txt"
-        with open(results_file, 'w') as f:
-            f.write(f"Competition: {competition.name}\n")
-            f.write(f"Type: {competition.competition_type}\n")
-            f.write(f"Date: {competition.date}\n")
-            f.write("Rankings:\n")
-            
-            # Group players by rank to handle ties
-            rank_groups = {}
-            for result in competition.results:
-                if result.rank not in rank_groups:
-                    rank_groups[result.rank] = []
-                rank_groups[result.rank].append(result)
-            
-            for rank in sorted(rank_groups.keys()):
-                players = rank_groups[rank]
-                for player in players:
-                    score_str = f" (Score: {player.score})" if player.score is not None else ""
-                    f.write(f"{rank}. {player.player_name}{score_str}\n")
+        text = competition.results_text()
+        write_atomic(results_file, text)
+        inc("elo_storage_bytes_written_total", len(text.encode()), file="results")
+        self.results_cache.invalidate(competition_id)
 
-        self.save_competitions()
+        self.mark_dirty(competition_id)
 
     def add_direct_match(self, competition_id: str, player_a: str, player_b: str, result: float):
         """Add a direct match result (1 for A wins, 0.5 for draw, 0 for B wins)"""
+        self.add_direct_matches(competition_id, [(player_a, player_b, result)])
+
+    @batched
+    def add_direct_matches(self, competition_id: str, matches: List[Tuple[str, str, float]]):
+        """
+        Add several direct match results at once, appending them to the results
+        file in a single write.
+        matches: List of tuples (player_a, player_b, result)
+        """
         if competition_id not in self.competitions:
             raise ValueError("Competition not found")
             
@@ -150,19 +649,96 @@ class CompetitionManager:
         if competition.format_type != "direct_matches":
             raise ValueError("Competition is not a direct match format")
             
-        if competition.processed:
+        if competition.processed and not competition.live:
             raise ValueError("Competition already processed")
             
-        match = DirectMatch(player_a, player_b, result)
-        competition.results.append(match)
+        new_matches = [DirectMatch(player_a, player_b, result) for player_a, player_b, result in matches]
+        rate_now = competition.live and competition.processed
+        if rate_now:
+            competition.live_totals()  # running totals of the matches rated so far
+        competition.results.extend(new_matches)
+        self.participant_index.add(competition.competition_type, competition_id,
+                                   [name for match in new_matches for name in (match.player_a, match.player_b)])
         
-        # Save match to plaintext file
+        # Save matches to plaintext file
         results_file = self.results_dir / f"{competition_id}_results.txt"
+        text = "".join(f"{match.describe()}\n" for match in new_matches)
         with open(results_file, 'a') as f:
-            result_str = "won against" if result == 1 else "drew with" if result == 0.5 else "lost to"
-            f.write(f"{player_a} {result_str} {player_b}\n")
+            f.write(text)
+        inc("elo_storage_bytes_written_total", len(text.encode()), file="results")
+        self.results_cache.invalidate(competition_id)
+        if rate_now:
+            self._rate_live(competition, new_matches)
+        else:
+            competition.add_live_totals(new_matches)
             
-        self.save_competitions()
+        self.mark_dirty(competition_id)
+
+    def _rate_live(self, competition: Competition, matches: List[DirectMatch]):
+        """Apply each new match of a live competition to the current ratings, O(1) per match"""
+        competition_type = competition.competition_type
+        system = self.rating_system(competition_type)
+        self.head_to_head.add_matches(competition, matches)
+        totals = competition.live_totals()
+        for match in matches:
+            competition.add_live_totals([match])
+            names = [match.player_a, match.player_b]
+            before = self._rating_states(names, competition_type, system)
+            after = system.rate_matches(before, [match], sequential=True)
+            for name, (rating, params) in after.items():
+                player = self.player_manager.players[name]
+                player.set_rating_params(competition_type, params)
+                player.set_rating(competition_type, rating)
+                player.update_competition_result(competition_type, competition.competition_id,
+                                                 competition.date, rating)
+                self.player_manager.mark_dirty(name)
+            self._pending_events.append({
+                "event": "match",
+                "competition_id": competition.competition_id,
+                "competition_type": competition_type,
+                "match": match.to_dict(),
+                "players": {
+                    name: {"rating": after[name][0], "change": after[name][0] - before[name][0],
+                           "played": totals[name][0], "points": totals[name][1]}
+                    for name in names
+                }
+            })
+
+    @batched
+    def finish_competition(self, competition_id: str) -> int:
+        """
+        End a live competition; no more matches can be added. If competitions of
+        its type dated on or after it were processed meanwhile, the competition
+        and everything after it are re-rated, so ratings match a full reprocess.
+        Returns the number of competitions re-rated.
+        """
+        competition = self.competitions[competition_id]
+        if not competition.live:
+            raise ValueError("Competition is not live")
+        competition.mode = "sequential"
+        self.mark_dirty(competition_id)
+        replayed = 0
+        later = self.ordered_competitions(competition.competition_type, competition.date)
+        if any(c.processed and c is not competition for c in later):
+            # Its matches were rated on top of the later competitions; replay it before them
+            competition.processed = False
+            replayed = self.rerate_from(competition.competition_type, competition.date)
+        self._pending_events.append({"event": "finished", "competition_id": competition_id,
+                                     "competition_type": competition.competition_type})
+        return replayed
+
+    def live_standings(self, competition_id: str) -> List[Dict]:
+        """Participants of a direct match competition with their current rating and running totals"""
+        competition = self.competitions[competition_id]
+        with self.lock:  # totals change while matches are added
+            totals = {name: tuple(entry) for name, entry in competition.live_totals().items()}
+        view = self.player_manager.rating_view(competition.competition_type)
+        standings = []
+        for name, (played, points) in totals.items():
+            rating = view.rating_of(name) if view else None
+            standings.append({"name": name, "rating": rating, "played": played, "points": points})
+        standings.sort(key=lambda s: (-s["points"], s["name"]))
+        return standings
 
     def determine_match_result(self, competition_id: str, player_a_rank: int, player_b_rank: int, 
                              player_a_score: Union[float, None], player_b_score: Union[float, None]) -> float:
@@ -171,13 +747,14 @@ class CompetitionManager:
             return 0.5  # Tie
         elif player_a_score is not None and player_b_score is not None:
             # For golf, lower score is better
-            if self.competitions[competition_id].competition_type == "golf":
+            if lower_score_is_better(self.competitions[competition_id].competition_type):
                 return 1.0 if player_a_score < player_b_score else 0.0
             # For most other sports, higher score is better
             return 1.0 if player_a_score > player_b_score else 0.0
         # If no scores available, use ranks
         return 1.0 if player_a_rank < player_b_rank else 0.0
 
+    @batched
     def process_leaderboard_competition(self, competition_id: str):
         """Process all head-to-head matches implied by a leaderboard competition."""
         competition = self.competitions[competition_id]
@@ -185,56 +762,21 @@ class CompetitionManager:
             return
             
         # Store initial ratings for all players
-        initial_ratings = {
-            result.player_name: self.player_manager.get_or_create_player(
-                result.player_name, competition.competition_type
-            ).get_rating(competition.competition_type)
-            for result in competition.results
-        }
+        system = self.rating_system(competition.competition_type)
+        initial_states = self._rating_states(
+            [result.player_name for result in competition.results], competition.competition_type, system)
 
-        # Process each implied head-to-head match
-        total_rating_changes = {player: 0 for player in initial_ratings}
-        for i, player_a_result in enumerate(competition.results):
-            for player_b_result in competition.results[i+1:]:
-                result = self.determine_match_result(
-                    competition_id,
-                    player_a_result.rank, player_b_result.rank,
-                    player_a_result.score, player_b_result.score
-                )
-                
-                rating_change_a, rating_change_b = self.elo_calculator.process_match(
-                    initial_ratings[player_a_result.player_name],
-                    initial_ratings[player_b_result.player_name],
-                    result
-                )
-                
-                # Calculate rating changes from initial ratings
-                change_a = rating_change_a - initial_ratings[player_a_result.player_name]
-                change_b = rating_change_b - initial_ratings[player_b_result.player_name]
-                
-                # Accumulate changes
-                total_rating_changes[player_a_result.player_name] += change_a
-                total_rating_changes[player_b_result.player_name] += change_b
-
-        # Apply total rating changes to initial ratings
-        final_ratings = {
-            player: initial_ratings[player] + total_rating_changes[player]
-            for player in initial_ratings
-        }
+        final_states = system.rate_leaderboard(initial_states, competition.results,
+                                               lower_score_is_better(competition.competition_type))
 
         # Update all players' final ratings
-        for player_name, final_rating in final_ratings.items():
-            self.player_manager.update_player_rating(
-                player_name,
-                final_rating,
-                competition_id,
-                competition.date,
-                competition.competition_type
-            )
+        self._apply_states(competition, final_states)
 
         competition.processed = True
-        self.save_competitions()
+        self.head_to_head.add(competition)
+        self.mark_dirty(competition_id)
 
+    @batched
     def process_direct_matches(self, competition_id: str):
         """Process a competition consisting of direct matches."""
         competition = self.competitions[competition_id]
@@ -247,74 +789,342 @@ class CompetitionManager:
             players.add(match.player_a)
             players.add(match.player_b)
             
-        initial_ratings = {
-            player: self.player_manager.get_or_create_player(
-                player, competition.competition_type
-            ).get_rating(competition.competition_type)
-            for player in players
-        }
+        system = self.rating_system(competition.competition_type)
+        initial_states = self._rating_states(players, competition.competition_type, system)
 
-        # Process each match using initial ratings
-        final_ratings = initial_ratings.copy()
-        for match in competition.results:
-            new_rating_a, new_rating_b = self.elo_calculator.process_match(
-                initial_ratings[match.player_a],
-                initial_ratings[match.player_b],
-                match.result
-            )
-            final_ratings[match.player_a] = new_rating_a
-            final_ratings[match.player_b] = new_rating_b
+        # Process the matches (Elo rates each one from the initial ratings and sums
+        # the changes, unless sequential)
+        final_states = system.rate_matches(initial_states, competition.results, competition.mode is not None)
 
         # Update all players' final ratings
-        for player, rating in final_ratings.items():
-            self.player_manager.update_player_rating(
-                player,
-                rating,
-                competition_id,
-                competition.date,
-                competition.competition_type
-            )
+        self._apply_states(competition, final_states)
 
         competition.processed = True
-        self.save_competitions()
+        self.head_to_head.add(competition)
+        self.mark_dirty(competition_id)
+
+    def query_competitions(self, competition_type: Optional[str] = None, since: Optional[str] = None,
+                           until: Optional[str] = None, offset: int = 0, limit: Optional[int] = None,
+                           newest_first: bool = True) -> Tuple[int, List[Competition]]:
+        """
+        Page through competitions dated within [since, until] using the date index.
+        Returns the number of matching competitions and the requested page.
+        """
+        if competition_type:
+            index = self.type_indexes.get(competition_type)
+            ids = index.ids(since, until) if index else []
+        else:
+            ids = self.date_index.ids(since, until)
+        if newest_first:
+            ids.reverse()
+        stop = None if limit is None else offset + limit
+        return len(ids), [self.competitions[cid] for cid in ids[offset:stop]]
+
+    def participants(self, competition: Competition) -> List[str]:
+        """Names of all players in a competition, in order of appearance"""
+        if competition.format_type == "leaderboard":
+            names = [result.player_name for result in competition.results]
+        else:
+            names = [name for match in competition.results for name in (match.player_a, match.player_b)]
+        return list(dict.fromkeys(names))
+
+    def ordered_competitions(self, competition_type: Optional[str] = None,
+                             since: Optional[str] = None) -> List[Competition]:
+        """
+        Competitions of a type (or all types) dated on or after `since`, in processing
+        order (by date, then submission order), read from the date indexes
+        """
+        index = self.date_index if competition_type is None else self.type_indexes.get(competition_type)
+        return [self.competitions[cid] for cid in index.ids(since)] if index else []
+
+    def latest_processed_date(self, competition_type: str, default: Optional[str] = None) -> Optional[str]:
+        """Date of the newest processed competition of a type, searched from the newest end"""
+        index = self.type_indexes.get(competition_type)
+        if index is not None:
+            with self.lock:
+                for competition_id in index.newest_first():
+                    competition = self.competitions[competition_id]
+                    if competition.processed:
+                        return competition.date
+        return default
+
+    def player_competitions(self, competition_type: str, name: str) -> Set[str]:
+        """Ids of the competitions of a type a player takes part in"""
+        if not self.participant_index.built(competition_type):
+            with self.lock:
+                if not self.participant_index.built(competition_type):
+                    self.participant_index.start(competition_type)
+                    for competition in self.ordered_competitions(competition_type):
+                        self.participant_index.add(competition_type, competition.competition_id,
+                                                   self.participants(competition))
+        return self.participant_index.competitions(competition_type, name)
+
+    def _process(self, competition: Competition):
+        if competition.format_type == "leaderboard":
+            self.process_leaderboard_competition(competition.competition_id)
+        else:
+            self.process_direct_matches(competition.competition_id)
+
+    @batched
+    def process_competition(self, competition_id: str) -> int:
+        """
+        Process a competition of either format. A back-dated or reopened competition
+        re-rates from its date, replacing its earlier effect on ratings.
+        Returns the number of competitions processed.
+        """
+        competition = self.competitions[competition_id]
+        if competition.processed:
+            return 0
+        if (competition_id in self._reopened
+                or self.latest_processed_date(competition.competition_type, default="") > competition.date):
+            return self.rerate_from(competition.competition_type, competition.date)
+        self._process(competition)
+        return 1
+
+    @batched
+    def reopen_competition(self, competition_id: str):
+        """
+        Mark a processed competition as unprocessed so its results can be edited
+        (replaced with add_leaderboard_results or extended with add_direct_match).
+        Ratings are corrected by the next process_competition or rerate_from call.
+        """
+        competition = self.competitions[competition_id]
+        if not competition.processed:
+            return
+        self._reopened[competition_id] = self.participants(competition)
+        competition.processed = False
+        self.head_to_head.discard(competition.competition_type)  # rebuilt with the edited results
+        self.mark_dirty(competition_id)
+
+    @batched
+    def rerate_from(self, competition_type: str, since_date: str,
+                    progress: Optional[Callable[[int, int], None]] = None) -> int:
+        """
+        Re-rate competitions of a type dated on or after since_date without
+        touching earlier ratings. Each player's history acts as the rating
+        checkpoint: before a player's first replayed competition, their history
+        is truncated and their rating restored to the last remaining entry.
+        Unprocessed competitions are replayed, and so is every later competition
+        involving a player of an already replayed competition (whether or not their
+        rating actually changed); these are found from the participant index, so
+        the results of other competitions are not read. Returns the number of
+        competitions replayed.
+        progress, if given, is called with (competitions checked, total).
+
+        Rating systems with extra per-player state (Glicko-2, Plackett-Luce) keep
+        no checkpoint of it in the history, so their types are reprocessed whole.
+        """
+        if self.rating_system(competition_type).has_params:
+            return self.reprocess_competitions(competition_type, progress)
+        ordered = self.ordered_competitions(competition_type, since_date)
+        position = {c.competition_id: i for i, c in enumerate(ordered)}
+        affected: Set[str] = set()
+        involved: Set[int] = set()  # positions of competitions with an affected player
+        replayed = 0
+        for i, competition in enumerate(ordered):
+            if progress:
+                progress(i, len(ordered))
+            reopened = self._reopened.pop(competition.competition_id, [])
+            if competition.processed and i not in involved and affected.isdisjoint(reopened):
+                continue
+            for name in self.participants(competition) + reopened:
+                if name in affected:
+                    continue
+                affected.add(name)
+                involved.update(position[cid] for cid in self.player_competitions(competition_type, name)
+                                if cid in position)
+                player = self.player_manager.players.get(name)
+                if player is None:
+                    continue
+                history = player.competition_history.get(competition_type) or RatingHistory()
+                keep = next((k for k, history_id in enumerate(history.competition_ids())
+                             if position.get(history_id, -1) >= i), len(history))
+                player.rewind_history(competition_type, keep)
+                self.player_manager.mark_dirty(name)
+            competition.processed = False
+            self._process(competition)
+            replayed += 1
+        if progress:
+            progress(len(ordered), len(ordered))
+        return replayed
+
+    def head_to_head_record(self, competition_type: str, player_a: str, player_b: str) -> Optional[Dict]:
+        """
+        Player A's wins, draws and losses against player B in a competition type and
+        their last meeting, or None if they never met. O(1) once the type's
+        head-to-head records are built.
+        """
+        if not self.head_to_head.built(competition_type):
+            with self.lock:
+                if not self.head_to_head.built(competition_type):
+                    self.head_to_head.start(competition_type)
+                    for competition in self.ordered_competitions(competition_type):
+                        if competition.processed:
+                            self.head_to_head.add(competition)
+        return self.head_to_head.record(competition_type, player_a, player_b)
+
+    def _published_ratings(self, competition_type: str, names: List[str]) -> np.ndarray:
+        """Published ratings of players; unrated players count at the initial rating"""
+        view = self.player_manager.rating_view(competition_type)
+        ratings = [view.rating_of(name) if view else None for name in names]
+        return np.array([INITIAL_RATING if r is None else r for r in ratings], dtype=float)
+
+    def _prediction_states(self, competition_type: str, names: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Published ratings of players and their rating system parameters, one row
+        per player; unrated players have the system's initial parameters
+        """
+        ratings = self._published_ratings(competition_type, names)
+        system = self.rating_system(competition_type)
+        initial = system.initial_params()
+        if not system.has_params:
+            return ratings, np.empty((len(names), 0))
+        players = self.player_manager.players
+        with self.lock:  # parameters change as competitions are rated
+            params = [(players[name].get_rating_params(competition_type) if name in players else ()) or initial
+                      for name in names]
+        return ratings, np.array(params, dtype=float).reshape(len(names), len(initial))
+
+    def win_probabilities(self, competition_type: str, players: List[str]) -> Tuple[List[int], np.ndarray]:
+        """
+        Current ratings of the players and the matrix of expected scores under the
+        type's rating system, probabilities[i, j] = expected score of player i
+        against player j, in one vectorized pass.
+        """
+        ratings, params = self._prediction_states(competition_type, players)
+        probabilities = self.rating_system(competition_type).expected_scores(
+            ratings[:, None], params[:, None], ratings[None, :], params[None, :])
+        return ratings.astype(int).tolist(), probabilities
+
+    def predict_matches(self, competition_type: str, pairs: List[Tuple[str, str]]) -> List[float]:
+        """
+        Expected score of player A against player B for each (player_a, player_b)
+        pair, under the type's rating system
+        """
+        if not pairs:
+            return []
+        ratings_a, params_a = self._prediction_states(competition_type, [a for a, _ in pairs])
+        ratings_b, params_b = self._prediction_states(competition_type, [b for _, b in pairs])
+        return self.rating_system(competition_type).expected_scores(ratings_a, params_a, ratings_b, params_b).tolist()
+
+    def _simulation_calculator(self, competition_type: str) -> ELOCalculator:
+        """The simulations sample and rate outcomes with Elo, so other systems are refused"""
+        system = self.rating_system(competition_type)
+        if not isinstance(system, EloSystem):
+            raise ValueError(f"Simulations need an Elo type; {competition_type} uses {system.name}")
+        return system.calculator
+
+    def simulate_leaderboard(self, competition_type: str, players: List[str], simulations: int = 10000,
+                             seed: Optional[int] = None, workers: Optional[int] = None) -> Projection:
+        """
+        Monte Carlo projection of a leaderboard competition between the players from
+        their published ratings: place probabilities and expected Elo rating changes.
+        Nothing is rated or saved.
+        """
+        calculator = self._simulation_calculator(competition_type)
+        names = list(dict.fromkeys(players))
+        ratings = dict(zip(names, self._published_ratings(competition_type, names).tolist()))
+        return simulate_leaderboard(ratings, simulations, calculator, seed, workers)
+
+    def simulate_matches(self, competition_type: str, schedule: List[Tuple[str, str]], simulations: int = 10000,
+                         sequential: bool = False, seed: Optional[int] = None,
+                         workers: Optional[int] = None) -> Projection:
+        """Monte Carlo projection of a schedule of (player_a, player_b) direct matches; nothing is saved"""
+        calculator = self._simulation_calculator(competition_type)
+        names = list(dict.fromkeys(name for pair in schedule for name in pair))
+        ratings = dict(zip(names, self._published_ratings(competition_type, names).tolist()))
+        return simulate_matches(ratings, schedule, simulations, calculator, sequential, seed, workers)
 
     def get_competition_results(self, competition_id: str) -> str:
-        """Get the plaintext results for a competition."""
-        results_file = self.results_dir / f"{competition_id}_results.txt"
-        if results_file.exists():
-            with open(results_file, 'r') as f:
-                return f.read()
-        return None
+        """
+        Get the plaintext results for a competition. The text is generated from
+        the in-memory results and kept in a bounded LRU cache, so no results file
+        is read.
+        """
+        text = self.results_cache.get(competition_id)
+        if text is None:
+            # Fill the cache under the writer lock so a concurrent edit cannot be
+            # overwritten with text generated from the old results
+            with self.lock:
+                competition = self.competitions.get(competition_id)
+                text = competition.results_text() if competition and competition.results else None
+                if text is not None:
+                    self.results_cache.put(competition_id, text)
+        return text
 
-    def reprocess_competitions(self, competition_type: str = None):
+    @batched
+    def reprocess_competitions(self, competition_type: str = None,
+                               progress: Optional[Callable[[int, int], None]] = None,
+                               workers: Optional[int] = None):
         """
         Reprocess all competitions for a given type (or all types) in chronological order.
         This resets all player ratings to their initial values and processes competitions by date.
+        Returns the number of competitions processed. progress, if given, is called
+        with (competitions processed, total).
+
+        Competition types are rated independently, so a large reprocess of all types
+        rates the types on the shared worker processes (at most `workers` at a time,
+        default the CPU count; 1 disables this) and merges the results.
         """
         # Reset all player ratings
-        for player in self.player_manager.players.values():
-            if competition_type:
-                if competition_type in player.ratings:
-                    player.ratings[competition_type] = 1500
-                    player.competition_history[competition_type] = []
-            else:
-                player.ratings = {ct: 1500 for ct in player.ratings.keys()}
-                player.competition_history = {ct: [] for ct in player.competition_history.keys()}
-        
-        # Get competitions to reprocess
-        competitions = []
-        for comp in self.competitions.values():
-            if not competition_type or comp.competition_type == competition_type:
-                comp.processed = False
-                competitions.append(comp)
+        self.player_manager.reset_ratings(competition_type)
         
-        # Sort by date and reprocess
-        competitions.sort(key=lambda x: x.date)
+        # Competitions to reprocess, in date order from the date indexes
+        competitions = self.ordered_competitions(competition_type or None)
         for comp in competitions:
-            if comp.format_type == "leaderboard":
-                self.process_leaderboard_competition(comp.competition_id)
-            else:
-                self.process_direct_matches(comp.competition_id)
+            comp.processed = False
+            self.mark_dirty(comp.competition_id)
+        
+        workers = workers or os.cpu_count() or 1
+        types = {comp.competition_type for comp in competitions}
+        if (competition_type is None and workers > 1 and len(types) > 1
+                and len(competitions) >= PARALLEL_MIN_COMPETITIONS):
+            self._reprocess_parallel(competitions, min(workers, len(types)), progress)
+            self._reopened.clear()
+            self.player_manager.save_players()
+            return len(competitions)
+        for i, comp in enumerate(competitions):
+            if progress:
+                progress(i, len(competitions))
+            self._process(comp)
+        if progress:
+            progress(len(competitions), len(competitions))
+        self._reopened.clear()
         
         # Save updated player data
         self.player_manager.save_players()
+        return len(competitions)
+
+    def _reprocess_parallel(self, competitions: List[Competition], workers: int,
+                            progress: Optional[Callable[[int, int], None]] = None):
+        """
+        Rate date-ordered, reset competitions one type per worker process; the
+        workers only compute, and the histories they send back are applied here
+        under the writer lock
+        """
+        by_type: Dict[str, List[Tuple[str, str, str, List, bool]]] = {}
+        for comp in competitions:
+            # Create new players in the order the sequential path would
+            for name in self.participants(comp):
+                self.player_manager.get_or_create_player(name, comp.competition_type)
+            by_type.setdefault(comp.competition_type, []).append(
+                (comp.competition_id, comp.date, comp.format_type, comp.results, comp.mode is not None))
+
+        rated = map_in_workers(
+            _rate_type, [(self.rating_system(ct), ct, entries) for ct, entries in by_type.items()], workers)
+        done = 0
+        for competition_type, players in zip(by_type, rated):
+            for name, (entries, params) in players.items():
+                player = self.player_manager.players[name]
+                for competition_id, date, rating in entries:
+                    player.add_competition_result(competition_type, competition_id, date, rating)
+                player.set_rating_params(competition_type, params)
+                player.set_rating(competition_type, entries[-1][2])
+                self.player_manager.mark_dirty(name)
+            done += len(by_type[competition_type])
+            if progress:
+                progress(done, len(competitions))
+
+        for comp in competitions:
+            comp.processed = True
+            self.head_to_head.add(comp)
@@ -1,10 +1,34 @@
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from metrics import inc, timed_method
+
+# Expected scores for every integer rating difference in [-EXPECTED_TABLE_RANGE,
+# EXPECTED_TABLE_RANGE], computed once with the closed form below. Ratings are
+# integers, so nearly every lookup hits the table; other differences use the
+# closed form, which keeps results bit-identical to computing every score.
+EXPECTED_TABLE_RANGE = 4000
+
+def _expected(diff):
+    return 1 / (1 + 10 ** (diff / 400))
+
+_EXPECTED_TABLE = [_expected(d) for d in range(-EXPECTED_TABLE_RANGE, EXPECTED_TABLE_RANGE + 1)]
+_EXPECTED_ARRAY = np.array(_EXPECTED_TABLE)
+
 class ELOCalculator:
     def __init__(self, k_factor=32):
         self.k_factor = k_factor
 
     def expected_score(self, rating_a, rating_b):
         """Calculate expected score for player A against player B."""
-        return 1 / (1 + 10 ** ((rating_b - rating_a) / 400))
+        diff = rating_b - rating_a
+        if -EXPECTED_TABLE_RANGE <= diff <= EXPECTED_TABLE_RANGE:
+            if type(diff) is int:
+                return _EXPECTED_TABLE[diff + EXPECTED_TABLE_RANGE]
+            if isinstance(diff, float) and diff.is_integer():
+                return _EXPECTED_TABLE[int(diff) + EXPECTED_TABLE_RANGE]
+        return _expected(diff)
 
     def update_rating(self, rating, expected_score, actual_score):
         """Update a player's rating based on the expected and actual scores."""
@@ -14,6 +38,7 @@ class ELOCalculator:
         """
         Process a match result and return new ratings for both players.
         result: 1 for win, 0.5 for draw, 0 for loss (from player A's perspective)
+        Not timed or counted per call; callers record whole competitions.
         """
         expected_a = self.expected_score(rating_a, rating_b)
         expected_b = 1 - expected_a
@@ -22,3 +47,99 @@ class ELOCalculator:
         new_rating_b = self.update_rating(rating_b, expected_b, 1 - result)
         
         return round(new_rating_a), round(new_rating_b)
+
+    def expected_scores(self, rating_diffs) -> np.ndarray:
+        """
+        Expected scores for an array of rating differences (rating_b - rating_a).
+        Integer differences within the table are looked up; each distinct other
+        difference is evaluated once with expected_score, so the values match the
+        scalar path bit for bit.
+        """
+        diffs = np.asarray(rating_diffs, dtype=float)
+        in_table = (np.abs(diffs) <= EXPECTED_TABLE_RANGE) & (diffs == np.floor(diffs))
+        if in_table.all():
+            return _EXPECTED_ARRAY[diffs.astype(np.intp) + EXPECTED_TABLE_RANGE]
+        scores = np.empty(diffs.shape)
+        scores[in_table] = _EXPECTED_ARRAY[diffs[in_table].astype(np.intp) + EXPECTED_TABLE_RANGE]
+        rest = diffs[~in_table]
+        unique, inverse = np.unique(rest, return_inverse=True)
+        scores[~in_table] = np.array([_expected(d) for d in unique.tolist()])[inverse.reshape(-1)]
+        return scores
+
+    def expected_scores_for(self, ratings_a, ratings_b) -> np.ndarray:
+        """Expected scores of players A against players B for arrays of rating pairs"""
+        return self.expected_scores(np.asarray(ratings_b, dtype=float) - np.asarray(ratings_a, dtype=float))
+
+    def process_matches(self, ratings_a, ratings_b, results) -> Tuple[List[int], List[int]]:
+        """
+        Batched process_match: new ratings of players A and B for arrays of
+        independent matches, identical to calling process_match for each.
+        """
+        a = np.asarray(ratings_a, dtype=float)
+        b = np.asarray(ratings_b, dtype=float)
+        result = np.asarray(results, dtype=float)
+        expected_a = self.expected_scores(b - a)
+        new_a = self.update_rating(a, expected_a, result)
+        new_b = self.update_rating(b, 1 - expected_a, 1 - result)
+        inc("elo_pairs_total", len(a))
+        return np.round(new_a).astype(int).tolist(), np.round(new_b).astype(int).tolist()
+
+    @staticmethod
+    def field_outcomes(ranks: Sequence[int], scores: Optional[Sequence[Optional[float]]],
+                       lower_is_better: bool) -> np.ndarray:
+        """
+        Result matrix for all implied head-to-head matches of a leaderboard.
+        outcome[i, j] is player i's result against player j (1 win, 0.5 tie, 0 loss),
+        decided like CompetitionManager.determine_match_result: equal ranks tie,
+        scores decide when both players have one, ranks decide otherwise.
+        """
+        rank = np.asarray(ranks)
+        n = len(rank)
+        if scores is None:
+            scores = [None] * n
+        score = np.array([np.nan if s is None else s for s in scores], dtype=float)
+
+        both_scored = ~np.isnan(score)[:, None] & ~np.isnan(score)[None, :]
+        if lower_is_better:
+            score_win = score[:, None] < score[None, :]
+        else:
+            score_win = score[:, None] > score[None, :]
+        rank_win = rank[:, None] < rank[None, :]
+
+        outcome = np.where(both_scored, score_win, rank_win).astype(float)
+        outcome[rank[:, None] == rank[None, :]] = 0.5
+        return outcome
+
+    @timed_method("elo_process_field_seconds")
+    def process_field(self, ratings: Sequence[int], ranks: Sequence[int],
+                      scores: Optional[Sequence[Optional[float]]] = None,
+                      lower_is_better: bool = False, exact: bool = False) -> List[int]:
+        """
+        Process every implied head-to-head match of a leaderboard at once and
+        return the new rating of each entry.
+
+        By default the result is identical to calling process_match for every
+        pair (i, j) with i listed before j, taking the rounded change of each
+        pair and summing the changes. With exact=True the unrounded changes are
+        summed and each player's new rating is rounded only once.
+        """
+        r = np.asarray(ratings, dtype=float)
+        n = len(r)
+        if n < 2:
+            return [int(x) for x in r]
+        inc("elo_pairs_total", n * (n - 1) // 2)
+
+        outcome = self.field_outcomes(ranks, scores, lower_is_better)
+        # expected[i, j] = expected_score(r[i], r[j]); the later player in a pair uses 1 - expected
+        expected = self.expected_scores(r[None, :] - r[:, None])
+        new_a = r[:, None] + self.k_factor * (outcome - expected)
+        new_b = r[None, :] + self.k_factor * ((1 - outcome) - (1 - expected))
+        if not exact:
+            new_a = np.round(new_a)
+            new_b = np.round(new_b)
+
+        upper = np.triu(np.ones((n, n), dtype=bool), k=1)
+        change_a = np.where(upper, new_a - r[:, None], 0.0)
+        change_b = np.where(upper, new_b - r[None, :], 0.0)
+        total_change = change_a.sum(axis=1) + change_b.sum(axis=0)
+        return np.round(r + total_change).astype(int).tolist()
@@ -0,0 +1,277 @@
+"""
+Background rating jobs.
+
+Submissions and reprocessing requests are recorded in a small SQLite job table
+and run by an in-process worker pool, so HTTP requests return a job id at once.
+Jobs touching the same competition type run one at a time in submission order;
+a job for all types waits for every earlier job and blocks every later one.
+Jobs that were queued or running when the process stopped are run again on
+start-up.
+"""
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from competition_manager import FORMAT_TYPES, CompetitionManager, make_competition_id
+
+ALL_TYPES = "*"
+PROGRESS_INTERVAL = 0.5  # seconds between progress writes to the job table
+
+def parse_submission(data: Dict) -> Dict:
+    """
+    Validate a /submit request body and normalize it into a job payload.
+    Raises KeyError or ValueError for malformed submissions.
+    """
+    payload = {
+        "competition_type": data["competition_type"],
+        "name": data["name"],
+        "date": data["date"],
+        "format_type": data["format_type"]
+    }
+    if payload["format_type"] not in FORMAT_TYPES:
+        raise ValueError(f"Unknown format type: {payload['format_type']}")
+    if data.get("mode"):
+        if data["mode"] != "sequential":  # live competitions are created with /api/live
+            raise ValueError(f"Unknown submission mode: {data['mode']}")
+        if payload["format_type"] != "direct_matches":
+            raise ValueError("Only direct match competitions can be sequential")
+    if payload["format_type"] == "leaderboard":
+        results = []
+        for entry in data["results"]:
+            score = entry.get("score")  # Score is optional
+            if score:
+                try:
+                    score = float(score)
+                except ValueError:
+                    score = None
+            results.append((entry["player"], entry["rank"], score))
+        payload["results"] = results
+    else:  # direct_matches
+        payload["matches"] = [(match["player_a"], match["player_b"], float(match["result"]))
+                              for match in data["matches"]]
+        if data.get("mode"):
+            payload["mode"] = data["mode"]
+    return payload
+
+def run_submission(manager: CompetitionManager, payload: Dict, progress: Callable[[int, int], None],
+                   resumed: bool = False) -> Dict:
+    """Create, fill and rate a submitted competition as one batch"""
+    competition_id = make_competition_id(payload["name"], payload["date"], payload["competition_type"])
+    with manager.batch():
+        existing = manager.competitions.get(competition_id)
+        if resumed and existing is not None and existing.processed:
+            # Finished before the restart; only the job record was not updated
+            return {"competition_id": competition_id, "processed": 0}
+        manager.create_competition(payload["name"], payload["date"],
+                                   payload["competition_type"], payload["format_type"], payload.get("mode"))
+        if payload["format_type"] == "leaderboard":
+            manager.add_leaderboard_results(competition_id, [tuple(r) for r in payload["results"]])
+        else:
+            manager.add_direct_matches(competition_id, [tuple(m) for m in payload["matches"]])
+        # Back-dated competitions re-rate the later competitions they affect
+        processed = manager.process_competition(competition_id)
+    progress(1, 1)
+    return {"competition_id": competition_id, "processed": processed}
+
+def run_reprocess(manager: CompetitionManager, payload: Dict, progress: Callable[[int, int], None],
+                  resumed: bool = False) -> Dict:
+    """Re-rate one type or all types, from a date or from scratch"""
+    competition_type = payload.get("competition_type")
+    since = payload.get("since")
+    if since:
+        types = [competition_type] if competition_type else sorted(manager.competition_types)
+        with manager.batch():
+            replayed = sum(manager.rerate_from(ct, since, progress) for ct in types)
+    else:
+        replayed = manager.reprocess_competitions(competition_type, progress)
+    return {"replayed": replayed}
+
+HANDLERS = {
+    "submit": run_submission,
+    "reprocess": run_reprocess
+}
+
+class JobStore:
+    """Persistent job table in a SQLite file"""
+
+    def __init__(self, path: Union[str, Path]):
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    seq INTEGER NOT NULL,
+                    kind TEXT NOT NULL,
+                    keys TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    done INTEGER NOT NULL DEFAULT 0,
+                    total INTEGER,
+                    result TEXT,
+                    error TEXT,
+                    created REAL NOT NULL,
+                    started REAL,
+                    finished REAL
+                )""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status ON jobs (status, seq)")
+
+    def _execute(self, sql: str, params: Tuple = ()):
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params).fetchall()
+
+    def create(self, job_id: str, kind: str, keys: List[str], payload: Dict):
+        self._execute(
+            "INSERT INTO jobs (id, seq, kind, keys, payload, status, created) "
+            "VALUES (?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM jobs), ?, ?, ?, 'queued', ?)",
+            (job_id, kind, json.dumps(keys), json.dumps(payload), time.time()))
+
+    def start(self, job_id: str):
+        self._execute("UPDATE jobs SET status = 'running', started = ? WHERE id = ?", (time.time(), job_id))
+
+    def progress(self, job_id: str, done: int, total: Optional[int]):
+        self._execute("UPDATE jobs SET done = ?, total = ? WHERE id = ?", (done, total, job_id))
+
+    def finish(self, job_id: str, result: Dict):
+        self._execute("UPDATE jobs SET status = 'done', result = ?, finished = ? WHERE id = ?",
+                      (json.dumps(result), time.time(), job_id))
+
+    def fail(self, job_id: str, error: str):
+        self._execute("UPDATE jobs SET status = 'failed', error = ?, finished = ? WHERE id = ?",
+                      (error, time.time(), job_id))
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        rows = self._execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return self._to_dict(rows[0]) if rows else None
+
+    def unfinished(self) -> List[Dict]:
+        """Queued and interrupted jobs, oldest first"""
+        rows = self._execute("SELECT * FROM jobs WHERE status IN ('queued', 'running') ORDER BY seq")
+        return [self._to_dict(row) for row in rows]
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict:
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "keys": json.loads(row["keys"]),
+            "payload": json.loads(row["payload"]),
+            "status": row["status"],
+            "progress": {"done": row["done"], "total": row["total"]},
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created": row["created"],
+            "started": row["started"],
+            "finished": row["finished"]
+        }
+
+    def close(self):
+        self._conn.close()
+
+class JobQueue:
+    """
+    Runs rating jobs on a thread pool. Each job holds a set of keys (competition
+    types, or ALL_TYPES); a job starts only when no running or earlier queued job
+    shares a key with it.
+    """
+
+    def __init__(self, manager: CompetitionManager, path: Union[str, Path], workers: int = 2):
+        self.manager = manager
+        self.store = JobStore(path)
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="rating-job")
+        self._cond = threading.Condition()
+        self._pending: List[Dict] = []
+        self._running: Dict[str, List[str]] = {}  # job id -> keys
+        for job in self.store.unfinished():
+            job["resumed"] = True
+            self._pending.append(job)
+        self._dispatch()
+
+    def submit(self, kind: str, payload: Dict, keys: List[str]) -> str:
+        """Record a job and schedule it; returns the job id"""
+        if kind not in HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        self.store.create(job_id, kind, keys, payload)
+        with self._cond:
+            self._pending.append({"id": job_id, "kind": kind, "keys": keys, "payload": payload})
+        self._dispatch()
+        return job_id
+
+    def submit_competition(self, data: Dict) -> str:
+        payload = parse_submission(data)
+        return self.submit("submit", payload, [payload["competition_type"]])
+
+    def reprocess(self, competition_type: Optional[str] = None, since: Optional[str] = None) -> str:
+        payload = {"competition_type": competition_type, "since": since}
+        return self.submit("reprocess", payload, [competition_type or ALL_TYPES])
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self.store.get(job_id)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Block until a job has finished (or the timeout passes) and return its record"""
+        with self._cond:
+            self._cond.wait_for(lambda: not self._is_active(job_id), timeout)
+        return self.store.get(job_id)
+
+    def _is_active(self, job_id: str) -> bool:
+        return job_id in self._running or any(job["id"] == job_id for job in self._pending)
+
+    @staticmethod
+    def _conflicts(keys: List[str], blocked: set) -> bool:
+        if not blocked:
+            return False
+        return ALL_TYPES in keys or ALL_TYPES in blocked or not blocked.isdisjoint(keys)
+
+    def _dispatch(self):
+        """Start every pending job that does not have to wait for another job"""
+        with self._cond:
+            blocked = {key for keys in self._running.values() for key in keys}
+            waiting = []
+            for job in self._pending:
+                if self._conflicts(job["keys"], blocked):
+                    waiting.append(job)
+                else:
+                    self._running[job["id"]] = job["keys"]
+                    self._executor.submit(self._run, job)
+                # Later jobs with the same keys must not overtake this one
+                blocked.update(job["keys"])
+            self._pending = waiting
+
+    def _run(self, job: Dict):
+        job_id = job["id"]
+        self.store.start(job_id)
+        last_write = 0.0
+
+        def progress(done: int, total: int):
+            nonlocal last_write
+            now = time.monotonic()
+            if done == total or now - last_write >= PROGRESS_INTERVAL:
+                last_write = now
+                self.store.progress(job_id, done, total)
+
+        try:
+            result = HANDLERS[job["kind"]](self.manager, job["payload"], progress,
+                                           resumed=job.get("resumed", False))
+            self.store.finish(job_id, result)
+        except Exception as e:
+            self.store.fail(job_id, str(e))
+        finally:
+            with self._cond:
+                del self._running[job_id]
+                self._cond.notify_all()
+            self._dispatch()
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work; queued jobs stay in the table and run on the next start"""
+        with self._cond:
+            self._pending = []
+        self._executor.shutdown(wait=wait)
+        self.store.close()
@@ -0,0 +1,97 @@
+"""
+Live rating events.
+
+Live direct match competitions rate every match as soon as it is added; the
+CompetitionManager publishes one event per rated match (and one when the
+competition finishes) to a LiveFeed. Subscribers, such as the Server-Sent Events
+stream in app.py, each get a bounded queue; a subscriber that falls behind loses
+its oldest events rather than slowing down the writer.
+"""
+import json
+import queue
+import threading
+from typing import Dict, Iterator, List, Optional
+
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+class Subscription:
+    """Events of one competition (or all competitions) queued for a single subscriber"""
+
+    def __init__(self, feed: "LiveFeed", competition_id: Optional[str]):
+        self.feed = feed
+        self.competition_id = competition_id
+        self.queue: "queue.Queue[Dict]" = queue.Queue(SUBSCRIBER_QUEUE_SIZE)
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Next event, or None if none arrived within the timeout"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.feed.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class LiveFeed:
+    """Fan-out of rating events to subscribers; safe to use from any thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions: List[Subscription] = []
+
+    def subscribe(self, competition_id: Optional[str] = None) -> Subscription:
+        subscription = Subscription(self, competition_id)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def publish(self, event: Dict):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if subscription.competition_id not in (None, event.get("competition_id")):
+                continue
+            while True:
+                try:
+                    subscription.queue.put_nowait(event)
+                    break
+                except queue.Full:
+                    try:
+                        subscription.queue.get_nowait()  # drop the oldest event
+                    except queue.Empty:
+                        pass
+
+def sse_messages(subscription: Subscription, first: Optional[Dict] = None,
+                 keepalive: float = 15.0) -> Iterator[str]:
+    """
+    Server-Sent Events stream of a subscription: `first` (e.g. a snapshot), then
+    every event as it arrives, with a comment line when idle so proxies keep the
+    connection open. Ends after a "finished" event.
+    """
+    try:
+        if first is not None:
+            yield format_sse(first)
+        while True:
+            event = subscription.get(timeout=keepalive)
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            yield format_sse(event)
+            if event.get("event") == "finished":
+                return
+    finally:
+        subscription.close()
+
+def format_sse(event: Dict) -> str:
+    return f"event: {event.get('event', 'message')}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
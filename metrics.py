@@ -0,0 +1,166 @@
+"""
+In-process counters and timers, rendered in the Prometheus text format.
+
+Instrumented code records into the module-level REGISTRY:
+
+    with timed("elo_save_seconds", data="players"):
+        ...
+    inc("elo_storage_bytes_written_total", len(data), file="players.json")
+
+Timers are exported as summaries (_count and _sum); gauges are read from
+callbacks when the metrics are rendered.
+"""
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+HELP = {
+    "elo_process_matches_seconds": "Time spent rating direct match competitions",
+    "elo_process_field_seconds": "Time spent rating whole leaderboards",
+    "elo_pairs_total": "Head-to-head pairs rated",
+    "elo_load_seconds": "Time spent loading data from storage",
+    "elo_save_seconds": "Time spent saving data to storage",
+    "elo_storage_bytes_written_total": "Bytes written to data files",
+    "elo_http_request_seconds": "Time spent handling HTTP requests",
+    "elo_http_requests_total": "HTTP requests handled",
+}
+
+def _key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in key) + "}"
+
+def _format_value(value: float) -> str:
+    """Integers as integers and floats at full precision (:g keeps only six digits)"""
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return "NaN" if math.isnan(value) else repr(float(value))
+
+class Registry:
+    """Thread-safe store of counters, timers and gauge callbacks"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._timers: Dict[str, Dict[LabelKey, List[float]]] = {}  # name -> labels -> [count, sum]
+        self._gauges: Dict[str, Callable[[], float]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = _key(labels)
+        with self._lock:
+            entry = self._timers.setdefault(name, {}).setdefault(key, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def gauge(self, name: str, callback: Callable[[], float], help: Optional[str] = None):
+        """Register a value read when the metrics are rendered"""
+        with self._lock:
+            self._gauges[name] = callback
+            if help:
+                HELP.setdefault(name, help)
+
+    def value(self, name: str, **labels) -> float:
+        """Current counter value, or timer count"""
+        key = _key(labels)
+        with self._lock:
+            if name in self._timers:
+                return self._timers[name].get(key, [0, 0.0])[0]
+            return self._counters.get(name, {}).get(key, 0)
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._timers.clear()
+
+    def drain(self) -> Tuple[Dict, Dict]:
+        """Counters and timers recorded so far, cleared; for merging into another registry"""
+        with self._lock:
+            recorded = (self._counters, self._timers)
+            self._counters, self._timers = {}, {}
+        return recorded
+
+    def merge(self, recorded: Tuple[Dict, Dict]):
+        """Add counters and timers drained from another registry (e.g. a worker process's)"""
+        counters, timers = recorded
+        with self._lock:
+            for name, series in counters.items():
+                mine = self._counters.setdefault(name, {})
+                for key, value in series.items():
+                    mine[key] = mine.get(key, 0) + value
+            for name, series in timers.items():
+                mine = self._timers.setdefault(name, {})
+                for key, (count, total) in series.items():
+                    entry = mine.setdefault(key, [0, 0.0])
+                    entry[0] += count
+                    entry[1] += total
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            timers = {name: {k: list(v) for k, v in series.items()} for name, series in self._timers.items()}
+            gauges = dict(self._gauges)
+        for name in sorted(counters):
+            lines += self._header(name, "counter")
+            lines += [f"{name}{_format_labels(k)} {_format_value(v)}" for k, v in sorted(counters[name].items())]
+        for name in sorted(timers):
+            lines += self._header(name, "summary")
+            for k, (count, total) in sorted(timers[name].items()):
+                lines.append(f"{name}_count{_format_labels(k)} {count}")
+                lines.append(f"{name}_sum{_format_labels(k)} {total:.9f}")
+        for name in sorted(gauges):
+            lines += self._header(name, "gauge")
+            lines.append(f"{name} {_format_value(gauges[name]())}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _header(name: str, kind: str) -> List[str]:
+        header = [f"# HELP {name} {HELP[name]}"] if name in HELP else []
+        return header + [f"# TYPE {name} {kind}"]
+
+REGISTRY = Registry()
+
+def inc(name: str, value: float = 1, **labels):
+    REGISTRY.inc(name, value, **labels)
+
+@contextmanager
+def timed(name: str, **labels) -> Iterator[None]:
+    """Record the duration of the block in a timer"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.observe(name, time.perf_counter() - start, **labels)
+
+def timed_method(name: str, **labels):
+    """Decorator form of timed"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                REGISTRY.observe(name, time.perf_counter() - start, **labels)
+        return wrapper
+    return decorator
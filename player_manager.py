@@ -1,13 +1,231 @@
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
 from datetime import datetime
-import json
+from math import isqrt
+import threading
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+from metrics import timed_method
+from rating_history import DOWNSAMPLE_MODES, HistoryCodes, RatingHistory, downsample
+from storage import JSONStorage
+
+Key = Tuple[int, int, str]  # (-rating, creation order, name)
+
+CHUNK_SIZE = 512  # keys per chunk of a rating index; a chunk is split at twice this
+MIN_DELTA = 1024  # key changes kept beside the shared name -> key map before it is rebuilt
+
+_REMOVED = object()
+
+class RatingView:
+    """
+    Immutable snapshot of a RatingIndex. Readers work on a snapshot without
+    locking while the writer keeps updating the index. Snapshots share every
+    chunk of the ranking and the name -> key map with the previous snapshot,
+    apart from what changed in between.
+    """
+    __slots__ = ("_chunks", "_maxes", "_offsets", "_base", "_delta", "_ranking")
+
+    def __init__(self, chunks: Tuple[Tuple[Key, ...], ...] = (), base: Optional[Dict[str, Key]] = None,
+                 delta: Optional[Dict[str, Optional[Key]]] = None):
+        self._chunks = chunks  # sorted chunks of the sorted key list
+        self._maxes = [chunk[-1] for chunk in chunks]
+        self._offsets = [0]  # position of each chunk's first key, then the length
+        for chunk in chunks:
+            self._offsets.append(self._offsets[-1] + len(chunk))
+        self._base = base or {}
+        self._delta = delta or {}  # keys changed since base was built; None once removed
+        self._ranking: Optional[List[Tuple[str, int]]] = None
+
+    def __len__(self):
+        return self._offsets[-1]
+
+    def __contains__(self, name: str):
+        return self._key(name) is not None
+
+    def _key(self, name: str) -> Optional[Key]:
+        key = self._delta.get(name, _REMOVED)
+        return self._base.get(name) if key is _REMOVED else key
+
+    def _position(self, key: tuple) -> int:
+        """Position of the first key not below `key`"""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._chunks):
+            return len(self)
+        return self._offsets[i] + bisect_left(self._chunks[i], key)
+
+    def _keys(self, start: int, end: int) -> Iterator[Key]:
+        """Keys at positions [start, end)"""
+        i = max(bisect_right(self._offsets, start) - 1, 0)
+        position = start
+        while position < end and i < len(self._chunks):
+            chunk = self._chunks[i]
+            take = chunk[position - self._offsets[i]:end - self._offsets[i]]
+            yield from take
+            position += len(take)
+            i += 1
+
+    def top(self, k: Optional[int] = None) -> List[Tuple[str, int]]:
+        """(name, rating) of the k highest rated players, or all players"""
+        if k is None:
+            return list(self.ranking())
+        return [(name, -neg_rating) for neg_rating, _, name in self._keys(0, min(k, len(self)))]
+
+    def ranking(self) -> List[Tuple[str, int]]:
+        """Full (name, rating) list, built once per snapshot"""
+        if self._ranking is None:
+            self._ranking = [(name, -neg_rating) for chunk in self._chunks for neg_rating, _, name in chunk]
+        return self._ranking
+
+    def range_bounds(self, min_rating: Optional[int] = None,
+                     max_rating: Optional[int] = None) -> Tuple[int, int]:
+        """Positions [start, end) of the players rated within [min_rating, max_rating]"""
+        start = self._position((-max_rating,)) if max_rating is not None else 0
+        end = self._position((-min_rating + 1,)) if min_rating is not None else len(self)
+        return start, max(start, end)
+
+    def entries(self, start: int, end: int) -> List[Tuple[int, str, int]]:
+        """(rank, name, rating) for the players at positions [start, end)"""
+        return [(start + i + 1, name, -neg_rating)
+                for i, (neg_rating, _, name) in enumerate(self._keys(max(start, 0), end))]
+
+    def rank_of(self, name: str) -> Optional[int]:
+        """1-based position of a player, or None if not rated"""
+        key = self._key(name)
+        if key is None:
+            return None
+        return self._position(key) + 1
+
+    def rating_of(self, name: str) -> Optional[int]:
+        key = self._key(name)
+        return -key[0] if key else None
+
+class RatingIndex:
+    """
+    Players rated in one competition type, kept sorted by rating (highest first)
+    in chunks of up to 2 * CHUNK_SIZE keys, so an update moves one chunk's keys
+    rather than the whole list. Ties keep player creation order, matching a
+    stable sort of the player list. Changes become visible to readers when the
+    writer publishes a new RatingView, which copies only the chunks and map
+    entries changed since the last one.
+    """
+    def __init__(self):
+        self._chunks: List[List[Key]] = []
+        self._maxes: List[Key] = []  # last key of each chunk
+        self._frozen: List[Optional[Tuple[Key, ...]]] = []  # published copy of each chunk, None once changed
+        self._key_of: Dict[str, Key] = {}
+        self._base: Dict[str, Key] = {}  # name -> key when last rebuilt, shared by views
+        self._delta: Dict[str, Optional[Key]] = {}  # changes since then; None for removed players
+        self._view = RatingView()
+        self._changed = False
+
+    def update(self, name: str, rating: int, order: int):
+        self.remove(name)
+        key = (-rating, order, name)
+        self._insert(key)
+        self._key_of[name] = key
+        self._delta[name] = key
+        self._changed = True
+
+    def remove(self, name: str):
+        key = self._key_of.pop(name, None)
+        if key is not None:
+            self._delete(key)
+            self._delta[name] = None
+            self._changed = True
+
+    def _insert(self, key: Key):
+        if not self._chunks:
+            self._chunks.append([key])
+            self._maxes.append(key)
+            self._frozen.append(None)
+            return
+        i = min(bisect_left(self._maxes, key), len(self._chunks) - 1)
+        chunk = self._chunks[i]
+        insort(chunk, key)
+        self._maxes[i] = chunk[-1]
+        self._frozen[i] = None
+        if len(chunk) > 2 * CHUNK_SIZE:
+            self._chunks[i:i + 1] = [chunk[:CHUNK_SIZE], chunk[CHUNK_SIZE:]]
+            self._maxes[i:i + 1] = [chunk[CHUNK_SIZE - 1], chunk[-1]]
+            self._frozen[i:i + 1] = [None, None]
+
+    def _delete(self, key: Key):
+        i = bisect_left(self._maxes, key)
+        chunk = self._chunks[i]
+        del chunk[bisect_left(chunk, key)]
+        if chunk:
+            self._maxes[i] = chunk[-1]
+            self._frozen[i] = None
+        else:
+            del self._chunks[i], self._maxes[i], self._frozen[i]
+
+    def names(self) -> List[str]:
+        """Names of the rated players, in no particular order"""
+        return list(self._key_of)
+
+    def publish(self):
+        """Replace the snapshot seen by readers with the current state"""
+        if not self._changed:
+            return
+        for i, frozen in enumerate(self._frozen):
+            if frozen is None:
+                self._frozen[i] = tuple(self._chunks[i])
+        # Copying the changes costs up to this much per publish; past it the map is rebuilt
+        if len(self._delta) > max(MIN_DELTA, 8 * isqrt(len(self._key_of))):
+            self._base = dict(self._key_of)
+            self._delta = {}
+        self._view = RatingView(tuple(self._frozen), self._base, dict(self._delta))
+        self._changed = False
+
+    def view(self) -> RatingView:
+        return self._view
 
 class Player:
-    def __init__(self, name: str, initial_rating: int = 1500):
+    def __init__(self, name: str, initial_rating: int = 1500, history_codes: Optional[HistoryCodes] = None):
         self.name = name
+        self.history_codes = history_codes or HistoryCodes()  # string tables of the player's histories
         self.ratings: Dict[str, int] = {}  # competition_type -> rating
-        self.competition_history: Dict[str, List[Dict]] = {}  # competition_type -> history
+        self.rating_params: Dict[str, Tuple[float, ...]] = {}  # competition_type -> rating system state
+        self._competition_history: Optional[Dict[str, RatingHistory]] = {}  # competition_type -> history
+        self._history_loader: Optional[Callable[[str], Dict[str, RatingHistory]]] = None
+        self._history_synced: Dict[str, int] = {}  # competition_type -> entries already in storage
+        self._rating_listener: Optional[Callable[["Player", str], None]] = None
+
+    @property
+    def competition_history(self) -> Dict[str, RatingHistory]:
+        if self._competition_history is None:
+            self._competition_history = {
+                ct: RatingHistory.from_json(h, self.history_codes)
+                for ct, h in self._history_loader(self.name).items()
+            }
+            self._history_loader = None
+            self.mark_history_synced()
+        return self._competition_history
+
+    @competition_history.setter
+    def competition_history(self, history: Dict[str, Union[RatingHistory, List[Dict], Dict[str, List]]]):
+        self._competition_history = {ct: RatingHistory.from_json(h, self.history_codes)
+                                     for ct, h in history.items()}
+        self._history_loader = None
+        self._history_synced = {}
+
+    @property
+    def history_loaded(self) -> bool:
+        return self._competition_history is not None
+
+    def set_history_loader(self, loader: Callable[[str], Dict[str, List[Dict]]]):
+        """Defer loading the competition history until it is first accessed"""
+        self._competition_history = None
+        self._history_loader = loader
+
+    def history_changes(self, competition_type: str) -> Tuple[int, List[Dict]]:
+        """Return the index of the first unsaved history entry and the entries from there on"""
+        history = self.competition_history.get(competition_type) or []
+        start = min(self._history_synced.get(competition_type, 0), len(history))
+        return start, history[start:]
+
+    def mark_history_synced(self):
+        self._history_synced = {ct: len(h) for ct, h in self.competition_history.items()}
 
     def get_rating(self, competition_type: str) -> int:
         """Get rating for specific competition type, initialize if not exists"""
@@ -16,61 +234,203 @@ class Player:
     def set_rating(self, competition_type: str, rating: int):
         """Set rating for specific competition type"""
         self.ratings[competition_type] = rating
+        self._rating_changed(competition_type)
+
+    def get_rating_params(self, competition_type: str) -> Tuple[float, ...]:
+        """Extra state of the type's rating system (empty for Elo)"""
+        return self.rating_params.get(competition_type, ())
+
+    def set_rating_params(self, competition_type: str, params: Tuple[float, ...]):
+        if params:
+            self.rating_params[competition_type] = tuple(params)
+        else:
+            self.rating_params.pop(competition_type, None)
+
+    def set_rating_listener(self, listener: Callable[["Player", str], None]):
+        """Register a callback run after a rating is set, reset or removed"""
+        self._rating_listener = listener
+
+    def _rating_changed(self, competition_type: str):
+        if self._rating_listener:
+            self._rating_listener(self, competition_type)
 
     def add_competition_result(self, competition_type: str, competition_id: str, 
                              date: str, new_rating: int):
-        """Add competition result to history"""
+        """Add competition result to history, keeping it in date order"""
         if competition_type not in self.competition_history:
-            self.competition_history[competition_type] = []
+            self.competition_history[competition_type] = RatingHistory(codes=self.history_codes)
         
-        self.competition_history[competition_type].append({
-            "competition_id": competition_id,
-            "date": date,
-            "new_rating": new_rating
-        })
+        position = self.competition_history[competition_type].insert(competition_id, date, new_rating)
+        if position < self._history_synced.get(competition_type, 0):
+            self._history_synced[competition_type] = position  # later saved entries moved up
+
+    def update_competition_result(self, competition_type: str, competition_id: str,
+                                  date: str, new_rating: int):
+        """Set the rating after a competition already in the history (e.g. a live one), adding it if missing"""
+        history = self.competition_history.get(competition_type)
+        position = history.set_rating(competition_id, new_rating) if history else -1
+        if position < 0:
+            self.add_competition_result(competition_type, competition_id, date, new_rating)
+        elif position < self._history_synced.get(competition_type, 0):
+            self._history_synced[competition_type] = position
+
+    def reset_rating(self, competition_type: str):
+        """Reset rating and history for a competition type before reprocessing"""
+        self.ratings[competition_type] = 1500
+        self.rating_params.pop(competition_type, None)
+        self.competition_history[competition_type] = RatingHistory(codes=self.history_codes)
+        self._history_synced[competition_type] = 0
+        self._rating_changed(competition_type)
+
+    def rewind_history(self, competition_type: str, length: int):
+        """
+        Drop history entries from index `length` on and restore the rating recorded
+        by the last remaining entry. A player left without history for the type is
+        no longer rated in it.
+        """
+        history = self.competition_history.get(competition_type)
+        if not history or length >= len(history):
+            return
+        history.truncate(length)
+        if history:
+            self.ratings[competition_type] = history.last_rating
+        else:
+            self.ratings.pop(competition_type, None)
+            self.rating_params.pop(competition_type, None)
+            del self.competition_history[competition_type]
+        self._history_synced[competition_type] = min(self._history_synced.get(competition_type, 0), length)
+        self._rating_changed(competition_type)
 
     def to_dict(self):
-        return {
+        data = {
             "name": self.name,
             "ratings": self.ratings,
-            "competition_history": self.competition_history
+            "competition_history": {ct: h.to_json() for ct, h in self.competition_history.items()}
         }
+        if self.rating_params:
+            data["rating_params"] = {ct: list(params) for ct, params in self.rating_params.items()}
+        return data
 
 class PlayerManager:
-    def __init__(self, data_dir="data"):
+    def __init__(self, data_dir="data", storage=None):
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(exist_ok=True)
-        self.players_file = self.data_dir / "players.json"
+        self.storage = storage or JSONStorage(data_dir)
         self.players: Dict[str, Player] = {}
+        # Competition ids and dates interned once for all of this manager's histories;
+        # a storage that builds encoded histories itself (SnapshotStorage) brings its own
+        self.history_codes: HistoryCodes = getattr(self.storage, "history_codes", None) or HistoryCodes()
+        self.rating_indexes: Dict[str, RatingIndex] = {}  # competition_type -> ranking
+        self._order: Dict[str, int] = {}  # name -> creation order, used to break rating ties
+        self._names: List[str] = []  # all player names, sorted for prefix search
+        # Single writer lock shared by everything that mutates players or their files;
+        # readers use the published rating views and need no lock
+        self.lock = threading.RLock()
+        self._batch_depth = 0
+        self._dirty: Set[str] = set()  # names of players changed since the last save
         self.load_players()
 
+    @timed_method("elo_load_seconds", data="players")
     def load_players(self):
-        if self.players_file.exists():
-            with open(self.players_file, 'r') as f:
-                data = json.load(f)
-                for player_data in data:
-                    player = Player(player_data["name"])
-                    player.ratings = player_data["ratings"]
-                    player.competition_history = player_data["competition_history"]
-                    self.players[player.name] = player
+        for player_data in self.storage.load_players():
+            player = Player(player_data["name"], history_codes=self.history_codes)
+            player.ratings = player_data["ratings"]
+            player.rating_params = {ct: tuple(params) for ct, params in player_data.get("rating_params", {}).items()}
+            if "competition_history" in player_data:
+                player.competition_history = player_data["competition_history"]
+            else:
+                player.set_history_loader(self.storage.load_player_history)
+            self._add_player(player)
+        self._names = sorted(self.players)
+        self.publish()
+
+    def _add_player(self, player: Player):
+        self.players[player.name] = player
+        self._order[player.name] = len(self._order)
+        player.set_rating_listener(self._index_rating)
+        for competition_type in player.ratings:
+            self._index_rating(player, competition_type)
 
+    def _index_rating(self, player: Player, competition_type: str):
+        index = self.rating_indexes.setdefault(competition_type, RatingIndex())
+        if competition_type in player.ratings:
+            index.update(player.name, player.ratings[competition_type], self._order[player.name])
+        else:
+            index.remove(player.name)
+
+    @timed_method("elo_save_seconds", data="players")
     def save_players(self):
-        with open(self.players_file, 'w') as f:
-            json.dump([p.to_dict() for p in self.players.values()], f, indent=2)
+        with self.lock:
+            self.storage.save_players(self.players, self._dirty)
+            self._dirty.clear()
+            self.publish()
+
+    def publish(self):
+        """Make the current ratings visible to readers of the rating lists"""
+        for index in self.rating_indexes.values():
+            index.publish()
+
+    def rating_view(self, competition_type: str) -> Optional[RatingView]:
+        """The last published rating list of a competition type"""
+        index = self.rating_indexes.get(competition_type)
+        return index.view() if index else None
+
+    @contextmanager
+    def batch(self):
+        """
+        Collect player changes and write them once when the outermost batch exits.
+        Batches can be nested; changes are flushed even if the block raises so that
+        the file always mirrors the in-memory state. A batch holds the writer lock,
+        so concurrent batches run one after another.
+        """
+        with self.lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if self._batch_depth == 0 and self._dirty:
+                    self.save_players()
+
+    def mark_dirty(self, name: str):
+        """Record a changed player, saving immediately unless inside a batch"""
+        with self.lock:
+            self._dirty.add(name)
+            if self._batch_depth == 0:
+                self.save_players()
 
     def get_or_create_player(self, name: str, competition_type: str) -> Player:
-        if name not in self.players:
-            self.players[name] = Player(name)
-            self.save_players()
-        return self.players[name]
+        with self.lock:
+            if name not in self.players:
+                self._add_player(Player(name, history_codes=self.history_codes))
+                insort(self._names, name)
+                self.mark_dirty(name)
+            return self.players[name]
 
     def update_player_rating(self, name: str, new_rating: int, competition_id: str, 
-                           competition_date: str, competition_type: str):
-        player = self.get_or_create_player(name, competition_type)
-        player.set_rating(competition_type, new_rating)
-        player.add_competition_result(competition_type, competition_id, 
-                                    competition_date, new_rating)
-        self.save_players()
+                           competition_date: str, competition_type: str, params: Tuple[float, ...] = ()):
+        with self.lock:
+            player = self.get_or_create_player(name, competition_type)
+            player.set_rating_params(competition_type, params)
+            player.set_rating(competition_type, new_rating)
+            player.add_competition_result(competition_type, competition_id, 
+                                        competition_date, new_rating)
+            self.mark_dirty(name)
+
+    def reset_ratings(self, competition_type: Optional[str] = None):
+        """Reset ratings and history of one competition type (or all types) to initial values"""
+        with self.batch():
+            if competition_type:
+                index = self.rating_indexes.get(competition_type)
+                players = [self.players[name] for name in index.names()] if index else []
+            else:
+                players = list(self.players.values())
+            for player in players:
+                types = [competition_type] if competition_type else list(player.ratings)
+                for ct in types:
+                    if ct in player.ratings:
+                        player.reset_rating(ct)
+                        self.mark_dirty(player.name)
 
     def get_player_rating(self, name: str, competition_type: str) -> Optional[int]:
         player = self.players.get(name)
@@ -78,9 +438,80 @@ class PlayerManager:
 
     def get_rating_list(self, competition_type: str) -> List[tuple]:
         """Get sorted rating list for a specific competition type"""
-        rated_players = [
-            (p.name, p.get_rating(competition_type))
-            for p in self.players.values()
-            if competition_type in p.ratings
-        ]
-        return sorted(rated_players, key=lambda x: x[1], reverse=True)
+        view = self.rating_view(competition_type)
+        return list(view.ranking()) if view else []
+
+    def get_top_players(self, competition_type: str, k: int) -> List[tuple]:
+        """Get the k highest rated players for a competition type"""
+        view = self.rating_view(competition_type)
+        return view.top(k) if view else []
+
+    def get_player_rank(self, name: str, competition_type: str) -> Optional[int]:
+        """Get a player's 1-based position in the rating list, or None if not rated"""
+        view = self.rating_view(competition_type)
+        return view.rank_of(name) if view else None
+
+    def query_history(self, name: str, competition_type: str, since: Optional[str] = None,
+                      until: Optional[str] = None, offset: int = 0,
+                      limit: Optional[int] = None, downsample_mode: Optional[str] = None,
+                      points: Optional[int] = None) -> Tuple[int, List[Dict]]:
+        """
+        Page through a player's rating history for one type, dated within [since, until].
+        The date-ordered history is windowed by binary search; downsample_mode
+        ("week", "month" or "lttb" with up to `points` entries) thins it before paging.
+        Returns the number of matching entries and the requested page.
+        """
+        if downsample_mode is not None and downsample_mode not in DOWNSAMPLE_MODES:
+            raise ValueError(f"Unknown downsample mode: {downsample_mode}")
+        # Histories are rewound and re-rated in place, so the entries are copied
+        # under the writer lock and downsampled after releasing it
+        with self.lock:
+            player = self.players.get(name)
+            history = player.competition_history.get(competition_type) if player else None
+            if not history:
+                return 0, []
+            start, end = history.window(since, until)
+            if downsample_mode is None:
+                stop = end if limit is None else min(end, start + offset + limit)
+                return end - start, history[start + offset:stop]
+            entries = history[start:end]
+        entries = downsample(entries, downsample_mode, points)
+        stop = None if limit is None else offset + limit
+        return len(entries), entries[offset:stop]
+
+    def history_entries(self, name: str, competition_type: str) -> Optional[List[Dict]]:
+        """A copy of a player's whole rating history for one type, or None if there is none"""
+        with self.lock:
+            player = self.players.get(name)
+            if player and competition_type in player.competition_history:
+                return list(player.competition_history[competition_type])
+        return None
+
+    def query_ratings(self, competition_type: str, offset: int = 0, limit: Optional[int] = None,
+                      min_rating: Optional[int] = None, max_rating: Optional[int] = None,
+                      prefix: Optional[str] = None) -> Tuple[int, List[Tuple[int, str, int]]]:
+        """
+        Page through the rating list of a competition type, highest rated first.
+        Returns the number of matching players and (rank, name, rating) for the
+        requested page. Rating ranges are resolved with binary search on the rating
+        index and name prefixes on the sorted name list.
+        """
+        view = self.rating_view(competition_type)
+        if view is None:
+            return 0, []
+        stop = None if limit is None else offset + limit
+        if prefix is None:
+            start, end = view.range_bounds(min_rating, max_rating)
+            return end - start, view.entries(start + offset, end if stop is None else min(end, start + stop))
+
+        names = self._names[bisect_left(self._names, prefix):bisect_left(self._names, prefix + chr(0x10FFFF))]
+        matches = []
+        for name in names:
+            rank = view.rank_of(name)
+            if rank is None:
+                continue
+            rating = view.rating_of(name)
+            if (min_rating is None or rating >= min_rating) and (max_rating is None or rating <= max_rating):
+                matches.append((rank, name, rating))
+        matches.sort()
+        return len(matches), matches[offset:stop]
@@ -0,0 +1,308 @@
+import threading
+from array import array
+from datetime import date as Date
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+class StringTable:
+    """
+    Interns strings as small integer codes so repeated values are stored once.
+    Lookups take no lock; new strings are added under one, so concurrent
+    encoders never hand out the same code twice.
+    """
+    __slots__ = ("_codes", "_strings", "_lock")
+
+    def __init__(self):
+        self._codes: Dict[str, int] = {}
+        self._strings: List[str] = []
+        self._lock = threading.Lock()
+
+    def code(self, value: str) -> Optional[int]:
+        """The code of an interned string, or None"""
+        return self._codes.get(value)
+
+    def encode(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(value)
+                if code is None:
+                    # The string is stored before its code is published, so any
+                    # reader that sees the code can decode it
+                    code = len(self._strings)
+                    self._strings.append(value)
+                    self._codes[value] = code
+        return code
+
+    def decode(self, code: int) -> str:
+        return self._strings[code]
+
+def _ordinal(value: str) -> int:
+    """Proleptic ordinal of an ISO date, 0 for anything else"""
+    try:
+        parsed = Date.fromisoformat(value)
+        if parsed.isoformat() == value:
+            return parsed.toordinal()
+    except ValueError:
+        pass
+    return 0
+
+class HistoryCodes:
+    """
+    The string tables of one PlayerManager's histories: every competition id and
+    non-ISO date is stored once and histories hold integer codes
+    """
+    __slots__ = ("competition_ids", "other_dates")
+
+    def __init__(self):
+        self.competition_ids = StringTable()
+        self.other_dates = StringTable()
+
+    def encode_competition_id(self, value: str) -> int:
+        return self.competition_ids.encode(value)
+
+    def encode_date(self, value: str) -> int:
+        """ISO dates become their proleptic ordinal; anything else a negative interned code"""
+        return _ordinal(value) or -1 - self.other_dates.encode(value)
+
+    def decode_date(self, code: int) -> str:
+        if code > 0:
+            return Date.fromordinal(code).isoformat()
+        return self.other_dates.decode(-1 - code)
+
+    def dated_before(self, code: int, date: str, date_code: int, or_on: bool = False) -> bool:
+        """
+        Whether the encoded date `code` sorts before (or_on: on or before) `date`,
+        compared as strings like the managers do
+        """
+        if code > 0 and date_code > 0:
+            a, b = code, date_code  # ordinals of ISO dates sort like the strings
+        else:
+            a, b = self.decode_date(code), date
+        return a <= b if or_on else a < b
+
+class RatingHistory:
+    """
+    A player's rating history for one competition type, stored column-wise in
+    integer arrays (interned competition id, encoded date, new rating) instead of
+    one dict per entry. Indexing and iteration still produce the familiar
+    {"competition_id", "date", "new_rating"} dicts. Entries are kept in date
+    order (entries of the same date in insertion order). Codes come from `codes`,
+    normally the tables shared by all histories of a PlayerManager.
+    """
+    __slots__ = ("_competitions", "_dates", "_ratings", "_codes")
+
+    def __init__(self, entries: Iterable[Dict] = (), codes: Optional[HistoryCodes] = None):
+        self._codes = codes or HistoryCodes()
+        self._competitions = array("i")
+        self._dates = array("i")
+        self._ratings = array("i")
+        for entry in entries:
+            self.append(entry["competition_id"], entry["date"], entry["new_rating"])
+
+    @classmethod
+    def from_json(cls, data: Union["RatingHistory", List[Dict], Dict[str, List]],
+                  codes: Optional[HistoryCodes] = None) -> "RatingHistory":
+        """
+        Build from the columnar JSON form or the older list of entry dicts. A
+        RatingHistory is taken as is if it uses `codes`, and re-encoded otherwise.
+        """
+        if isinstance(data, RatingHistory):
+            if codes is None or data._codes is codes:
+                return data
+            return cls(data, codes)
+        if isinstance(data, dict):
+            history = cls(codes=codes)
+            codes = history._codes
+            history._competitions.extend(codes.encode_competition_id(c) for c in data["competition_id"])
+            history._dates.extend(codes.encode_date(d) for d in data["date"])
+            history._ratings.extend(data["new_rating"])
+            history._sort()
+            return history
+        return cls(data, codes)
+
+    @classmethod
+    def from_codes(cls, codes: HistoryCodes, competition_ids: Union[bytes, Iterable[int]],
+                   dates: Union[bytes, Iterable[int]], ratings: Union[bytes, Iterable[int]]) -> "RatingHistory":
+        """
+        Build from date-ordered columns already encoded with codes.encode_competition_id
+        and codes.encode_date, given as ints or as the raw bytes of native int arrays
+        """
+        history = cls(codes=codes)
+        history._competitions = array("i", competition_ids)
+        history._dates = array("i", dates)
+        history._ratings = array("i", ratings)
+        return history
+
+    def _sort(self):
+        """Restore date order in histories saved before it was kept on insert"""
+        dates = self._dates
+        if all(0 < a <= b for a, b in zip(dates, dates[1:])):
+            return
+        keys = [self._codes.decode_date(code) for code in dates]
+        if all(a <= b for a, b in zip(keys, keys[1:])):
+            return
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self._competitions = array("i", (self._competitions[i] for i in order))
+        self._dates = array("i", (dates[i] for i in order))
+        self._ratings = array("i", (self._ratings[i] for i in order))
+
+    def to_json(self) -> Dict[str, List]:
+        return {
+            "competition_id": list(self.competition_ids()),
+            "date": [self._codes.decode_date(code) for code in self._dates],
+            "new_rating": self._ratings.tolist()
+        }
+
+    def append(self, competition_id: str, date: str, new_rating: int):
+        self._competitions.append(self._codes.encode_competition_id(competition_id))
+        self._dates.append(self._codes.encode_date(date))
+        self._ratings.append(new_rating)
+
+    def insert(self, competition_id: str, date: str, new_rating: int) -> int:
+        """Add an entry after every entry dated on or before `date`; returns its index"""
+        date_code = self._codes.encode_date(date)
+        position = len(self._dates)
+        if position and not self._codes.dated_before(self._dates[-1], date, date_code, or_on=True):
+            position = self.bisect(date, right=True)
+        self._competitions.insert(position, self._codes.encode_competition_id(competition_id))
+        self._dates.insert(position, date_code)
+        self._ratings.insert(position, new_rating)
+        return position
+
+    def set_rating(self, competition_id: str, new_rating: int) -> int:
+        """
+        Change the rating recorded for a competition, searching from the newest
+        entry. Returns the entry's index, or -1 if the competition is not in the history.
+        """
+        code = self._codes.competition_ids.code(competition_id)
+        if code is None:
+            return -1
+        for i in range(len(self._competitions) - 1, -1, -1):
+            if self._competitions[i] == code:
+                self._ratings[i] = new_rating
+                return i
+        return -1
+
+    def bisect(self, date: str, right: bool = False) -> int:
+        """Index of the first entry dated after `date` (right=True) or on or after it"""
+        date_code = _ordinal(date)  # not interned: query dates need not be stored
+        lo, hi = 0, len(self._dates)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._codes.dated_before(self._dates[mid], date, date_code, or_on=right):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def window(self, since: Optional[str] = None, until: Optional[str] = None) -> Tuple[int, int]:
+        """Index range [start, end) of the entries dated within [since, until]"""
+        start = self.bisect(since) if since is not None else 0
+        end = self.bisect(until, right=True) if until is not None else len(self)
+        return start, max(start, end)
+
+    def truncate(self, length: int):
+        """Drop entries from index `length` on"""
+        del self._competitions[length:]
+        del self._dates[length:]
+        del self._ratings[length:]
+
+    def competition_ids(self) -> Iterator[str]:
+        decode = self._codes.competition_ids.decode
+        return (decode(code) for code in self._competitions)
+
+    @property
+    def last_rating(self) -> int:
+        return self._ratings[-1]
+
+    def _entry(self, i: int) -> Dict:
+        return {
+            "competition_id": self._codes.competition_ids.decode(self._competitions[i]),
+            "date": self._codes.decode_date(self._dates[i]),
+            "new_rating": self._ratings[i]
+        }
+
+    def __len__(self):
+        return len(self._ratings)
+
+    def __getitem__(self, i: Union[int, slice]):
+        if isinstance(i, slice):
+            return [self._entry(k) for k in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("history index out of range")
+        return self._entry(i)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return (self._entry(i) for i in range(len(self)))
+
+    def __eq__(self, other):
+        if isinstance(other, RatingHistory) and other._codes is self._codes:
+            return (self._competitions == other._competitions and self._dates == other._dates
+                    and self._ratings == other._ratings)
+        return list(self) == other
+
+DOWNSAMPLE_MODES = ("week", "month", "lttb")
+
+def _period(date: str, mode: str):
+    ordinal = _ordinal(date)
+    if not ordinal:
+        return date  # dates that are not ISO each get their own bucket
+    if mode == "week":
+        return Date.fromordinal(ordinal).isocalendar()[:2]
+    return date[:7]
+
+def last_per_period(entries: List[Dict], mode: str) -> List[Dict]:
+    """The last entry of each calendar week ("week") or month ("month") of date-ordered entries"""
+    kept = []
+    previous = None
+    for entry in entries:
+        period = _period(entry["date"], mode)
+        if kept and period == previous:
+            kept[-1] = entry
+        else:
+            kept.append(entry)
+        previous = period
+    return kept
+
+def lttb(entries: List[Dict], points: int) -> List[Dict]:
+    """
+    Largest-Triangle-Three-Buckets: keep `points` of the date-ordered entries that
+    best preserve the shape of the rating curve, always including the first and last
+    """
+    n = len(entries)
+    points = max(points, 3)
+    if n <= points:
+        return list(entries)
+    xs = [_ordinal(entry["date"]) or i for i, entry in enumerate(entries)]
+    ys = [entry["new_rating"] for entry in entries]
+    kept = [entries[0]]
+    a = 0
+    size = (n - 2) / (points - 2)
+    for bucket in range(points - 2):
+        start = int(bucket * size) + 1
+        end = int((bucket + 1) * size) + 1
+        # Average of the next bucket (or the last point) is the third triangle corner
+        next_start, next_end = end, min(int((bucket + 2) * size) + 1, n)
+        if next_start >= next_end:
+            next_start, next_end = n - 1, n
+        avg_x = sum(xs[next_start:next_end]) / (next_end - next_start)
+        avg_y = sum(ys[next_start:next_end]) / (next_end - next_start)
+        best, best_area = start, -1.0
+        for i in range(start, end):
+            area = abs((xs[a] - avg_x) * (ys[i] - ys[a]) - (xs[a] - xs[i]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = i, area
+        kept.append(entries[best])
+        a = best
+    kept.append(entries[-1])
+    return kept
+
+def downsample(entries: List[Dict], mode: str, points: Optional[int] = None) -> List[Dict]:
+    """Reduce date-ordered history entries for charting; see DOWNSAMPLE_MODES"""
+    if mode == "lttb":
+        return lttb(entries, points or 500)
+    if mode in ("week", "month"):
+        return last_per_period(entries, mode)
+    raise ValueError(f"Unknown downsample mode: {mode}")
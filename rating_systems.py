@@ -0,0 +1,350 @@
+"""
+Rating systems that competition types can choose between.
+
+A rating system maps the state of every player in one competition before it to
+their state after it. A state is the integer rating shown on leaderboards and a
+tuple of extra floats the system keeps per player and type (empty for Elo):
+
+- "elo": the classic per-pair Elo of ELOCalculator
+- "glicko2": Glicko-2, treating each competition as one rating period; a
+  leaderboard counts as every implied head-to-head game, weighted 1 / (N - 1).
+  State: (rating, RD, volatility)
+- "plackett-luce": the Weng-Lin Bayesian approximation of the Plackett-Luce
+  ranking model, rating a whole leaderboard in O(N log N). State: (mu, sigma)
+
+Systems are plain objects holding only their settings, so they can be sent to worker processes.
+"""
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from elo_calculator import ELOCalculator
+from metrics import inc, timed_method
+
+State = Tuple[int, Tuple[float, ...]]  # (rating, extra parameters)
+
+def leaderboard_ratings(calculator: ELOCalculator, initial_ratings: Dict[str, int],
+                        results: List, lower_is_better: bool) -> Dict[str, int]:
+    """Final rating of every player of a leaderboard, given their ratings before it"""
+    # Process all implied head-to-head matches in one vectorized pass
+    new_ratings = calculator.process_field(
+        [initial_ratings[result.player_name] for result in results],
+        [result.rank for result in results],
+        [result.score for result in results],
+        lower_is_better
+    )
+
+    # Accumulate changes from initial ratings
+    total_rating_changes = {player: 0 for player in initial_ratings}
+    for result, new_rating in zip(results, new_ratings):
+        total_rating_changes[result.player_name] += new_rating - initial_ratings[result.player_name]
+
+    # Apply total rating changes to initial ratings
+    return {
+        player: initial_ratings[player] + total_rating_changes[player]
+        for player in initial_ratings
+    }
+
+@timed_method("elo_process_matches_seconds")
+def direct_match_ratings(calculator: ELOCalculator, initial_ratings: Dict[str, int],
+                         matches: List, sequential: bool = False) -> Dict[str, int]:
+    """
+    Final rating of every player of a direct match competition. By default every
+    match is rated from the initial ratings and each player's rating changes
+    from all their matches are summed, like the pairs of a leaderboard. With
+    sequential=True each match is rated from the ratings after the previous ones.
+    """
+    final_ratings = initial_ratings.copy()
+    if not sequential:
+        if matches:
+            new_a, new_b = calculator.process_matches([initial_ratings[match.player_a] for match in matches],
+                                                      [initial_ratings[match.player_b] for match in matches],
+                                                      [match.result for match in matches])
+            for match, rating_a, rating_b in zip(matches, new_a, new_b):
+                final_ratings[match.player_a] += rating_a - initial_ratings[match.player_a]
+                final_ratings[match.player_b] += rating_b - initial_ratings[match.player_b]
+        return final_ratings
+
+    inc("elo_pairs_total", len(matches))
+    for match in matches:
+        new_rating_a, new_rating_b = calculator.process_match(
+            final_ratings[match.player_a],
+            final_ratings[match.player_b],
+            match.result
+        )
+        final_ratings[match.player_a] = new_rating_a
+        final_ratings[match.player_b] = new_rating_b
+    return final_ratings
+
+def placements(results: List, lower_is_better: bool) -> np.ndarray:
+    """
+    Sort key per leaderboard entry (lower is better, equal is a tie): scores when
+    every entry has one, ranks otherwise
+    """
+    if results and all(result.score is not None for result in results):
+        scores = np.array([result.score for result in results], dtype=float)
+        return scores if lower_is_better else -scores
+    return np.array([result.rank for result in results], dtype=float)
+
+class RatingSystem:
+    """Interface of a rating system; see the module docstring"""
+    name = ""
+    has_params = False  # whether the state holds more than the rating
+
+    def initial_params(self) -> Tuple[float, ...]:
+        return ()
+
+    def rate_leaderboard(self, states: Dict[str, State], results: List,
+                         lower_is_better: bool) -> Dict[str, State]:
+        raise NotImplementedError
+
+    def rate_matches(self, states: Dict[str, State], matches: List, sequential: bool = False) -> Dict[str, State]:
+        """sequential=True rates each match from the states left by the previous ones"""
+        raise NotImplementedError
+
+    def expected_scores(self, ratings_a: np.ndarray, params_a: np.ndarray,
+                        ratings_b: np.ndarray, params_b: np.ndarray) -> np.ndarray:
+        """
+        Expected score of player A against player B, broadcast over arrays of
+        ratings and of extra parameters (last axis: the state's floats)
+        """
+        raise NotImplementedError
+
+class EloSystem(RatingSystem):
+    name = "elo"
+
+    def __init__(self, calculator: Optional[ELOCalculator] = None):
+        self.calculator = calculator or ELOCalculator()
+
+    def rate_leaderboard(self, states, results, lower_is_better):
+        ratings = leaderboard_ratings(self.calculator, {p: s[0] for p, s in states.items()}, results,
+                                      lower_is_better)
+        return {player: (rating, ()) for player, rating in ratings.items()}
+
+    def rate_matches(self, states, matches, sequential=False):
+        ratings = direct_match_ratings(self.calculator, {p: s[0] for p, s in states.items()}, matches, sequential)
+        return {player: (rating, ()) for player, rating in ratings.items()}
+
+    def expected_scores(self, ratings_a, params_a, ratings_b, params_b):
+        return self.calculator.expected_scores_for(ratings_a, ratings_b)
+
+class Glicko2System(RatingSystem):
+    """
+    Glicko-2 (Glickman, 2012). All games of a competition form one rating period
+    and every participant is updated once, vectorized over players. A leaderboard
+    player's implied games are weighted 1 / (N - 1). Rating deviations are capped
+    at the initial RD, as Glickman recommends.
+    """
+    name = "glicko2"
+    has_params = True
+    SCALE = 173.7178  # Glicko-2 scale factor (400 / ln 10)
+
+    def __init__(self, rating: float = 1500.0, rd: float = 350.0, volatility: float = 0.06,
+                 tau: float = 0.5, epsilon: float = 1e-6):
+        self.rating = rating
+        self.rd = rd
+        self.volatility = volatility
+        self.tau = tau
+        self.epsilon = epsilon
+
+    def initial_params(self):
+        return (self.rating, self.rd, self.volatility)
+
+    def _params(self, states: Dict[str, State]) -> np.ndarray:
+        return np.array([s[1] or self.initial_params() for s in states.values()], dtype=float).reshape(-1, 3)
+
+    def rate_leaderboard(self, states, results, lower_is_better):
+        players = list(states)
+        position = {player: i for i, player in enumerate(players)}
+        index = np.array([position[result.player_name] for result in results])
+        outcome = ELOCalculator.field_outcomes([r.rank for r in results], [r.score for r in results],
+                                               lower_is_better)
+        rows, cols = np.nonzero(~np.eye(len(results), dtype=bool))
+        keep = index[rows] != index[cols]  # a player listed twice does not play themself
+        player, opponent = index[rows][keep], index[cols][keep]
+        # Each player's N - 1 implied games share the weight of one game against the
+        # field; counted in full, they are far from independent and large fields
+        # drive ratings and volatilities without limit
+        games = np.bincount(player, minlength=len(players))
+        return self._update(players, self._params(states), player, opponent, outcome[rows, cols][keep],
+                            1 / games[player])
+
+    def rate_matches(self, states, matches, sequential=False):
+        if sequential:
+            states = dict(states)
+            for match in matches:  # each match is its own rating period
+                states.update(self.rate_matches(
+                    {match.player_a: states[match.player_a], match.player_b: states[match.player_b]}, [match]))
+            return states
+        players = list(states)
+        position = {player: i for i, player in enumerate(players)}
+        a = np.array([position[m.player_a] for m in matches], dtype=int)
+        b = np.array([position[m.player_b] for m in matches], dtype=int)
+        s = np.array([m.result for m in matches], dtype=float)
+        return self._update(players, self._params(states), np.concatenate([a, b]), np.concatenate([b, a]),
+                            np.concatenate([s, 1 - s]))
+
+    def expected_scores(self, ratings_a, params_a, ratings_b, params_b):
+        """Glicko expectation, with the opponent's uncertainty widened by the player's own"""
+        mu_a = (params_a[..., 0] - 1500) / self.SCALE
+        mu_b = (params_b[..., 0] - 1500) / self.SCALE
+        phi_squares = (params_a[..., 1] ** 2 + params_b[..., 1] ** 2) / self.SCALE ** 2
+        g = 1 / np.sqrt(1 + 3 * phi_squares / math.pi ** 2)
+        return 1 / (1 + np.exp(-g * (mu_a - mu_b)))
+
+    def _update(self, players: List[str], params: np.ndarray, player: np.ndarray, opponent: np.ndarray,
+                score: np.ndarray, weight: Optional[np.ndarray] = None) -> Dict[str, State]:
+        """
+        One rating period; game k is `player[k]` scoring `score[k]` against
+        `opponent[k]` and counts `weight[k]` times (default once)
+        """
+        if weight is None:
+            weight = np.ones(len(player))
+        n = len(players)
+        mu = (params[:, 0] - 1500) / self.SCALE
+        phi = params[:, 1] / self.SCALE
+        sigma = params[:, 2]
+
+        g = 1 / np.sqrt(1 + 3 * phi[opponent] ** 2 / math.pi ** 2)
+        expected = 1 / (1 + np.exp(-g * (mu[player] - mu[opponent])))
+        v_inv = np.bincount(player, weight * g ** 2 * expected * (1 - expected), minlength=n)
+        played = v_inv > 0  # games whose result was certain carry no information
+        v = 1 / np.where(played, v_inv, 1)  # players without games keep mu and sigma
+        improvement = np.bincount(player, weight * g * (score - expected), minlength=n)
+        delta = v * improvement
+
+        new_sigma = np.where(played, self._volatility(phi, sigma, v, delta), sigma)
+        # The pre-period deviation never exceeds a new player's
+        phi_star = np.minimum(np.sqrt(phi ** 2 + new_sigma ** 2), self.rd / self.SCALE)
+        new_phi = 1 / np.sqrt(1 / phi_star ** 2 + v_inv)
+        new_mu = mu + new_phi ** 2 * improvement
+
+        rating = new_mu * self.SCALE + 1500
+        rd = new_phi * self.SCALE
+        return {
+            p: (int(round(rating[i])), (float(rating[i]), float(rd[i]), float(new_sigma[i])))
+            for i, p in enumerate(players)
+        }
+
+    def _volatility(self, phi: np.ndarray, sigma: np.ndarray, v: np.ndarray, delta: np.ndarray) -> np.ndarray:
+        """New volatilities by the Illinois algorithm, iterated for all players at once"""
+        tau2 = self.tau ** 2
+        a = np.log(sigma ** 2)
+
+        def f(x):
+            ex = np.exp(x)
+            return ex * (delta ** 2 - phi ** 2 - v - ex) / (2 * (phi ** 2 + v + ex) ** 2) - (x - a) / tau2
+
+        big = delta ** 2 > phi ** 2 + v
+        low = np.full_like(a, 1.0)
+        B = np.where(big, np.log(np.where(big, delta ** 2 - phi ** 2 - v, 1)), a - self.tau)
+        for _ in range(100):
+            need = ~big & (f(B) < 0)
+            if not need.any():
+                break
+            low += need
+            B = np.where(need, a - low * self.tau, B)
+        A = a.copy()
+        fA, fB = f(A), f(B)
+        for _ in range(100):
+            active = np.abs(B - A) > self.epsilon
+            if not active.any():
+                break
+            C = A + (A - B) * fA / np.where(active, fB - fA, 1)
+            fC = f(C)
+            swap = fC * fB <= 0
+            A = np.where(active & swap, B, A)
+            fA = np.where(active, np.where(swap, fB, fA / 2), fA)
+            B = np.where(active, C, B)
+            fB = np.where(active, fC, fB)
+        return np.exp(A / 2)
+
+class PlackettLuceSystem(RatingSystem):
+    """
+    Weng-Lin (2011) Bayesian approximation of the Plackett-Luce model. One
+    leaderboard update sorts the field once and uses prefix sums, O(N log N).
+    Direct matches are always rated one after another as two-player rankings.
+    """
+    name = "plackett-luce"
+    has_params = True
+
+    def __init__(self, mu: float = 1500.0, sigma: float = 500.0, beta: float = 250.0, kappa: float = 1e-4):
+        self.mu = mu
+        self.sigma = sigma
+        self.beta = beta
+        self.kappa = kappa
+
+    def initial_params(self):
+        return (self.mu, self.sigma)
+
+    def expected_scores(self, ratings_a, params_a, ratings_b, params_b):
+        """Chance that A places ahead of B in a two-player Plackett-Luce ranking"""
+        c = np.sqrt(params_a[..., 1] ** 2 + params_b[..., 1] ** 2 + 2 * self.beta ** 2)
+        return 1 / (1 + np.exp(-(params_a[..., 0] - params_b[..., 0]) / c))
+
+    def rate_leaderboard(self, states, results, lower_is_better):
+        players = list(dict.fromkeys(result.player_name for result in results))
+        first = {}
+        for result, key in zip(results, placements(results, lower_is_better)):
+            first.setdefault(result.player_name, key)  # a player listed twice keeps their best place
+        params = np.array([states[p][1] or self.initial_params() for p in players], dtype=float).reshape(-1, 2)
+        mu, sigma = self.rank_update(params[:, 0], params[:, 1], np.array([first[p] for p in players]))
+        return {p: (int(round(mu[i])), (float(mu[i]), float(sigma[i]))) for i, p in enumerate(players)}
+
+    def rate_matches(self, states, matches, sequential=False):
+        current = {p: s[1] or self.initial_params() for p, s in states.items()}
+        for match in matches:
+            mu, sigma = self.rank_update(
+                np.array([current[match.player_a][0], current[match.player_b][0]]),
+                np.array([current[match.player_a][1], current[match.player_b][1]]),
+                np.array([-match.result, match.result - 1]))  # win: A placed first; draw: tie
+            current[match.player_a] = (float(mu[0]), float(sigma[0]))
+            current[match.player_b] = (float(mu[1]), float(sigma[1]))
+        return {p: (int(round(params[0])), params) for p, params in current.items()}
+
+    def rank_update(self, mu: np.ndarray, sigma: np.ndarray, key: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+        """New (mu, sigma) for one ranking; lower key is a better place, equal keys tie"""
+        n = len(mu)
+        if n < 2:
+            return mu.copy(), sigma.copy()
+        c = math.sqrt(float(np.sum(sigma ** 2 + self.beta ** 2)))
+        order = np.argsort(np.asarray(key), kind="stable")
+        sorted_key = np.asarray(key)[order]
+        strength = np.exp((mu[order] - mu.max()) / c)  # shifted for stability; only ratios matter
+
+        # Tie groups in sorted order: start and end position of each entry's group
+        new_group = np.r_[True, sorted_key[1:] != sorted_key[:-1]]
+        group = np.cumsum(new_group) - 1
+        starts = np.flatnonzero(new_group)
+        ends = np.r_[starts[1:], n] - 1
+        size = (ends - starts + 1)[group]
+
+        # S_q: total strength of everyone placed at or below q's group
+        suffix = np.cumsum(strength[::-1])[::-1]
+        total_below = suffix[starts][group]
+        # Sums over every q placed at or above i (i's whole tie group included)
+        p1 = np.cumsum(1 / (total_below * size))[ends[group]]
+        p2 = np.cumsum(1 / (total_below ** 2 * size))[ends[group]]
+
+        s2 = sigma[order] ** 2
+        omega = s2 / c * (1 / size - strength * p1)
+        delta = (sigma[order] / c) * s2 / c ** 2 * (strength * p1 - strength ** 2 * p2)
+
+        new_mu = np.empty(n)
+        new_sigma = np.empty(n)
+        new_mu[order] = mu[order] + omega
+        new_sigma[order] = sigma[order] * np.sqrt(np.maximum(1 - delta, self.kappa))
+        return new_mu, new_sigma
+
+RATING_SYSTEMS = {
+    EloSystem.name: EloSystem,
+    Glicko2System.name: Glicko2System,
+    PlackettLuceSystem.name: PlackettLuceSystem
+}
+
+def create_rating_system(name: str, **options) -> RatingSystem:
+    """Instantiate a rating system by name"""
+    if name not in RATING_SYSTEMS:
+        raise ValueError(f"Unknown rating system: {name}")
+    return RATING_SYSTEMS[name](**options)
@@ -0,0 +1,194 @@
+"""
+Monte Carlo projections of competitions that have not been played (or finished).
+
+Outcomes are sampled in batches with NumPy. In a leaderboard every player's
+performance is their rating plus Gumbel noise with scale 400 / ln 10, so the
+difference of two performances is logistic and player A finishes ahead of
+player B with exactly the Elo expected score. A direct match is won by A with
+probability equal to A's expected score; draws are not simulated. Every sampled
+outcome is rated like CompetitionManager would rate it with Elo, so the
+projected rating changes match what processing the competition would produce.
+
+Nothing here reads or writes player or competition data; callers pass the
+ratings (see CompetitionManager.simulate_leaderboard and simulate_matches, which
+refuse types rated with Glicko-2 or Plackett-Luce).
+Simulations run in blocks with their own random streams, spread over the shared
+worker processes (see worker_pool). Results depend only on the seed, not on the
+number of workers.
+"""
+import math
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from elo_calculator import ELOCalculator
+from worker_pool import map_in_workers
+
+PERFORMANCE_SCALE = 400 / math.log(10)  # Gumbel scale that reproduces the Elo expected score
+BLOCK_SIMULATIONS = 1000  # simulations per block, each with its own random stream
+BLOCK_CELLS = 4_000_000  # players x players x simulations evaluated at once within a block
+PARALLEL_MIN_SIMULATIONS = 2 * BLOCK_SIMULATIONS  # fewer are not worth spreading over worker processes
+
+class Projection:
+    """Rank distribution and rating changes of each player over all simulations"""
+
+    def __init__(self, players: List[str], ratings: np.ndarray, simulations: int,
+                 rank_counts: np.ndarray, delta_sum: np.ndarray, delta_squares: np.ndarray):
+        self.players = players
+        self.ratings = ratings
+        self.simulations = simulations
+        # rank_probabilities[i, k]: chance that player i finishes in place k + 1
+        self.rank_probabilities = rank_counts / simulations
+        self.expected_rank = self.rank_probabilities @ np.arange(1, len(players) + 1)
+        self.expected_delta = delta_sum / simulations
+        self.delta_std = np.sqrt(np.maximum(delta_squares / simulations - self.expected_delta ** 2, 0))
+
+    def to_dict(self):
+        return {
+            "simulations": self.simulations,
+            "players": [
+                {
+                    "name": name,
+                    "rating": int(self.ratings[i]),
+                    "expected_rank": round(float(self.expected_rank[i]), 4),
+                    "win_probability": round(float(self.rank_probabilities[i, 0]), 6),
+                    "rank_probabilities": self.rank_probabilities[i].round(6).tolist(),
+                    "expected_delta": round(float(self.expected_delta[i]), 4),
+                    "delta_std": round(float(self.delta_std[i]), 4)
+                }
+                for i, name in enumerate(self.players)
+            ]
+        }
+
+def _field_changes(calculator: ELOCalculator, ratings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Rating change of player i from finishing ahead of / behind player j, exactly as
+    ELOCalculator.process_field rounds it: win[i, j] and loss[i, j]
+    """
+    n = len(ratings)
+    expected = calculator.expected_scores(ratings[None, :] - ratings[:, None])
+    upper = np.triu(np.ones((n, n), dtype=bool), k=1)
+    # process_field rates each pair once, the later player with 1 - the earlier one's expectation
+    expected = np.where(upper, expected, (1 - expected).T)
+    win = np.round(ratings[:, None] + calculator.k_factor * (1 - expected)) - ratings[:, None]
+    loss = np.round(ratings[:, None] + calculator.k_factor * (0 - expected)) - ratings[:, None]
+    np.fill_diagonal(win, 0)
+    np.fill_diagonal(loss, 0)
+    return win, loss
+
+def _leaderboard_block(calculator: ELOCalculator, ratings: np.ndarray, simulations: int,
+                       seed: np.random.SeedSequence) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    n = len(ratings)
+    win, loss = _field_changes(calculator, ratings)
+    base = loss.sum(axis=1)
+    gain = win - loss
+    rank_counts = np.zeros(n * n, dtype=np.int64)
+    delta_sum = np.zeros(n)
+    delta_squares = np.zeros(n)
+    chunk = max(1, BLOCK_CELLS // (n * n))
+    for start in range(0, simulations, chunk):
+        size = min(chunk, simulations - start)
+        performance = ratings + rng.gumbel(scale=PERFORMANCE_SCALE, size=(size, n))
+        order = np.argsort(-performance, axis=1)
+        places = np.empty_like(order)
+        np.put_along_axis(places, order, np.arange(n), axis=1)
+        rank_counts += np.bincount((np.arange(n) * n + places).ravel(), minlength=n * n)
+        ahead = performance[:, :, None] > performance[:, None, :]
+        changes = base + np.einsum("sij,ij->si", ahead, gain)
+        deltas = np.round(ratings + changes) - ratings
+        delta_sum += deltas.sum(axis=0)
+        delta_squares += (deltas ** 2).sum(axis=0)
+    return rank_counts.reshape(n, n), delta_sum, delta_squares
+
+def _matches_block(calculator: ELOCalculator, ratings: np.ndarray, pairs: np.ndarray, sequential: bool,
+                   simulations: int, seed: np.random.SeedSequence) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Rates the sampled matches one after another, vectorized over simulations (see direct_match_ratings)"""
+    rng = np.random.default_rng(seed)
+    n = len(ratings)
+    k = calculator.k_factor
+    final = np.tile(ratings, (simulations, 1))
+    current = final if sequential else np.broadcast_to(ratings, final.shape)
+    points = np.zeros((simulations, n))
+    draws = rng.random((simulations, len(pairs)))
+    for m, (a, b) in enumerate(pairs):
+        rating_a, rating_b = current[:, a], current[:, b]
+        expected_a = calculator.expected_scores(rating_b - rating_a)
+        result = (draws[:, m] < expected_a).astype(float)
+        new_a = np.round(rating_a + k * (result - expected_a))
+        new_b = np.round(rating_b + k * ((1 - result) - (1 - expected_a)))
+        if sequential:
+            final[:, a] = new_a
+            final[:, b] = new_b
+        else:  # changes from every match add up
+            final[:, a] += new_a - rating_a
+            final[:, b] += new_b - rating_b
+        points[:, a] += result
+        points[:, b] += 1 - result
+    # Standings by points; tied players share the better place
+    places = (points[:, None, :] > points[:, :, None]).sum(axis=2)
+    rank_counts = np.bincount((np.arange(n) * n + places).ravel(), minlength=n * n)
+    deltas = final - ratings
+    return rank_counts.reshape(n, n), deltas.sum(axis=0), (deltas ** 2).sum(axis=0)
+
+def _run_block(task: Tuple) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """One (block function, its arguments, simulations, seed) task of map_in_workers"""
+    block, args, simulations, seed = task
+    return block(*args, simulations, seed)
+
+def _run(block, args: Tuple, simulations: int, seed: Optional[int], workers: Optional[int]):
+    blocks = [BLOCK_SIMULATIONS] * (simulations // BLOCK_SIMULATIONS)
+    if simulations % BLOCK_SIMULATIONS:
+        blocks.append(simulations % BLOCK_SIMULATIONS)
+    seeds = np.random.SeedSequence(seed).spawn(len(blocks))
+    workers = (workers or os.cpu_count() or 1) if simulations >= PARALLEL_MIN_SIMULATIONS else 1
+    parts = map_in_workers(_run_block, [(block, args, size, block_seed) for size, block_seed in zip(blocks, seeds)],
+                           workers)
+    return [sum(part[i] for part in parts) for i in range(3)]
+
+def _check_simulations(simulations: int):
+    if simulations < 1:
+        raise ValueError("At least one simulation is needed")
+
+def simulate_leaderboard(ratings: Dict[str, int], simulations: int = 10000,
+                         calculator: Optional[ELOCalculator] = None, seed: Optional[int] = None,
+                         workers: Optional[int] = None) -> Projection:
+    """
+    Project a leaderboard competition of the players in `ratings` (name -> rating,
+    in entry order): place probabilities and Elo rating changes over
+    `simulations` sampled finishing orders.
+    """
+    _check_simulations(simulations)
+    players = list(ratings)
+    if len(players) < 2:
+        raise ValueError("A leaderboard needs at least two players")
+    values = np.array([ratings[p] for p in players], dtype=float)
+    totals = _run(_leaderboard_block, (calculator or ELOCalculator(), values), simulations, seed, workers)
+    return Projection(players, values, simulations, *totals)
+
+def simulate_matches(ratings: Dict[str, int], schedule: Sequence[Tuple[str, str]], simulations: int = 10000,
+                     calculator: Optional[ELOCalculator] = None, sequential: bool = False,
+                     seed: Optional[int] = None, workers: Optional[int] = None) -> Projection:
+    """
+    Project a direct match competition: the (player_a, player_b) matches of
+    `schedule` are sampled and rated each from the ratings before the competition
+    (summing each player's changes), or with sequential=True from the ratings
+    after the previous match. Places
+    are by points (1 per win).
+    """
+    _check_simulations(simulations)
+    if not schedule:
+        raise ValueError("The schedule has no matches")
+    players = list(dict.fromkeys([*ratings, *(name for pair in schedule for name in pair)]))
+    missing = [p for p in players if p not in ratings]
+    if missing:
+        raise ValueError(f"No rating given for {', '.join(missing)}")
+    position = {player: i for i, player in enumerate(players)}
+    pairs = np.array([(position[a], position[b]) for a, b in schedule], dtype=np.intp)
+    if (pairs[:, 0] == pairs[:, 1]).any():
+        raise ValueError("A player cannot play themself")
+    values = np.array([ratings[p] for p in players], dtype=float)
+    totals = _run(_matches_block, (calculator or ELOCalculator(), values, pairs, sequential),
+                  simulations, seed, workers)
+    return Projection(players, values, simulations, *totals)
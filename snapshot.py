@@ -0,0 +1,343 @@
+"""
+Columnar snapshots of the rating data.
+
+A snapshot is a directory with one file per table plus a manifest:
+
+- players: every player, in creation order
+- ratings: current rating and rating system state per player and competition type
+- competitions: competitions in submission order
+- leaderboard_results and matches: the results of both competition formats
+- history: every player's rating history, per competition type in date order
+
+Player names, competition ids and other repeated strings are dictionary encoded
+(pandas categoricals sharing one dictionary across tables). Tables are written as
+Parquet when pyarrow or fastparquet is installed, and otherwise as compressed
+NumPy archives of the same columns; read_snapshot returns the same DataFrames for
+both. CompetitionManager.from_snapshot starts a manager from a snapshot without
+parsing the storage backend's files.
+
+    python snapshot.py export data snapshots/2025-03-13
+    python snapshot.py import snapshots/2025-03-13 data --storage sqlite
+"""
+import importlib.util
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from rating_history import HistoryCodes, RatingHistory
+from storage import write_atomic
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_FORMATS = ("parquet", "npz")
+TABLES = ("players", "ratings", "competitions", "leaderboard_results", "matches", "history")
+MANIFEST = "manifest.json"
+
+def parquet_available() -> bool:
+    return any(importlib.util.find_spec(engine) for engine in ("pyarrow", "fastparquet"))
+
+def _categorical(values: List, categories) -> pd.Categorical:
+    return pd.Categorical(values, categories=categories)
+
+def snapshot_frames(manager) -> Dict[str, pd.DataFrame]:
+    """The manager's players, ratings, competitions, results and histories as DataFrames"""
+    with manager.lock:
+        players = manager.player_manager.players
+        competitions = manager.competitions
+        names = list(players)
+        competition_ids = list(competitions)
+        types = sorted(set(manager.competition_types).union(
+            ct for player in players.values() for ct in (*player.ratings, *player.competition_history)))
+
+        ratings = {"player": [], "competition_type": [], "rating": []}
+        params: List[tuple] = []
+        history = {"player": [], "competition_type": [], "competition_id": [], "date": [], "new_rating": []}
+        for name, player in players.items():
+            for competition_type, rating in player.ratings.items():
+                ratings["player"].append(name)
+                ratings["competition_type"].append(competition_type)
+                ratings["rating"].append(rating)
+                params.append(player.get_rating_params(competition_type))
+            for competition_type, entries in player.competition_history.items():
+                columns = entries.to_json()
+                history["player"].extend([name] * len(entries))
+                history["competition_type"].extend([competition_type] * len(entries))
+                history["competition_id"].extend(columns["competition_id"])
+                history["date"].extend(columns["date"])
+                history["new_rating"].extend(columns["new_rating"])
+
+        leaderboard = {"competition_id": [], "player": [], "rank": [], "score": [], "integer_score": []}
+        matches = {"competition_id": [], "player_a": [], "player_b": [], "result": []}
+        for competition_id, competition in competitions.items():
+            for result in competition.results:
+                if competition.format_type == "leaderboard":
+                    leaderboard["competition_id"].append(competition_id)
+                    leaderboard["player"].append(result.player_name)
+                    leaderboard["rank"].append(result.rank)
+                    leaderboard["score"].append(np.nan if result.score is None else result.score)
+                    leaderboard["integer_score"].append(isinstance(result.score, int))
+                else:
+                    matches["competition_id"].append(competition_id)
+                    matches["player_a"].append(result.player_a)
+                    matches["player_b"].append(result.player_b)
+                    matches["result"].append(result.result)
+
+        # Players that only appear in results (never rated) still need a code
+        known = set(names)
+        extra = {n for column in (leaderboard["player"], matches["player_a"], matches["player_b"])
+                 for n in column if n not in known}
+        player_categories = names + sorted(extra)
+        competition_categories = competition_ids + sorted(set(history["competition_id"]) - set(competition_ids))
+        dates = sorted({c.date for c in competitions.values()}.union(history["date"]))
+
+        ratings_frame = pd.DataFrame({
+            "player": _categorical(ratings["player"], player_categories),
+            "competition_type": _categorical(ratings["competition_type"], types),
+            "rating": np.array(ratings["rating"], dtype=np.int32)
+        })
+        # Rating system state is a tuple whose length depends on the system; shorter
+        # tuples are padded with NaN
+        width = max((len(p) for p in params), default=0)
+        for i in range(width):
+            ratings_frame[f"param_{i}"] = np.array([p[i] if i < len(p) else np.nan for p in params],
+                                                   dtype=np.float64)
+
+        return {
+            "players": pd.DataFrame({"player": _categorical(names, player_categories)}),
+            "ratings": ratings_frame,
+            "competitions": pd.DataFrame({
+                "competition_id": _categorical(competition_ids, competition_categories),
+                "name": pd.Categorical([c.name for c in competitions.values()]),
+                "date": _categorical([c.date for c in competitions.values()], dates),
+                "competition_type": _categorical([c.competition_type for c in competitions.values()], types),
+                "format_type": pd.Categorical([c.format_type for c in competitions.values()],
+                                              categories=["leaderboard", "direct_matches"]),
+                "processed": np.array([c.processed for c in competitions.values()], dtype=bool),
+                "mode": pd.Categorical([c.mode for c in competitions.values()],
+                                       categories=["sequential", "live"])
+            }),
+            "leaderboard_results": pd.DataFrame({
+                "competition_id": _categorical(leaderboard["competition_id"], competition_categories),
+                "player": _categorical(leaderboard["player"], player_categories),
+                "rank": np.array(leaderboard["rank"], dtype=np.int32),
+                "score": np.array(leaderboard["score"], dtype=np.float64),
+                "integer_score": np.array(leaderboard["integer_score"], dtype=bool)
+            }),
+            "matches": pd.DataFrame({
+                "competition_id": _categorical(matches["competition_id"], competition_categories),
+                "player_a": _categorical(matches["player_a"], player_categories),
+                "player_b": _categorical(matches["player_b"], player_categories),
+                "result": np.array(matches["result"], dtype=np.float64)
+            }),
+            "history": pd.DataFrame({
+                "player": _categorical(history["player"], player_categories),
+                "competition_type": _categorical(history["competition_type"], types),
+                "competition_id": _categorical(history["competition_id"], competition_categories),
+                "date": _categorical(history["date"], dates),
+                "new_rating": np.array(history["new_rating"], dtype=np.int32)
+            })
+        }
+
+def _write_npz(frame: pd.DataFrame, path: Path):
+    """Categorical columns are stored as codes plus their dictionary"""
+    arrays = {}
+    for column in frame.columns:
+        values = frame[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            arrays[f"{column}.codes"] = values.cat.codes.to_numpy()
+            arrays[f"{column}.categories"] = np.array(values.cat.categories.tolist(), dtype=str)
+        else:
+            arrays[column] = values.to_numpy()
+    with open(path, "wb") as f:
+        np.savez_compressed(f, **arrays)
+
+def _read_npz(path: Path) -> pd.DataFrame:
+    columns = {}
+    with np.load(path, allow_pickle=False) as data:
+        for key in data.files:
+            column, _, part = key.partition(".")
+            if part == "codes":
+                columns[column] = pd.Categorical.from_codes(
+                    data[key], data[f"{column}.categories"].tolist(), validate=False)
+            elif not part:
+                columns[column] = data[key]
+    return pd.DataFrame(columns)
+
+def write_snapshot(manager, path: Union[str, Path], file_format: Optional[str] = None) -> Dict:
+    """
+    Write a snapshot of the manager's data to the directory `path`. file_format is
+    "parquet" (the default when a Parquet engine is installed) or "npz".
+    Returns the manifest.
+    """
+    file_format = file_format or ("parquet" if parquet_available() else "npz")
+    if file_format not in SNAPSHOT_FORMATS:
+        raise ValueError(f"Unknown snapshot format: {file_format}")
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    with manager.lock:
+        frames = snapshot_frames(manager)
+        rating_systems = dict(manager.rating_systems)
+        storage_version = manager.storage.version()
+    for table, frame in frames.items():
+        table_path = path / f"{table}.{file_format}"
+        if file_format == "parquet":
+            frame.to_parquet(table_path, index=False)
+        else:
+            _write_npz(frame, table_path)
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "format": file_format,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "rating_systems": rating_systems,
+        "storage_version": storage_version,  # the backend's data the snapshot was taken of
+        "rows": {table: len(frame) for table, frame in frames.items()}
+    }
+    write_atomic(path / MANIFEST, json.dumps(manifest, indent=2))
+    return manifest
+
+def read_manifest(path: Union[str, Path]) -> Dict:
+    with open(Path(path) / MANIFEST, "r") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version: {manifest.get('version')}")
+    return manifest
+
+def read_snapshot(path: Union[str, Path], tables=TABLES) -> Dict[str, pd.DataFrame]:
+    """The snapshot's tables as DataFrames, with categorical name and id columns"""
+    path = Path(path)
+    file_format = read_manifest(path)["format"]
+    frames = {}
+    for table in tables:
+        table_path = path / f"{table}.{file_format}"
+        frames[table] = pd.read_parquet(table_path) if file_format == "parquet" else _read_npz(table_path)
+    return frames
+
+def _groups(codes: np.ndarray) -> Iterator[tuple]:
+    """(code, start, end) of each run of equal codes"""
+    if len(codes) == 0:
+        return
+    starts = np.concatenate(([0], np.flatnonzero(codes[1:] != codes[:-1]) + 1))
+    ends = np.append(starts[1:], len(codes))
+    yield from zip(codes[starts].tolist(), starts.tolist(), ends.tolist())
+
+def _decoder(column: pd.Series):
+    """Codes and an object array of the dictionary of a categorical column"""
+    return column.cat.codes.to_numpy(), np.array(column.cat.categories.tolist() + [None], dtype=object)
+
+class SnapshotStorage:
+    """
+    Storage that loads players and competitions from snapshot tables and passes
+    everything else (saves, lazy loads, closing) to a backend.
+    """
+
+    def __init__(self, frames: Dict[str, pd.DataFrame], backend):
+        self.frames = frames
+        self.backend = backend
+        self.history_codes = HistoryCodes()  # adopted by the PlayerManager loading the histories
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def load_players(self) -> Iterator[Dict]:
+        players = {name: {"name": name, "ratings": {}, "rating_params": {}, "competition_history": {}}
+                   for name in self.frames["players"]["player"].astype(object).tolist()}
+
+        ratings = self.frames["ratings"]
+        param_columns = [c for c in ratings.columns if c.startswith("param_")]
+        params = ratings[param_columns].to_numpy() if param_columns else np.empty((len(ratings), 0))
+        for name, competition_type, rating, row in zip(ratings["player"].astype(object).tolist(),
+                                                       ratings["competition_type"].astype(object).tolist(),
+                                                       ratings["rating"].tolist(), params.tolist()):
+            player = players[name]
+            player["ratings"][competition_type] = rating
+            row = [value for value in row if value == value]  # drop NaN padding
+            if row:
+                player["rating_params"][competition_type] = row
+
+        # Histories are built from columns encoded once per distinct id and date
+        history = self.frames["history"]
+        codes = self.history_codes
+        player_codes, player_names = _decoder(history["player"])
+        type_codes, type_names = _decoder(history["competition_type"])
+        id_codes = history["competition_id"].cat.codes.to_numpy()
+        ids = np.array([codes.encode_competition_id(c) for c in history["competition_id"].cat.categories], dtype=np.intc)
+        date_codes = history["date"].cat.codes.to_numpy()
+        dates = np.array([codes.encode_date(d) for d in history["date"].cat.categories], dtype=np.intc)
+        encoded_ids, encoded_dates = ids[id_codes], dates[date_codes]
+        new_ratings = history["new_rating"].to_numpy().astype(np.intc)
+        group_codes = player_codes.astype(np.int64) * (len(type_names) + 1) + type_codes
+        for _, start, end in _groups(group_codes):
+            player = players[player_names[player_codes[start]]]
+            player["competition_history"][type_names[type_codes[start]]] = RatingHistory.from_codes(
+                codes, encoded_ids[start:end].tobytes(), encoded_dates[start:end].tobytes(),
+                new_ratings[start:end].tobytes())
+        yield from players.values()
+
+    def load_competitions(self) -> Iterator[Dict]:
+        results: Dict[str, List[Dict]] = {}
+        leaderboard = self.frames["leaderboard_results"]
+        id_codes, ids = _decoder(leaderboard["competition_id"])
+        scores = [None if score != score else int(score) if integer else score
+                  for score, integer in zip(leaderboard["score"].tolist(), leaderboard["integer_score"].tolist())]
+        names = leaderboard["player"].astype(object).tolist()
+        ranks = leaderboard["rank"].tolist()
+        for code, start, end in _groups(id_codes):
+            results[ids[code]] = [{"player_name": names[i], "rank": ranks[i], "score": scores[i]}
+                                  for i in range(start, end)]
+
+        matches = self.frames["matches"]
+        id_codes, ids = _decoder(matches["competition_id"])
+        players_a = matches["player_a"].astype(object).tolist()
+        players_b = matches["player_b"].astype(object).tolist()
+        outcomes = matches["result"].tolist()
+        for code, start, end in _groups(id_codes):
+            results[ids[code]] = [{"player_a": players_a[i], "player_b": players_b[i], "result": outcomes[i]}
+                                  for i in range(start, end)]
+
+        competitions = self.frames["competitions"]
+        columns = zip(*(competitions[c].astype(object).tolist() for c in
+                        ("competition_id", "name", "date", "competition_type", "format_type", "mode")),
+                      competitions["processed"].tolist())
+        for competition_id, name, date, competition_type, format_type, mode, processed in columns:
+            data = {
+                "competition_id": competition_id,
+                "name": name,
+                "date": date,
+                "competition_type": competition_type,
+                "format_type": format_type,
+                "results": results.get(competition_id, []),
+                "processed": processed
+            }
+            if mode == mode and mode is not None:  # NaN when absent
+                data["mode"] = mode
+            yield data
+
+if __name__ == "__main__":
+    import argparse
+
+    from competition_manager import CompetitionManager
+
+    parser = argparse.ArgumentParser(description="Export or import a columnar snapshot of the rating data")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="write a snapshot of a data directory")
+    export_parser.add_argument("data_dir")
+    export_parser.add_argument("snapshot_dir")
+    export_parser.add_argument("--format", choices=SNAPSHOT_FORMATS, help="parquet if an engine is installed")
+    import_parser = subparsers.add_parser("import", help="restore a snapshot into a data directory")
+    import_parser.add_argument("snapshot_dir")
+    import_parser.add_argument("data_dir")
+    for subparser in (export_parser, import_parser):
+        subparser.add_argument("--storage", default="json", choices=["json", "json-lazy", "sqlite", "eventlog"])
+    args = parser.parse_args()
+
+    if args.command == "export":
+        manifest = write_snapshot(CompetitionManager(args.data_dir, storage=args.storage),
+                                  args.snapshot_dir, args.format)
+        print(json.dumps(manifest["rows"]))
+    else:
+        manager = CompetitionManager.from_snapshot(args.snapshot_dir, args.data_dir, storage=args.storage)
+        print(f"Restored {len(manager.player_manager.players)} players and "
+              f"{len(manager.competitions)} competitions into {args.data_dir}")
@@ -0,0 +1,699 @@
+import json
+import mmap
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from metrics import inc
+
+def write_atomic(path: Path, text: str, sync: bool = False):
+    """
+    Replace a file's contents so readers see either the old or the new text.
+    With sync=True the new contents are on disk before the file is replaced.
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def file_versions(*paths: Path) -> List[Optional[List[int]]]:
+    """Size and modification time of each file (None if missing), to tell whether it changed"""
+    versions = []
+    for path in paths:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            versions.append(None)
+            continue
+        versions.append([stat.st_size, stat.st_mtime_ns])
+    return versions
+
+class RecordFile:
+    """
+    A JSON array written one record at a time, with a sidecar index holding each
+    record's byte range and summary fields. With a valid index, single records
+    are parsed from a memory map on demand instead of loading the whole file.
+    The map is guarded by a lock so lazy loads from reader threads never see it
+    closed or replaced by a concurrent write.
+    """
+
+    def __init__(self, path: Path, key: str, indent: Optional[int] = None):
+        self.path = path
+        self.index_path = path.with_name(path.stem + ".index.json")
+        self.key = key
+        self.indent = indent
+        self._map: Optional[mmap.mmap] = None
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.RLock()
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def read_all(self) -> List[Dict]:
+        with open(self.path, 'r') as f:
+            return json.load(f)
+
+    def read_index(self) -> Optional[List[Dict]]:
+        """Summary entries from the index and map the data file, or None if the index is missing or stale"""
+        if not (self.path.exists() and self.index_path.exists()):
+            return None
+        with open(self.index_path, 'r') as f:
+            index = json.load(f)
+        stat = self.path.stat()
+        if index.get("size") != stat.st_size or index.get("mtime_ns") != stat.st_mtime_ns:
+            return None
+        with self._lock:
+            self._offsets = {e[self.key]: (e["offset"], e["length"]) for e in index["entries"]}
+            self._open_map()
+        return index["entries"]
+
+    def raw(self, key: str) -> Optional[bytes]:
+        """Encoded record from the mapped file, if the file is mapped and holds it"""
+        with self._lock:
+            if self._map is None or key not in self._offsets:
+                return None
+            offset, length = self._offsets[key]
+            return self._map[offset:offset + length]
+
+    def read(self, key: str) -> Dict:
+        return json.loads(self.raw(key))
+
+    def encode(self, record: Dict) -> bytes:
+        separators = None if self.indent else (',', ':')
+        return json.dumps(record, indent=self.indent, separators=separators).encode()
+
+    def write(self, records: Iterable[Tuple[str, Dict, bytes]]):
+        """
+        Write (key, summary, encoded record) triples to a temporary file, move it
+        over the data file and rewrite the index. The data is flushed to disk before
+        the move, so a crash leaves either the old or the new file. A mapped file is
+        remapped.
+        """
+        entries = []
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with self._lock:
+            with open(tmp_path, 'wb') as f:
+                f.write(b"[\n")
+                offset = 2
+                for i, (key, summary, raw) in enumerate(records):
+                    if i:
+                        f.write(b",\n")
+                        offset += 2
+                    f.write(raw)
+                    entries.append({**summary, self.key: key, "offset": offset, "length": len(raw)})
+                    offset += len(raw)
+                f.write(b"\n]\n")
+                f.flush()
+                os.fsync(f.fileno())
+                inc("elo_storage_bytes_written_total", f.tell(), file=self.path.name)
+            was_mapped = self._map is not None
+            self.close()
+            os.replace(tmp_path, self.path)
+
+            stat = self.path.stat()
+            index = json.dumps({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "entries": entries})
+            write_atomic(self.index_path, index)
+            inc("elo_storage_bytes_written_total", len(index), file=self.index_path.name)
+            self._offsets = {e[self.key]: (e["offset"], e["length"]) for e in entries}
+            if was_mapped:
+                self._open_map()
+
+    def _open_map(self):
+        self.close()
+        if self.path.stat().st_size:
+            with open(self.path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+
+class JSONStorage:
+    """
+    Stores players and competitions as JSON files in the data directory.
+
+    With lazy=True only the small index files are parsed at startup; player
+    histories and competition results are read from the memory-mapped data
+    files when first accessed, and records that were never loaded are copied
+    through unchanged on save.
+    """
+
+    def __init__(self, data_dir: Union[str, Path] = "data", lazy: bool = False):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(exist_ok=True)
+        self.lazy = lazy
+        self.players_file = self.data_dir / "players.json"
+        self.competitions_file = self.data_dir / "competitions.json"
+        self._players = RecordFile(self.players_file, "name")
+        self._competitions = RecordFile(self.competitions_file, "competition_id", indent=2)
+
+    def load_players(self) -> Iterator[Dict]:
+        entries = self._players.read_index() if self.lazy else None
+        if entries is not None:
+            for entry in entries:
+                yield {"name": entry["name"], "ratings": entry["ratings"],
+                       "rating_params": entry.get("rating_params", {})}
+        elif self._players.exists():
+            yield from self._players.read_all()
+
+    def load_player_history(self, name: str) -> Dict[str, List[Dict]]:
+        return self._players.read(name)["competition_history"]
+
+    def save_players(self, players: Dict, dirty: Set[str]):
+        # Histories are stored column-wise; indentation would put every value on its own line
+        def records():
+            for name, player in players.items():
+                raw = None
+                if not player.history_loaded and name not in dirty:
+                    raw = self._players.raw(name)
+                summary = {"ratings": player.ratings}
+                if player.rating_params:
+                    summary["rating_params"] = player.rating_params
+                yield name, summary, raw or self._players.encode(player.to_dict())
+        self._players.write(records())
+
+    def load_competitions(self) -> Iterator[Dict]:
+        entries = self._competitions.read_index() if self.lazy else None
+        if entries is not None:
+            for entry in entries:
+                yield {k: v for k, v in entry.items() if k not in ("offset", "length")}
+        elif self._competitions.exists():
+            yield from self._competitions.read_all()
+
+    def load_competition_results(self, competition_id: str, format_type: str) -> List[Dict]:
+        return self._competitions.read(competition_id)["results"]
+
+    def save_competitions(self, competitions: Dict, dirty: Set[str]):
+        def records():
+            for competition_id, competition in competitions.items():
+                raw = None
+                if not competition.results_loaded and competition_id not in dirty:
+                    raw = self._competitions.raw(competition_id)
+                summary = {
+                    "name": competition.name,
+                    "date": competition.date,
+                    "competition_type": competition.competition_type,
+                    "format_type": competition.format_type,
+                    "processed": competition.processed
+                }
+                if competition.mode:
+                    summary["mode"] = competition.mode
+                yield competition_id, summary, raw or self._competitions.encode(competition.to_dict())
+        self._competitions.write(records())
+
+    def version(self) -> List:
+        """Changes whenever saved data changes (see snapshot.write_snapshot)"""
+        return ["json", file_versions(self.players_file, self.competitions_file)]
+
+    def close(self):
+        self._players.close()
+        self._competitions.close()
+
+class SQLiteStorage:
+    """
+    Stores players, ratings, competitions, results and rating history in indexed
+    SQLite tables. Only changed rows are written on save, and player history and
+    competition results are left in the database until they are first accessed.
+    """
+
+    def __init__(self, data_dir: Union[str, Path] = "data", db_path: Union[str, Path, None] = None):
+        from sqlalchemy import create_engine
+
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(exist_ok=True)
+        self.db_path = Path(db_path) if db_path else self.data_dir / "elo.db"
+        self.engine = create_engine(f"sqlite:///{self.db_path}")
+        self._define_tables()
+        self.metadata.create_all(self.engine)
+        self._add_missing_columns()
+
+    def _add_missing_columns(self):
+        """Add columns introduced after a database was created"""
+        from sqlalchemy import inspect, text
+
+        existing = {column["name"] for column in inspect(self.engine).get_columns("competitions")}
+        if "mode" not in existing:
+            with self.engine.begin() as conn:
+                conn.execute(text("ALTER TABLE competitions ADD COLUMN mode VARCHAR"))
+
+    def _define_tables(self):
+        from sqlalchemy import Column, Float, Index, Integer, MetaData, String, Table, Boolean
+
+        self.metadata = MetaData()
+        self.players = Table(
+            "players", self.metadata,
+            Column("name", String, primary_key=True),
+        )
+        self.ratings = Table(
+            "ratings", self.metadata,
+            Column("player_name", String, primary_key=True),
+            Column("competition_type", String, primary_key=True),
+            Column("rating", Integer, nullable=False),
+            Index("ix_ratings_type_rating", "competition_type", "rating"),
+        )
+        self.rating_params = Table(
+            "rating_params", self.metadata,
+            Column("player_name", String, primary_key=True),
+            Column("competition_type", String, primary_key=True),
+            Column("params", String, nullable=False),  # JSON list of floats
+        )
+        self.competitions = Table(
+            "competitions", self.metadata,
+            Column("competition_id", String, primary_key=True),
+            Column("name", String, nullable=False),
+            Column("date", String, nullable=False),
+            Column("competition_type", String, nullable=False),
+            Column("format_type", String, nullable=False),
+            Column("processed", Boolean, nullable=False, default=False),
+            Column("mode", String),  # sequential or live direct matches
+            Index("ix_competitions_type_date", "competition_type", "date"),
+        )
+        self.results = Table(
+            "results", self.metadata,
+            Column("competition_id", String, primary_key=True),
+            Column("seq", Integer, primary_key=True),
+            Column("player_name", String, nullable=False),
+            Column("rank", Integer, nullable=False),
+            Column("score", Float),
+            Index("ix_results_player", "player_name"),
+        )
+        self.matches = Table(
+            "matches", self.metadata,
+            Column("competition_id", String, primary_key=True),
+            Column("seq", Integer, primary_key=True),
+            Column("player_a", String, nullable=False),
+            Column("player_b", String, nullable=False),
+            Column("result", Float, nullable=False),
+            Index("ix_matches_player_a", "player_a"),
+            Index("ix_matches_player_b", "player_b"),
+        )
+        self.rating_history = Table(
+            "rating_history", self.metadata,
+            Column("player_name", String, primary_key=True),
+            Column("competition_type", String, primary_key=True),
+            Column("seq", Integer, primary_key=True),
+            Column("competition_id", String, nullable=False),
+            Column("date", String, nullable=False),
+            Column("new_rating", Integer, nullable=False),
+            Index("ix_rating_history_competition", "competition_id"),
+        )
+
+    def is_empty(self) -> bool:
+        from sqlalchemy import func, select
+
+        with self.engine.connect() as conn:
+            players = conn.execute(select(func.count()).select_from(self.players)).scalar()
+            competitions = conn.execute(select(func.count()).select_from(self.competitions)).scalar()
+        return players == 0 and competitions == 0
+
+    def load_players(self) -> Iterator[Dict]:
+        """Yield players with their current ratings; history is loaded on demand."""
+        from sqlalchemy import select
+
+        with self.engine.connect() as conn:
+            ratings: Dict[str, Dict[str, int]] = {}
+            for name, competition_type, rating in conn.execute(select(
+                    self.ratings.c.player_name, self.ratings.c.competition_type, self.ratings.c.rating)):
+                ratings.setdefault(name, {})[competition_type] = rating
+            params: Dict[str, Dict[str, List[float]]] = {}
+            for name, competition_type, values in conn.execute(select(
+                    self.rating_params.c.player_name, self.rating_params.c.competition_type,
+                    self.rating_params.c.params)):
+                params.setdefault(name, {})[competition_type] = json.loads(values)
+            for (name,) in conn.execute(select(self.players.c.name)):
+                yield {"name": name, "ratings": ratings.get(name, {}), "rating_params": params.get(name, {})}
+
+    def load_player_history(self, name: str) -> Dict[str, List[Dict]]:
+        from sqlalchemy import select
+
+        h = self.rating_history.c
+        history: Dict[str, List[Dict]] = {}
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                select(h.competition_type, h.competition_id, h.date, h.new_rating)
+                .where(h.player_name == name)
+                .order_by(h.competition_type, h.seq)
+            )
+            for competition_type, competition_id, date, new_rating in rows:
+                history.setdefault(competition_type, []).append({
+                    "competition_id": competition_id,
+                    "date": date,
+                    "new_rating": new_rating
+                })
+        return history
+
+    def save_players(self, players: Dict, dirty: Set[str]):
+        from sqlalchemy import delete
+        from sqlalchemy.dialects.sqlite import insert
+
+        h = self.rating_history.c
+        with self.engine.begin() as conn:
+            for name in dirty:
+                player = players.get(name)
+                if player is None:
+                    continue
+                conn.execute(insert(self.players).values(name=name).on_conflict_do_nothing())
+                conn.execute(delete(self.ratings).where(
+                    (self.ratings.c.player_name == name) &
+                    self.ratings.c.competition_type.not_in(list(player.ratings))))
+                for competition_type, rating in player.ratings.items():
+                    stmt = insert(self.ratings).values(
+                        player_name=name, competition_type=competition_type, rating=rating)
+                    conn.execute(stmt.on_conflict_do_update(
+                        index_elements=["player_name", "competition_type"],
+                        set_={"rating": stmt.excluded.rating}))
+                conn.execute(delete(self.rating_params).where(self.rating_params.c.player_name == name))
+                if player.rating_params:
+                    conn.execute(self.rating_params.insert(), [
+                        {"player_name": name, "competition_type": competition_type, "params": json.dumps(list(params))}
+                        for competition_type, params in player.rating_params.items()
+                    ])
+                if not player.history_loaded:
+                    continue
+                conn.execute(delete(self.rating_history).where(
+                    (h.player_name == name) & h.competition_type.not_in(list(player.competition_history))))
+                for competition_type in player.competition_history:
+                    start, entries = player.history_changes(competition_type)
+                    conn.execute(delete(self.rating_history).where(
+                        (h.player_name == name) & (h.competition_type == competition_type) & (h.seq >= start)))
+                    if entries:
+                        conn.execute(self.rating_history.insert(), [
+                            {"player_name": name, "competition_type": competition_type, "seq": start + i,
+                             "competition_id": e["competition_id"], "date": e["date"],
+                             "new_rating": e["new_rating"]}
+                            for i, e in enumerate(entries)
+                        ])
+                player.mark_history_synced()
+
+    def load_competitions(self) -> Iterator[Dict]:
+        """Yield competition metadata; results are loaded on demand."""
+        from sqlalchemy import select
+
+        c = self.competitions.c
+        with self.engine.connect() as conn:
+            rows = conn.execute(select(
+                c.competition_id, c.name, c.date, c.competition_type, c.format_type, c.processed, c.mode))
+            for row in rows:
+                yield dict(row._mapping)
+
+    def load_competition_results(self, competition_id: str, format_type: str) -> List[Dict]:
+        from sqlalchemy import select
+
+        if format_type == "leaderboard":
+            t = self.results.c
+            columns = (t.player_name, t.rank, t.score)
+        else:
+            t = self.matches.c
+            columns = (t.player_a, t.player_b, t.result)
+        with self.engine.connect() as conn:
+            rows = conn.execute(select(*columns).where(t.competition_id == competition_id).order_by(t.seq))
+            return [dict(row._mapping) for row in rows]
+
+    def save_competitions(self, competitions: Dict, dirty: Set[str]):
+        from sqlalchemy import delete
+        from sqlalchemy.dialects.sqlite import insert
+
+        with self.engine.begin() as conn:
+            for competition_id in dirty:
+                competition = competitions.get(competition_id)
+                if competition is None:
+                    continue
+                row = {
+                    "competition_id": competition_id,
+                    "name": competition.name,
+                    "date": competition.date,
+                    "competition_type": competition.competition_type,
+                    "format_type": competition.format_type,
+                    "processed": competition.processed,
+                    "mode": competition.mode,
+                }
+                stmt = insert(self.competitions).values(**row)
+                conn.execute(stmt.on_conflict_do_update(
+                    index_elements=["competition_id"],
+                    set_={k: stmt.excluded[k] for k in row if k != "competition_id"}))
+                if not competition.results_loaded:
+                    continue
+                table = self.results if competition.format_type == "leaderboard" else self.matches
+                conn.execute(delete(table).where(table.c.competition_id == competition_id))
+                if competition.results:
+                    conn.execute(table.insert(), [
+                        {"competition_id": competition_id, "seq": i, **r.to_dict()}
+                        for i, r in enumerate(competition.results)
+                    ])
+
+    def version(self) -> List:
+        wal_path = self.db_path.with_name(self.db_path.name + "-wal")
+        return ["sqlite", file_versions(self.db_path, wal_path)]
+
+    def close(self):
+        self.engine.dispose()
+
+class EventLogStorage:
+    """
+    Appends every saved change to an event log instead of rewriting data files.
+
+    Each save appends one JSON line per changed competition or player and fsyncs
+    the log once, so a write costs the size of the change. A "competition" event
+    holds the competition's fields and, when they changed, its results: only the
+    matches appended since the last save (from "results_start") when the results
+    grew in place, as direct matches do, and all of them otherwise; a
+    "player" event holds the player's ratings (and rating system state) and the
+    rating history entries added since the last save. Once the log outgrows compact_bytes, the full state
+    is written to a snapshot and the log starts over. On start-up the snapshot is
+    loaded and the log replayed on top of it; a torn last line from a crash is
+    dropped.
+    """
+    COMPACT_BYTES = 16 * 1024 * 1024
+
+    def __init__(self, data_dir: Union[str, Path] = "data", compact_bytes: int = COMPACT_BYTES):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(exist_ok=True)
+        self.log_path = self.data_dir / "events.log"
+        self.snapshot_path = self.data_dir / "snapshot.json"
+        self.compact_bytes = compact_bytes
+        self._seq = 0
+        self._players: Dict[str, Dict] = {}
+        self._competitions: Dict[str, Dict] = {}
+        self._logged_results: Dict[str, Tuple[list, int]] = {}  # competition_id -> (results list, length) last logged
+        self._live_players: Optional[Dict] = None  # the managers' dicts, for snapshots
+        self._live_competitions: Optional[Dict] = None
+        self._recover()
+        self._log = open(self.log_path, 'ab')
+
+    def _recover(self):
+        snapshot_seq = 0
+        if self.snapshot_path.exists():
+            with open(self.snapshot_path, 'r') as f:
+                snapshot = json.load(f)
+            snapshot_seq = self._seq = snapshot["seq"]
+            self._players = {p["name"]: p for p in snapshot["players"]}
+            self._competitions = {c["competition_id"]: c for c in snapshot["competitions"]}
+        for event in self.events(snapshot_seq, repair=True):
+            self._apply(event)
+
+    def events(self, since_seq: int = 0, repair: bool = False) -> Iterator[Dict]:
+        """
+        Events in the log with a sequence number above since_seq, oldest first.
+        With repair=True a torn last line is cut off the log.
+        """
+        if not self.log_path.exists():
+            return
+        with open(self.log_path, 'rb') as f:
+            good = 0
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                good += len(line)
+                if event["seq"] > since_seq:
+                    yield event
+        if repair and good < self.log_path.stat().st_size:
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(good)
+
+    def _apply(self, event: Dict):
+        self._seq = event["seq"]
+        if event["event"] == "competition":
+            data = {k: v for k, v in event.items() if k not in ("seq", "event")}
+            previous = self._competitions.get(data["competition_id"])
+            if "results" not in data:
+                data["results"] = previous["results"] if previous else []
+            elif "results_start" in data:
+                # Appended results; extend the replayed list in place rather than copying it
+                results = previous["results"] if previous else []
+                del results[data.pop("results_start"):]
+                results.extend(data["results"])
+                data["results"] = results
+            self._competitions[data["competition_id"]] = data
+        elif event["event"] == "player":
+            player = self._players.setdefault(event["name"], {"name": event["name"], "competition_history": {}})
+            player["ratings"] = event["ratings"]
+            if "rating_params" in event:
+                player["rating_params"] = event["rating_params"]
+            else:
+                player.pop("rating_params", None)
+            histories = {}
+            for competition_type, change in event["history"].items():
+                history = player["competition_history"].get(
+                    competition_type, {"competition_id": [], "date": [], "new_rating": []})
+                start = change["start"]
+                histories[competition_type] = {
+                    column: history[column][:start] + change[column]
+                    for column in ("competition_id", "date", "new_rating")
+                }
+            player["competition_history"] = histories
+
+    def _append(self, events: List[Dict]):
+        if not events:
+            return
+        lines = []
+        for event in events:
+            self._seq += 1
+            lines.append(json.dumps({"seq": self._seq, **event}, separators=(',', ':')).encode() + b"\n")
+        data = b"".join(lines)
+        self._log.write(data)
+        inc("elo_storage_bytes_written_total", len(data), file=self.log_path.name)
+        self._log.flush()
+        os.fsync(self._log.fileno())  # one fsync per save, however many events it holds
+        if self._log.tell() >= self.compact_bytes:
+            self.compact()
+
+    def is_empty(self) -> bool:
+        return self._seq == 0 and not self._players and not self._competitions
+
+    def load_players(self) -> Iterator[Dict]:
+        players, self._players = self._players, {}
+        yield from players.values()
+
+    def load_player_history(self, name: str) -> Dict[str, List[Dict]]:
+        raise KeyError(name)  # players are always loaded with their history
+
+    def save_players(self, players: Dict, dirty: Set[str]):
+        self._live_players = players
+        events = []
+        for name in dirty:
+            player = players.get(name)
+            if player is None:
+                continue
+            history = {}
+            for competition_type in player.competition_history:
+                start, entries = player.history_changes(competition_type)
+                history[competition_type] = {
+                    "start": start,
+                    **{column: [e[column] for e in entries] for column in ("competition_id", "date", "new_rating")}
+                }
+            event = {"event": "player", "name": name, "ratings": player.ratings, "history": history}
+            if player.rating_params:
+                event["rating_params"] = player.rating_params
+            events.append(event)
+        self._append(events)
+        for name in dirty:
+            if name in players:
+                players[name].mark_history_synced()
+
+    def load_competitions(self) -> Iterator[Dict]:
+        competitions, self._competitions = self._competitions, {}
+        yield from competitions.values()
+
+    def load_competition_results(self, competition_id: str, format_type: str) -> List[Dict]:
+        raise KeyError(competition_id)  # competitions are always loaded with their results
+
+    def save_competitions(self, competitions: Dict, dirty: Set[str]):
+        self._live_competitions = competitions
+        events = []
+        for competition_id in dirty:
+            competition = competitions.get(competition_id)
+            if competition is None:
+                continue
+            data = competition.to_dict(with_results=False)
+            results = competition.results
+            logged = self._logged_results.get(competition_id)
+            if logged and logged[0] is results and logged[1] <= len(results):
+                # The same list, at most appended to since it was logged
+                if logged[1] < len(results):
+                    data["results_start"] = logged[1]
+                    data["results"] = [r.to_dict() for r in results[logged[1]:]]
+            else:
+                data["results"] = [r.to_dict() for r in results]
+            self._logged_results[competition_id] = (results, len(results))
+            events.append({"event": "competition", **data})
+        self._append(events)
+
+    def compact(self):
+        """Write the full state to the snapshot and start an empty log"""
+        if self._live_players is None or self._live_competitions is None:
+            return  # nothing saved yet, so the log is already short
+        snapshot = {
+            "seq": self._seq,
+            "players": [player.to_dict() for player in self._live_players.values()],
+            "competitions": [competition.to_dict() for competition in self._live_competitions.values()]
+        }
+        text = json.dumps(snapshot, separators=(',', ':'))
+        write_atomic(self.snapshot_path, text, sync=True)
+        inc("elo_storage_bytes_written_total", len(text.encode()), file=self.snapshot_path.name)
+        # A crash before the truncation only leaves events the snapshot already covers
+        self._log.truncate(0)
+        self._log.seek(0)
+        os.fsync(self._log.fileno())
+
+    def version(self) -> List:
+        return ["eventlog", self._seq]
+
+    def close(self):
+        self._log.close()
+
+def open_storage(kind: str = "json", data_dir: Union[str, Path] = "data"):
+    """Create a storage backend by name ("json", "json-lazy", "sqlite" or "eventlog")."""
+    if kind == "eventlog":
+        storage = EventLogStorage(data_dir)
+        json_storage = JSONStorage(data_dir)
+        if storage.is_empty() and (json_storage.players_file.exists() or
+                                   json_storage.competitions_file.exists()):
+            migrate_json(data_dir, storage)
+            storage.compact()
+            storage.close()
+            storage = EventLogStorage(data_dir)
+        return storage
+    if kind == "json":
+        return JSONStorage(data_dir)
+    if kind == "json-lazy":
+        return JSONStorage(data_dir, lazy=True)
+    if kind == "sqlite":
+        storage = SQLiteStorage(data_dir)
+        json_storage = JSONStorage(data_dir)
+        if storage.is_empty() and (json_storage.players_file.exists() or
+                                   json_storage.competitions_file.exists()):
+            migrate_json_to_sqlite(data_dir, storage)
+        return storage
+    raise ValueError(f"Unknown storage backend: {kind}")
+
+def migrate_json(data_dir: Union[str, Path], storage):
+    """Copy players.json and competitions.json into another storage backend."""
+    from competition_manager import CompetitionManager
+
+    source = CompetitionManager(data_dir, storage=JSONStorage(data_dir))
+    storage.save_players(source.player_manager.players, set(source.player_manager.players))
+    storage.save_competitions(source.competitions, set(source.competitions))
+    return storage
+
+def migrate_json_to_sqlite(data_dir: Union[str, Path] = "data", storage: SQLiteStorage = None) -> SQLiteStorage:
+    """Copy players.json and competitions.json into the SQLite database."""
+    return migrate_json(data_dir, storage or SQLiteStorage(data_dir))
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Migrate JSON data files to SQLite")
+    parser.add_argument("data_dir", nargs="?", default="data")
+    args = parser.parse_args()
+    migrate_json_to_sqlite(args.data_dir)
+    print(f"Migrated {args.data_dir} to {Path(args.data_dir) / 'elo.db'}")
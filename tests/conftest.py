@@ -0,0 +1,98 @@
+"""Shared fixtures: managers over temporary data directories and helpers to fill and compare them"""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from competition_manager import CompetitionManager
+from jobs import JobQueue
+
+@pytest.fixture
+def data_dir(tmp_path):
+    return tmp_path / "data"
+
+@pytest.fixture
+def make_manager(data_dir):
+    """CompetitionManager factory over data_dir (or another directory); storage is closed afterwards"""
+    managers = []
+
+    def make(storage="json", directory=None):
+        manager = CompetitionManager(str(directory or data_dir), storage=storage)
+        managers.append(manager)
+        return manager
+
+    yield make
+    for manager in managers:
+        manager.storage.close()
+
+@pytest.fixture
+def manager(make_manager):
+    return make_manager()
+
+@pytest.fixture
+def queue(tmp_path, manager):
+    queue = JobQueue(manager, tmp_path / "jobs.db")
+    yield queue
+    queue.shutdown()
+
+@pytest.fixture
+def client(manager, queue):
+    """Test client for an app serving `manager`"""
+    return create_app(manager, queue).test_client()
+
+@pytest.fixture
+def add_leaderboard():
+    """Create a leaderboard competition with `players` finishing in order, processed unless process=False"""
+    def add(manager, name, date, players, competition_type="golf", process=True):
+        competition_id = manager.create_competition(name, date, competition_type)
+        manager.add_leaderboard_results(competition_id, [(p, i + 1, 68 + 2 * i) for i, p in enumerate(players)])
+        if process:
+            manager.process_competition(competition_id)
+        return competition_id
+    return add
+
+@pytest.fixture
+def add_matches():
+    """Create a direct match competition from (player_a, player_b, result) tuples"""
+    def add(manager, name, date, matches, competition_type="chess", mode=None, process=True):
+        competition_id = manager.create_competition(name, date, competition_type, "direct_matches", mode=mode)
+        if matches:
+            manager.add_direct_matches(competition_id, matches)
+        if process and mode != "live":
+            manager.process_competition(competition_id)
+        return competition_id
+    return add
+
+@pytest.fixture
+def fill_random(add_leaderboard, add_matches):
+    """Add `count` random competitions over `types` from a seeded generator; returns their ids"""
+    def fill(manager, seed=1, count=30, types=("golf", "chess"), players=10, process=True):
+        rng = random.Random(seed)
+        names = [f"P{i}" for i in range(players)]
+        ids = []
+        for k in range(count):
+            date = f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+            competition_type = types[k % len(types)]
+            if rng.random() < 0.6:
+                ids.append(add_leaderboard(manager, f"Open {k}", date, rng.sample(names, rng.randint(2, 6)),
+                                           competition_type, process))
+            else:
+                matches = [tuple(rng.sample(names, 2)) + (rng.choice([0, 0.5, 1]),) for _ in range(4)]
+                ids.append(add_matches(manager, f"Match {k}", date, matches, competition_type, process=process))
+        return ids
+    return fill
+
+@pytest.fixture
+def rating_state():
+    """Everything rating-related about the players, for comparing two managers or two runs"""
+    def state(manager):
+        return {
+            name: (dict(player.ratings), dict(player.rating_params),
+                   {ct: list(history) for ct, history in player.competition_history.items()})
+            for name, player in manager.player_manager.players.items()
+        }
+    return state
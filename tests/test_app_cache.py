@@ -0,0 +1,42 @@
+def test_unchanged_data_answers_conditional_get_with_304(client, manager, add_leaderboard):
+    add_leaderboard(manager, "Open", "2024-01-01", ["a", "b"])
+    first = client.get("/api/players/golf")
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "no-cache"
+
+    revalidated = client.get("/api/players/golf", headers={"If-None-Match": first.headers["ETag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == first.headers["ETag"]
+    assert not revalidated.get_data()
+
+def test_new_results_change_the_etag_of_their_type_only(client, manager, add_leaderboard):
+    add_leaderboard(manager, "Open", "2024-01-01", ["a", "b"])
+    add_leaderboard(manager, "Cup", "2024-01-01", ["a", "b"], competition_type="darts")
+    golf = client.get("/api/players/golf")
+    darts = client.get("/api/players/darts")
+
+    add_leaderboard(manager, "Open", "2024-02-01", ["b", "a"])
+    changed = client.get("/api/players/golf", headers={"If-None-Match": golf.headers["ETag"]})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != golf.headers["ETag"]
+    assert changed.get_json() != golf.get_json()
+    assert client.get("/api/players/darts", headers={"If-None-Match": darts.headers["ETag"]}).status_code == 304
+
+def test_rendered_responses_are_reused_until_the_data_changes(client, manager, add_leaderboard):
+    add_leaderboard(manager, "Open", "2024-01-01", ["a", "b"])
+    cache = client.application.extensions["elo"].response_cache
+    first = client.get("/api/ratings/golf")
+    hits = cache.hits
+    second = client.get("/api/ratings/golf")
+    assert cache.hits == hits + 1
+    assert second.get_data() == first.get_data()
+
+    add_leaderboard(manager, "Open", "2024-02-01", ["b", "a"])
+    third = client.get("/api/ratings/golf")
+    assert cache.hits == hits + 1
+    assert third.get_json()["items"][0]["name"] == "b"
+
+def test_error_responses_are_not_cached(client, manager, add_leaderboard):
+    add_leaderboard(manager, "Open", "2024-01-01", ["a", "b"])
+    assert client.get("/api/players/golf/a/history?downsample=nonsense").status_code == 400
+    assert not len(client.application.extensions["elo"].response_cache)
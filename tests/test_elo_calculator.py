@@ -0,0 +1,72 @@
+import random
+
+import numpy as np
+import pytest
+
+from elo_calculator import EXPECTED_TABLE_RANGE, ELOCalculator
+
+def closed_form(rating_a, rating_b):
+    return 1 / (1 + 10 ** ((rating_b - rating_a) / 400))
+
+@pytest.mark.parametrize("rating_a, rating_b", [
+    (1500, 1500), (1500, 1900), (1900, 1500), (1200.0, 1450.0), (1500.5, 1500), (1234.25, 1777.75),
+    (0, EXPECTED_TABLE_RANGE), (0, EXPECTED_TABLE_RANGE + 1), (5000, 0),
+])
+def test_expected_score_matches_the_closed_form(rating_a, rating_b):
+    assert ELOCalculator().expected_score(rating_a, rating_b) == closed_form(rating_a, rating_b)
+
+def test_expected_scores_match_the_scalar_path():
+    calculator = ELOCalculator()
+    rng = random.Random(3)
+    diffs = [rng.randint(-5000, 5000) for _ in range(500)] + [rng.uniform(-5000, 5000) for _ in range(500)]
+    assert calculator.expected_scores(diffs).tolist() == [calculator.expected_score(0, d) for d in diffs]
+    assert calculator.expected_scores(diffs).tolist() == [closed_form(0, d) for d in diffs]
+
+def test_process_matches_matches_process_match():
+    calculator = ELOCalculator(k_factor=24)
+    rng = random.Random(5)
+    ratings_a = [rng.randint(1000, 2000) for _ in range(300)]
+    ratings_b = [rng.randint(1000, 2000) for _ in range(300)]
+    results = [rng.choice([0, 0.5, 1]) for _ in range(300)]
+    new_a, new_b = calculator.process_matches(ratings_a, ratings_b, results)
+    assert list(zip(new_a, new_b)) == [calculator.process_match(a, b, r)
+                                       for a, b, r in zip(ratings_a, ratings_b, results)]
+
+def _pairwise_field(calculator, ratings, ranks, scores, lower_is_better):
+    """process_field written out as one process_match per pair, like the original loop"""
+    changes = [0] * len(ratings)
+    for i in range(len(ratings)):
+        for j in range(i + 1, len(ratings)):
+            if ranks[i] == ranks[j]:
+                result = 0.5
+            elif scores[i] is not None and scores[j] is not None:
+                result = float(scores[i] < scores[j] if lower_is_better else scores[i] > scores[j])
+            else:
+                result = float(ranks[i] < ranks[j])
+            new_i, new_j = calculator.process_match(ratings[i], ratings[j], result)
+            changes[i] += new_i - ratings[i]
+            changes[j] += new_j - ratings[j]
+    return [rating + change for rating, change in zip(ratings, changes)]
+
+@pytest.mark.parametrize("seed", range(10))
+def test_process_field_matches_pairwise_matches(seed):
+    calculator = ELOCalculator()
+    rng = random.Random(seed)
+    n = rng.randint(2, 40)
+    ratings = [rng.randint(900, 2100) for _ in range(n)]
+    ranks = sorted(rng.randint(1, n) for _ in range(n))  # with ties
+    scores = [rng.choice([None, rng.randint(60, 80)]) for _ in range(n)]
+    lower_is_better = bool(seed % 2)
+    assert calculator.process_field(ratings, ranks, scores, lower_is_better) == \
+        _pairwise_field(calculator, ratings, ranks, scores, lower_is_better)
+
+def test_exact_field_rounds_once():
+    calculator = ELOCalculator()
+    ratings, ranks = [1500, 1510, 1490, 1600], [1, 2, 3, 4]
+    expected = np.array(ratings, dtype=float)
+    for i in range(4):
+        for j in range(i + 1, 4):
+            e = closed_form(ratings[i], ratings[j])
+            expected[i] += 32 * (1 - e)
+            expected[j] -= 32 * (1 - e)
+    assert calculator.process_field(ratings, ranks, exact=True) == np.round(expected).astype(int).tolist()
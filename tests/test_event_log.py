@@ -0,0 +1,54 @@
+import json
+
+from storage import EventLogStorage
+
+def _competitions(manager):
+    return {cid: competition.to_dict() for cid, competition in manager.competitions.items()}
+
+def _events(data_dir):
+    return [json.loads(line) for line in (data_dir / "events.log").read_bytes().splitlines()]
+
+def test_replayed_log_reloads_unchanged(make_manager, fill_random, rating_state):
+    manager = make_manager("eventlog")
+    fill_random(manager, seed=11)
+    manager.set_rating_system("golf", "glicko2")
+
+    reloaded = make_manager("eventlog")
+    assert rating_state(reloaded) == rating_state(manager)
+    assert _competitions(reloaded) == _competitions(manager)
+
+def test_matches_added_one_at_a_time_log_only_the_new_match(data_dir, make_manager, add_matches, rating_state):
+    manager = make_manager("eventlog")
+    live = add_matches(manager, "Club Night", "2025-03-01", [], mode="live")
+    for i in range(40):
+        manager.add_direct_match(live, f"P{i % 5}", f"P{(i + 1) % 5}", i % 2)
+
+    logged = [event for event in _events(data_dir) if event["event"] == "competition"]
+    assert all(len(event.get("results", [])) <= 1 for event in logged)
+    reloaded = make_manager("eventlog")
+    assert len(reloaded.competitions[live].results) == 40
+    assert _competitions(reloaded) == _competitions(manager)
+    assert rating_state(reloaded) == rating_state(manager)
+
+def test_compaction_writes_a_snapshot_and_restarts_the_log(data_dir, make_manager, fill_random, rating_state):
+    manager = make_manager(EventLogStorage(data_dir, compact_bytes=4096))
+    fill_random(manager, seed=12, count=40)
+
+    assert (data_dir / "snapshot.json").exists()
+    assert (data_dir / "events.log").stat().st_size < 4096
+    reloaded = make_manager("eventlog")
+    assert rating_state(reloaded) == rating_state(manager)
+    assert _competitions(reloaded) == _competitions(manager)
+
+def test_torn_last_line_is_dropped(data_dir, make_manager, fill_random, rating_state):
+    manager = make_manager("eventlog")
+    fill_random(manager, seed=13, count=10)
+    manager.storage.close()
+    log_path = data_dir / "events.log"
+    size = log_path.stat().st_size
+    with open(log_path, "ab") as f:
+        f.write(b'{"seq":999,"event":"player","name":"P1","rat')  # a crash mid-write
+
+    reloaded = make_manager("eventlog")
+    assert rating_state(reloaded) == rating_state(manager)
+    assert log_path.stat().st_size == size
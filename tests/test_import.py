@@ -0,0 +1,52 @@
+import io
+
+import pytest
+
+from bulk_import import _competitions, import_stream, read_rows
+
+HEADER = "competition_type,name,date,format_type,player,rank,score,player_a,player_b,result\n"
+
+def _csv(*lines):
+    return io.StringIO(HEADER + "".join(line + "\n" for line in lines))
+
+def test_import_rates_like_processing_in_date_order(make_manager, tmp_path, add_leaderboard, add_matches,
+                                                    rating_state):
+    expected = make_manager(directory=tmp_path / "expected")
+    add_leaderboard(expected, "Open", "2024-01-01", ["a", "b", "c"])
+    add_matches(expected, "Club", "2024-01-15", [("a", "b", 0.0)], competition_type="golf")
+    add_leaderboard(expected, "Open", "2024-02-01", ["c", "a", "b"])
+
+    imported = make_manager(directory=tmp_path / "imported")
+    # The January competitions arrive after February's and are re-rated at the end
+    report = import_stream(imported, _csv(
+        "golf,Open,2024-02-01,,c,1,68,,,", "golf,Open,2024-02-01,,a,2,70,,,", "golf,Open,2024-02-01,,b,3,72,,,",
+        "golf,Open,2024-01-01,,a,1,68,,,", "golf,Open,2024-01-01,,b,2,70,,,", "golf,Open,2024-01-01,,c,3,72,,,",
+        "golf,Club,2024-01-15,direct_matches,,,,a,b,0",
+    ), "csv", batch_size=1)
+    assert report == {"rows": 7, "competitions": 3, "skipped": 0, "replayed": 3}
+    assert rating_state(imported) == rating_state(expected)
+
+def test_reimport_skips_existing_competitions(manager):
+    data = '{"competition_type": "chess", "name": "Club", "date": "2024-01-01", "format_type": "direct_matches", ' \
+           '"matches": [{"player_a": "a", "player_b": "b", "result": 1}]}\n'
+    assert import_stream(manager, io.StringIO(data), "jsonl")["competitions"] == 1
+    ratings = dict(manager.player_manager.players["a"].ratings)
+    assert import_stream(manager, io.StringIO(data), "jsonl") == {"rows": 1, "competitions": 0, "skipped": 1,
+                                                                 "replayed": 0}
+    assert manager.player_manager.players["a"].ratings == ratings
+
+@pytest.mark.parametrize("lines, message", [
+    (["golf,Open,2024-01-01,,a,1,,,,", "golf,Cup,2024-01-01,,a,1,,,,", "golf,Open,2024-01-01,,b,2,,,,"],
+     "line 4: rows of competition 'Open' on 2024-01-01 must be consecutive"),
+    (["golf,Open,01/02/2024,,a,1,,,,"], "line 2: date must be YYYY-MM-DD"),
+    (["golf,Open,2024-01-01,,a,first,,,,"], "line 2: rank must be an integer"),
+    (["chess,Club,2024-01-01,direct_matches,,,,a,b,2"], "line 2: result must be 1, 0.5 or 0"),
+])
+def test_invalid_rows_are_reported_with_their_line(manager, lines, message):
+    with pytest.raises(ValueError, match=message):
+        import_stream(manager, _csv(*lines), "csv")
+
+def test_only_recent_competitions_are_checked_for_split_rows():
+    rows = read_rows(_csv("golf,A,2024-01-01,,a,1,,,,", "golf,B,2024-01-01,,a,1,,,,",
+                          "golf,C,2024-01-01,,a,1,,,,", "golf,A,2024-01-01,,b,2,,,,"), "csv")
+    assert [key[1] for key, _ in _competitions(rows, closed_keys_checked=2)] == ["A", "B", "C", "A"]
@@ -0,0 +1,66 @@
+import pytest
+
+import jobs
+from jobs import ALL_TYPES, JobQueue, JobStore, parse_submission
+
+def _submission(**overrides):
+    data = {"competition_type": "chess", "name": "Club Night", "date": "2025-03-01",
+            "format_type": "direct_matches",
+            "matches": [{"player_a": "x", "player_b": "y", "result": "1"}]}
+    data.update(overrides)
+    return data
+
+@pytest.mark.parametrize("overrides", [
+    {"format_type": "nonsense"},
+    {"mode": "live"},
+    {"mode": "nonsense"},
+    {"format_type": "leaderboard", "mode": "sequential", "results": [{"player": "x", "rank": 1}]},
+])
+def test_invalid_submissions_are_rejected_before_queueing(queue, manager, overrides):
+    with pytest.raises(ValueError):
+        queue.submit_competition(_submission(**overrides))
+    assert not manager.competitions
+    assert not queue.store.unfinished()
+
+def test_parse_submission_normalizes_results():
+    payload = parse_submission(_submission(format_type="leaderboard", results=[
+        {"player": "x", "rank": 1, "score": "68"}, {"player": "y", "rank": 2, "score": "n/a"}]))
+    assert payload["results"] == [("x", 1, 68.0), ("y", 2, None)]
+    assert parse_submission(_submission(mode="sequential"))["matches"] == [("x", "y", 1.0)]
+
+def test_submission_job_rates_the_competition(queue, manager):
+    job_id = queue.submit_competition(_submission())
+    job = queue.wait(job_id, timeout=10)
+
+    assert job["status"] == "done"
+    assert job["result"]["processed"] == 1
+    competition = manager.competitions[job["result"]["competition_id"]]
+    assert competition.processed
+    assert manager.player_manager.players["x"].get_rating("chess") > 1500
+
+def test_failed_job_records_the_error(queue, monkeypatch):
+    def fail(manager, payload, progress, resumed=False):
+        raise ValueError("rating failed")
+    monkeypatch.setitem(jobs.HANDLERS, "submit", fail)
+
+    job = queue.wait(queue.submit_competition(_submission()), timeout=10)
+    assert job["status"] == "failed"
+    assert job["error"] == "rating failed"
+
+def test_unfinished_jobs_run_again_on_start(tmp_path, manager):
+    store = JobStore(tmp_path / "jobs.db")
+    store.create("interrupted", "submit", ["chess"], parse_submission(_submission()))
+    store.start("interrupted")
+
+    queue = JobQueue(manager, tmp_path / "jobs.db")
+    job = queue.wait("interrupted", timeout=10)
+    queue.shutdown()
+    assert job["status"] == "done"
+    assert manager.competitions[job["result"]["competition_id"]].processed
+
+def test_jobs_sharing_a_type_wait_for_each_other():
+    assert JobQueue._conflicts(["chess"], {"chess"})
+    assert not JobQueue._conflicts(["golf"], {"chess"})
+    assert JobQueue._conflicts([ALL_TYPES], {"golf"})
+    assert JobQueue._conflicts(["golf"], {ALL_TYPES})
+    assert not JobQueue._conflicts([ALL_TYPES], set())
@@ -0,0 +1,41 @@
+import json
+import os
+
+def _competitions(manager):
+    return {cid: competition.to_dict() for cid, competition in manager.competitions.items()}
+
+def test_lazy_load_matches_full_load(make_manager, fill_random, rating_state):
+    manager = make_manager("json")
+    fill_random(manager, seed=8)
+
+    lazy = make_manager("json-lazy")
+    assert not any(player.history_loaded for player in lazy.player_manager.players.values())
+    assert not any(competition.results_loaded for competition in lazy.competitions.values())
+    assert rating_state(lazy) == rating_state(manager)
+    assert _competitions(lazy) == _competitions(manager)
+
+def test_records_never_loaded_are_copied_through(data_dir, make_manager, fill_random, add_leaderboard):
+    manager = make_manager("json")
+    fill_random(manager, seed=9)
+    players_before = {record["name"]: record for record in json.loads((data_dir / "players.json").read_text())}
+
+    lazy = make_manager("json-lazy")
+    add_leaderboard(lazy, "Late Open", "2025-01-01", ["P1", "P2"])
+    assert not lazy.player_manager.players["P5"].history_loaded
+
+    players_after = {record["name"]: record for record in json.loads((data_dir / "players.json").read_text())}
+    assert players_after["P5"] == players_before["P5"]
+    assert players_after["P1"] != players_before["P1"]
+    reloaded = make_manager("json-lazy")
+    assert (list(reloaded.player_manager.players["P1"].competition_history["golf"])
+            == list(lazy.player_manager.players["P1"].competition_history["golf"]))
+
+def test_stale_index_falls_back_to_full_read(data_dir, make_manager, fill_random, rating_state):
+    manager = make_manager("json")
+    fill_random(manager, seed=10)
+    players_file = data_dir / "players.json"
+    os.utime(players_file, ns=(0, 0))  # the index no longer matches the data file
+
+    lazy = make_manager("json-lazy")
+    assert all(player.history_loaded for player in lazy.player_manager.players.values())
+    assert rating_state(lazy) == rating_state(manager)
@@ -0,0 +1,21 @@
+def test_finish_after_later_competition_matches_reprocess(manager, add_matches, rating_state):
+    live = add_matches(manager, "Club Night", "2025-03-01", [("x", "y", 1)], mode="live")
+    add_matches(manager, "Club Final", "2025-03-08", [("x", "z", 1), ("y", "z", 0.5)])
+    manager.add_direct_match(live, "x", "y", 1)
+    manager.add_direct_match(live, "y", "w", 0)
+
+    assert manager.finish_competition(live) >= 2
+
+    finished = rating_state(manager)
+    manager.reprocess_competitions("chess", workers=1)
+    assert finished == rating_state(manager)
+
+def test_finish_without_later_competitions_keeps_live_ratings(manager, add_matches, rating_state):
+    live = add_matches(manager, "Club Night", "2025-03-01", [("x", "y", 1), ("x", "z", 0.5)], mode="live")
+    rated = rating_state(manager)
+
+    assert manager.finish_competition(live) == 0
+
+    assert rated == rating_state(manager)
+    manager.reprocess_competitions("chess", workers=1)
+    assert rated == rating_state(manager)
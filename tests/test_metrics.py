@@ -0,0 +1,23 @@
+from metrics import REGISTRY, Registry
+
+def test_render_keeps_full_precision():
+    registry = Registry()
+    registry.inc("elo_pairs_total", 12345678)
+    registry.inc("elo_storage_bytes_written_total", 0.1, file="players.json")
+    registry.inc("elo_storage_bytes_written_total", 1234567.25, file="competitions.json")
+    registry.gauge("elo_players", lambda: 2 ** 40)
+
+    lines = registry.render().splitlines()
+
+    assert "elo_pairs_total 12345678" in lines
+    assert 'elo_storage_bytes_written_total{file="players.json"} 0.1' in lines
+    assert 'elo_storage_bytes_written_total{file="competitions.json"} 1234567.25' in lines
+    assert "elo_players 1099511627776" in lines
+
+def test_competitions_are_timed_once_and_count_every_pair(manager, add_matches, add_leaderboard):
+    timed_before = REGISTRY.value("elo_process_matches_seconds")
+    pairs_before = REGISTRY.value("elo_pairs_total")
+    add_matches(manager, "Club", "2024-01-01", [("a", "b", 1), ("b", "c", 0.5), ("a", "c", 0)])
+    assert REGISTRY.value("elo_process_matches_seconds") == timed_before + 1
+    add_leaderboard(manager, "Open", "2024-01-01", ["a", "b", "c", "d"])
+    assert REGISTRY.value("elo_pairs_total") == pairs_before + 3 + 6
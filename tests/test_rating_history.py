@@ -0,0 +1,42 @@
+import threading
+
+from rating_history import HistoryCodes, RatingHistory, StringTable
+
+def test_concurrent_encoders_get_one_code_per_string():
+    table = StringTable()
+    values = [f"competition {i}" for i in range(2000)]
+    codes = [{} for _ in range(4)]
+    barrier = threading.Barrier(len(codes))
+
+    def encode(seen):
+        barrier.wait()
+        for value in values:
+            seen[value] = table.encode(value)
+
+    threads = [threading.Thread(target=encode, args=(seen,)) for seen in codes]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(seen == codes[0] for seen in codes)
+    assert sorted(codes[0].values()) == list(range(len(values)))
+    assert [table.decode(codes[0][value]) for value in values] == values
+
+def test_each_player_manager_has_its_own_tables(make_manager, tmp_path, add_leaderboard):
+    first = make_manager(directory=tmp_path / "first")
+    second = make_manager(directory=tmp_path / "second")
+    add_leaderboard(first, "Open", "2024-01-01", ["a", "b"])
+    add_leaderboard(second, "Cup", "2024-01-01", ["a", "b"])
+    assert first.player_manager.history_codes is not second.player_manager.history_codes
+    assert second.player_manager.history_codes.competition_ids.code("golf_open_2024-01-01") is None
+    assert all(player.history_codes is first.player_manager.history_codes
+               for player in first.player_manager.players.values())
+
+def test_histories_with_other_tables_compare_by_entries():
+    entries = [{"competition_id": "x", "date": "2024-01-01", "new_rating": 1510},
+               {"competition_id": "y", "date": "someday", "new_rating": 1490}]
+    codes = HistoryCodes()
+    codes.encode_competition_id("y")  # x and y get other codes than in a fresh table
+    one, other = RatingHistory(entries), RatingHistory(entries, codes)
+    assert one == other == entries
+    assert RatingHistory.from_json(one, codes) == entries
@@ -0,0 +1,51 @@
+import random
+
+import player_manager
+from player_manager import RatingIndex
+
+def _expected(ratings, order):
+    keys = sorted((-rating, order[name], name) for name, rating in ratings.items())
+    return [(name, -neg_rating) for neg_rating, _, name in keys]
+
+def test_chunked_index_matches_a_sorted_list(monkeypatch):
+    monkeypatch.setattr(player_manager, "CHUNK_SIZE", 4)
+    monkeypatch.setattr(player_manager, "MIN_DELTA", 8)
+    rng = random.Random(2)
+    index = RatingIndex()
+    order = {f"p{i}": i for i in range(120)}
+    ratings = {}
+    published = []
+    for step in range(600):
+        name = rng.choice(list(order))
+        if name in ratings and rng.random() < 0.2:
+            del ratings[name]
+            index.remove(name)
+        else:
+            ratings[name] = rng.randint(1400, 1600)
+            index.update(name, ratings[name], order[name])
+        if step % 7 == 0:
+            index.publish()
+            published.append((index.view(), dict(ratings)))
+
+    for view, state in published:  # earlier snapshots are unaffected by later updates
+        expected = _expected(state, order)
+        assert view.ranking() == expected
+        assert view.top(5) == expected[:5]
+        assert len(view) == len(expected)
+        assert view.entries(3, 17) == [(i + 1, name, rating) for i, (name, rating) in enumerate(expected)][3:17]
+        for name in order:
+            rank = next((i + 1 for i, (other, _) in enumerate(expected) if other == name), None)
+            assert view.rank_of(name) == rank
+            assert view.rating_of(name) == state.get(name)
+            assert (name in view) == (name in state)
+        start, end = view.range_bounds(1450, 1550)
+        assert [rating for _, _, rating in view.entries(start, end)] == \
+            [rating for _, rating in expected if 1450 <= rating <= 1550]
+
+def test_publish_without_changes_keeps_the_view():
+    index = RatingIndex()
+    index.update("a", 1500, 0)
+    index.publish()
+    view = index.view()
+    index.publish()
+    assert index.view() is view
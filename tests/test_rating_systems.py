@@ -0,0 +1,55 @@
+import random
+import warnings
+
+import numpy as np
+import pytest
+
+from rating_systems import Glicko2System
+
+def test_glicko2_large_random_fields_stay_bounded(manager):
+    manager.set_rating_system("golf", "glicko2")
+    rng = random.Random(7)
+    players = [f"P{i}" for i in range(150)]
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")  # overflow in the volatility iteration fails the test
+        for k in range(3):
+            competition_id = manager.create_competition(f"Open {k}", f"2025-01-0{k + 1}", "golf")
+            field = rng.sample(players, len(players))
+            manager.add_leaderboard_results(competition_id, [(p, i + 1, 70 + i) for i, p in enumerate(field)])
+            manager.process_competition(competition_id)
+
+    params = np.array([manager.player_manager.players[p].get_rating_params("golf") for p in players])
+    assert np.isfinite(params).all()
+    assert (np.abs(params[:, 0] - 1500) < 1000).all()
+    assert (params[:, 1] <= 350).all()
+    assert (params[:, 2] < 0.1).all()
+
+@pytest.mark.parametrize("system", ["elo", "glicko2", "plackett-luce"])
+def test_win_probabilities_use_the_types_rating_system(manager, add_matches, system):
+    manager.set_rating_system("chess", system)
+    add_matches(manager, "Club Night", "2025-03-01", [("x", "y", 1), ("x", "z", 1), ("y", "z", 0.5)])
+
+    ratings, probabilities = manager.win_probabilities("chess", ["x", "y", "new"])
+    assert np.allclose(probabilities + probabilities.T, 1)
+    assert probabilities[0, 1] > 0.5
+    assert manager.predict_matches("chess", [("x", "y")]) == pytest.approx([probabilities[0, 1]])
+    if system == "elo":
+        expected = manager.elo_calculator.expected_scores_for(ratings[0], ratings[1])
+    else:
+        rating_system = manager.rating_system("chess")
+        params = np.array([manager.player_manager.players[p].get_rating_params("chess") for p in ("x", "y")])
+        expected = rating_system.expected_scores(ratings[0], params[0], ratings[1], params[1])
+    assert probabilities[0, 1] == pytest.approx(expected)
+
+def test_glicko2_expectation_shrinks_with_uncertainty():
+    system = Glicko2System()
+    certain = system.expected_scores(1700, np.array([1700.0, 50.0, 0.06]), 1500, np.array([1500.0, 50.0, 0.06]))
+    uncertain = system.expected_scores(1700, np.array([1700.0, 300.0, 0.06]), 1500, np.array([1500.0, 300.0, 0.06]))
+    assert 0.5 < uncertain < certain < 0.77
+
+@pytest.mark.parametrize("mode, expected", [(None, {"x": 1532, "y": 1484, "z": 1484}),
+                                            ("sequential", {"x": 1531, "y": 1484, "z": 1485})])
+def test_elo_direct_matches_add_up_every_match(manager, add_matches, mode, expected):
+    add_matches(manager, "Club Night", "2025-03-01", [("x", "y", 1), ("x", "z", 1)], mode=mode)
+    players = manager.player_manager.players
+    assert {name: players[name].get_rating("chess") for name in expected} == expected
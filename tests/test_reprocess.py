@@ -0,0 +1,22 @@
+import competition_manager
+from metrics import REGISTRY
+
+def test_parallel_reprocess_matches_sequential(manager, fill_random, rating_state, monkeypatch):
+    monkeypatch.setattr(competition_manager, "PARALLEL_MIN_COMPETITIONS", 1)
+    fill_random(manager, seed=3, types=("golf", "darts", "chess"), process=False)
+    manager.set_rating_system("chess", "glicko2")
+
+    manager.reprocess_competitions(workers=1)
+    sequential = rating_state(manager)
+    manager.reprocess_competitions(workers=3)
+    assert rating_state(manager) == sequential
+
+def test_parallel_reprocess_reports_worker_metrics(manager, fill_random, monkeypatch):
+    monkeypatch.setattr(competition_manager, "PARALLEL_MIN_COMPETITIONS", 1)
+    fill_random(manager, seed=4, types=("golf", "darts"), process=False)
+
+    before = REGISTRY.value("elo_pairs_total")
+    manager.reprocess_competitions(workers=1)
+    sequential = REGISTRY.value("elo_pairs_total") - before
+    manager.reprocess_competitions(workers=2)
+    assert REGISTRY.value("elo_pairs_total") - before == 2 * sequential > 0
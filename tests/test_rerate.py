@@ -0,0 +1,67 @@
+import threading
+
+def _assert_matches_reprocess(manager, competition_type, rating_state):
+    rated = rating_state(manager)
+    manager.reprocess_competitions(competition_type, workers=1)
+    assert rated == rating_state(manager)
+
+def test_reopen_and_edit_newest_competition(manager, add_leaderboard, rating_state):
+    add_leaderboard(manager, "Spring Open", "2025-03-01", ["x", "y", "z"])
+    newest = add_leaderboard(manager, "Summer Open", "2025-06-01", ["x", "y", "z"])
+
+    manager.reopen_competition(newest)
+    manager.add_leaderboard_results(newest, [("y", 1, 68), ("x", 2, 70)])
+    assert manager.process_competition(newest) == 1
+
+    assert len(manager.player_manager.players["z"].competition_history["golf"]) == 1
+    assert len(manager.player_manager.players["x"].competition_history["golf"]) == 2
+    _assert_matches_reprocess(manager, "golf", rating_state)
+
+def test_reopen_and_edit_only_competition(manager, add_matches, rating_state):
+    chess = add_matches(manager, "Club Night", "2025-03-01", [("x", "y", 1)])
+
+    manager.reopen_competition(chess)
+    manager.add_direct_match(chess, "y", "z", 0.5)
+    manager.process_competition(chess)
+
+    assert len(manager.player_manager.players["x"].competition_history["chess"]) == 1
+    _assert_matches_reprocess(manager, "chess", rating_state)
+
+def test_back_dated_and_edited_competitions_match_full_reprocess(manager, fill_random, add_leaderboard,
+                                                                 rating_state):
+    ids = fill_random(manager, seed=4, count=25)
+    add_leaderboard(manager, "Back-dated Open", "2024-01-02", ["P1", "P2", "P3"])
+    for competition_id in ids[3:20:4]:
+        competition = manager.competitions[competition_id]
+        manager.reopen_competition(competition_id)
+        if competition.format_type == "leaderboard":
+            manager.add_leaderboard_results(competition_id, [("P9", 1, 68), ("P0", 2, 70)])
+        else:
+            manager.add_direct_match(competition_id, "P9", "P0", 1)
+        manager.rerate_from(competition.competition_type, competition.date)
+
+    rated = rating_state(manager)
+    manager.reprocess_competitions(workers=1)
+    assert rated == rating_state(manager)
+
+def test_history_reads_during_rerating_see_whole_histories(manager, fill_random):
+    fill_random(manager, seed=6, count=40, types=("golf",))
+    full = manager.player_manager.query_history("P0", "golf")
+    stop = threading.Event()
+    seen = []
+
+    def read():
+        while not stop.is_set():
+            seen.append(manager.player_manager.query_history("P0", "golf"))
+            seen.append((None, manager.player_manager.history_entries("P0", "golf")))
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    try:
+        for _ in range(5):
+            manager.rerate_from("golf", "2024-01-01")
+    finally:
+        stop.set()
+        reader.join()
+    # Rewinding and replaying happen in one batch under the writer lock
+    assert all(entries == full[1] for _, entries in seen)
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from elo_calculator import ELOCalculator
+from simulation import simulate_leaderboard, simulate_matches
+
+RATINGS = {"a": 1700, "b": 1600, "c": 1500, "d": 1400}
+
+def test_results_do_not_depend_on_workers():
+    one = simulate_leaderboard(RATINGS, 3500, seed=5, workers=1)
+    three = simulate_leaderboard(RATINGS, 3500, seed=5, workers=3)
+    assert np.array_equal(one.rank_probabilities, three.rank_probabilities)
+    assert np.array_equal(one.expected_delta, three.expected_delta)
+
+    schedule = [("a", "b"), ("c", "d"), ("a", "c")]
+    one = simulate_matches(RATINGS, schedule, 2500, sequential=True, seed=5, workers=1)
+    three = simulate_matches(RATINGS, schedule, 2500, sequential=True, seed=5, workers=3)
+    assert np.array_equal(one.rank_probabilities, three.rank_probabilities)
+    assert np.array_equal(one.delta_std, three.delta_std)
+
+@pytest.mark.parametrize("system", ["glicko2", "plackett-luce"])
+def test_manager_refuses_non_elo_types(manager, system):
+    manager.set_rating_system("golf", system)
+    with pytest.raises(ValueError):
+        manager.simulate_leaderboard("golf", ["a", "b"], 100)
+    with pytest.raises(ValueError):
+        manager.simulate_matches("golf", [("a", "b")], 100)
+
+def test_manager_simulates_elo_types(manager):
+    projection = manager.simulate_leaderboard("golf", ["a", "b"], 100, seed=1)
+    assert projection.rank_probabilities.sum() == pytest.approx(2)
+
+def test_independent_matches_project_the_summed_expected_changes():
+    schedule = [("a", "b"), ("a", "c"), ("d", "a")]
+    projection = simulate_matches(RATINGS, schedule, 20000, seed=2)
+    calculator = ELOCalculator()
+    expected_a = 0.0
+    for player_a, player_b in schedule:
+        win = calculator.expected_score(RATINGS[player_a], RATINGS[player_b])
+        new_win = calculator.process_match(RATINGS[player_a], RATINGS[player_b], 1)
+        new_loss = calculator.process_match(RATINGS[player_a], RATINGS[player_b], 0)
+        side = 0 if player_a == "a" else 1
+        expected_a += (win * new_win[side] + (1 - win) * new_loss[side]) - RATINGS["a"]
+    assert projection.expected_delta[projection.players.index("a")] == pytest.approx(expected_a, abs=0.5)
@@ -0,0 +1,49 @@
+import pytest
+
+from competition_manager import CompetitionManager
+from snapshot import write_snapshot
+from storage import JSONStorage
+
+@pytest.mark.parametrize("storage", ["json", "sqlite", "eventlog"])
+def test_stale_snapshot_falls_back_to_full_load(tmp_path, data_dir, make_manager, add_leaderboard, storage):
+    snapshot_dir = str(tmp_path / "snapshot")
+    manager = make_manager(storage)
+    first = add_leaderboard(manager, "Spring Open", "2025-03-01", ["x", "y"])
+    write_snapshot(manager, snapshot_dir)
+    newer = add_leaderboard(manager, "Summer Open", "2025-06-01", ["x", "y"])
+    manager.storage.close()
+
+    warm = CompetitionManager.from_snapshot(snapshot_dir, str(data_dir), storage=storage, persist=False)
+    assert set(warm.competitions) == {first, newer}
+    add_leaderboard(warm, "Autumn Open", "2025-09-01", ["x", "y"])
+    warm.storage.close()
+
+    reloaded = make_manager(storage)
+    assert newer in reloaded.competitions
+    assert len(reloaded.competitions) == 3
+
+def test_current_snapshot_warm_starts(tmp_path, data_dir, manager, add_leaderboard, monkeypatch):
+    snapshot_dir = str(tmp_path / "snapshot")
+    add_leaderboard(manager, "Spring Open", "2025-03-01", ["x", "y"])
+    write_snapshot(manager, snapshot_dir)
+
+    def full_load(self):
+        raise AssertionError("the backend was loaded in full")
+    monkeypatch.setattr(JSONStorage, "load_players", full_load)
+    monkeypatch.setattr(JSONStorage, "load_competitions", full_load)
+
+    warm = CompetitionManager.from_snapshot(snapshot_dir, str(data_dir), persist=False)
+    assert warm.player_manager.get_rating_list("golf") == manager.player_manager.get_rating_list("golf")
+
+@pytest.mark.parametrize("file_format", ["npz"])
+def test_snapshot_round_trip(tmp_path, manager, fill_random, rating_state, file_format):
+    fill_random(manager, seed=2)
+    manager.set_rating_system("chess", "glicko2")
+    write_snapshot(manager, tmp_path / "snapshot", file_format)
+
+    restored = CompetitionManager.from_snapshot(tmp_path / "snapshot", str(tmp_path / "restored"))
+    assert rating_state(restored) == rating_state(manager)
+    assert ({cid: c.to_dict() for cid, c in restored.competitions.items()}
+            == {cid: c.to_dict() for cid, c in manager.competitions.items()})
+    assert restored.rating_systems == manager.rating_systems
+    restored.storage.close()
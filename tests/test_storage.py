@@ -0,0 +1,51 @@
+import pytest
+
+def _competitions(manager):
+    return {cid: competition.to_dict() for cid, competition in manager.competitions.items()}
+
+@pytest.mark.parametrize("storage", ["json", "sqlite"])
+def test_saved_data_reloads_unchanged(make_manager, fill_random, rating_state, storage):
+    manager = make_manager(storage)
+    fill_random(manager, seed=5)
+    manager.set_rating_system("chess", "plackett-luce")
+
+    reloaded = make_manager(storage)
+    assert rating_state(reloaded) == rating_state(manager)
+    assert _competitions(reloaded) == _competitions(manager)
+    assert reloaded.rating_systems == manager.rating_systems
+
+@pytest.mark.parametrize("storage", ["json", "sqlite"])
+def test_later_changes_are_saved(make_manager, fill_random, add_leaderboard, add_matches, rating_state, storage):
+    manager = make_manager(storage)
+    ids = fill_random(manager, seed=6, count=10)
+    make_manager(storage)  # a reload in between must not lose the changes below
+    add_leaderboard(manager, "Late Open", "2025-01-01", ["P1", "P2"])
+    manager.reopen_competition(ids[0])
+    if manager.competitions[ids[0]].format_type == "leaderboard":
+        manager.add_leaderboard_results(ids[0], [("P3", 1, 68), ("P4", 2, 70)])
+    else:
+        manager.add_direct_match(ids[0], "P3", "P4", 1)
+    manager.process_competition(ids[0])
+    add_matches(manager, "Late Match", "2025-01-02", [("P1", "P2", 0.5)])
+
+    reloaded = make_manager(storage)
+    assert rating_state(reloaded) == rating_state(manager)
+    assert _competitions(reloaded) == _competitions(manager)
+
+def test_sqlite_migrates_json_data(make_manager, fill_random, rating_state):
+    manager = make_manager("json")
+    fill_random(manager, seed=7)
+
+    migrated = make_manager("sqlite")
+    assert rating_state(migrated) == rating_state(manager)
+    assert _competitions(migrated) == _competitions(manager)
+
+def test_sqlite_reads_results_on_first_access(make_manager, add_matches):
+    manager = make_manager("sqlite")
+    competition_id = add_matches(manager, "Club Night", "2025-03-01", [("x", "y", 1), ("y", "z", 0.5)])
+
+    reloaded = make_manager("sqlite")
+    competition = reloaded.competitions[competition_id]
+    assert [(m.player_a, m.player_b, m.result) for m in competition.results] == [("x", "y", 1), ("y", "z", 0.5)]
+    assert list(reloaded.player_manager.players["y"].competition_history["chess"]) == \
+        list(manager.player_manager.players["y"].competition_history["chess"])
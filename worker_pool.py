@@ -0,0 +1,72 @@
+"""
+One long-lived pool of worker processes for CPU-heavy work split into independent
+tasks (parallel reprocessing, simulations).
+
+Workers are spawned, not forked: the app serves requests and runs jobs on
+threads, and forking while another thread holds a lock can deadlock the child.
+Spawned workers import the caller's main module again, so functions sent to them
+must be defined at module level and main modules must keep their work under
+`if __name__ == "__main__"` (app.py builds its app only in create_app). Counters
+and timers recorded inside a task are merged into the caller's metrics.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Iterable, List, Optional, Tuple, TypeVar
+
+from metrics import REGISTRY
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+
+def worker_pool() -> ProcessPoolExecutor:
+    """The shared pool, started on first use with one process per CPU"""
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(os.cpu_count() or 1, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def _reset_pool(pool: ProcessPoolExecutor):
+    """Forget a pool whose worker died, so the next call starts a new one"""
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+def _task(function: Callable[[T], R], items: List[T]) -> Tuple[List[R], Tuple]:
+    """Runs in a worker: function over items, and the metrics recorded meanwhile"""
+    REGISTRY.drain()
+    results = [function(item) for item in items]
+    return results, REGISTRY.drain()
+
+def map_in_workers(function: Callable[[T], R], items: Iterable[T], workers: int) -> List[R]:
+    """
+    function(item) for every item, in order, running at most `workers` tasks at a
+    time on the shared pool (each task takes every workers-th item). function,
+    the items and the results are pickled; with one worker everything runs in
+    the calling thread instead.
+    """
+    items = list(items)
+    workers = max(1, min(workers, len(items)))
+    if workers == 1:
+        return [function(item) for item in items]
+
+    pool = worker_pool()
+    try:
+        futures = [pool.submit(_task, function, items[start::workers]) for start in range(workers)]
+        groups = []
+        for future in futures:
+            results, recorded = future.result()
+            REGISTRY.merge(recorded)
+            groups.append(results)
+    except BrokenProcessPool:
+        _reset_pool(pool)
+        raise
+    return [groups[i % workers][i // workers] for i in range(len(items))]